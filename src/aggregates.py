@@ -0,0 +1,60 @@
+import asyncio
+from storage import storage
+
+# Background refresh of the call_aggregates view, or None
+refresh_task = None
+
+# Set when calls were stored while a refresh was already running
+refresh_pending = False
+
+
+def schedule_refresh():
+    """
+    Refreshes the aggregates in the background after an ingest batch.
+
+    Batches stored during a refresh are folded into one follow-up refresh, so a run with
+    many categories never queues more than one refresh behind the running one.
+    """
+    global refresh_task, refresh_pending
+    refresh_pending = True
+    if refresh_task is None or refresh_task.done():
+        refresh_task = asyncio.create_task(refresh_loop())
+
+
+async def refresh_loop():
+    global refresh_pending
+    while refresh_pending:
+        refresh_pending = False
+        try:
+            await storage.refresh_call_aggregates()
+        except Exception as e:
+            print(f"Error refreshing call aggregates: {e}")
+
+
+def summarize_clusters(rows: list) -> list:
+    """
+    Rolls the per category and status aggregates up into one entry per cluster.
+    Medians cannot be combined, so they are only given per category and status.
+    """
+    clusters = {}
+    for row in rows:
+        cluster = clusters.setdefault(row["cluster"], {
+            "cluster": row["cluster"], "call_count": 0, "total_budget": 0, "next_deadline": None,
+            "low_probability": 0, "medium_probability": 0, "high_probability": 0, "unknown_probability": 0,
+            "categories": []
+        })
+        for field in ("call_count", "low_probability", "medium_probability", "high_probability",
+                      "unknown_probability"):
+            cluster[field] += row[field]
+        cluster["total_budget"] += row["total_budget"] or 0
+        if row["next_deadline"] and (cluster["next_deadline"] is None or row["next_deadline"] < cluster["next_deadline"]):
+            cluster["next_deadline"] = row["next_deadline"]
+        cluster["categories"].append(row)
+    return list(clusters.values())
+
+
+async def get_dashboard(cluster: str = None, status: list = None) -> list:
+    """
+    Returns the cluster summaries with their per category and status rows.
+    """
+    return summarize_clusters(await storage.fetch_call_aggregates(cluster, status))
@@ -1,5 +1,5 @@
-from fastapi import FastAPI, Request, Form, BackgroundTasks, Query
-from fastapi.responses import RedirectResponse, FileResponse
+from fastapi import FastAPI, Request, Form, Query
+from fastapi.responses import RedirectResponse, FileResponse, StreamingResponse
 from contextlib import asynccontextmanager
 from typing import List, Optional
 import pandas as pd
@@ -9,21 +9,83 @@ import asyncio
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.staticfiles import StaticFiles
-from starlette.responses import HTMLResponse
+from starlette.responses import HTMLResponse, JSONResponse
 from scraper import scrape_eu_portal
+from http_scraper import scrape_eu_portal_http
+from browser_manager import BrowserManager
 import sys
 import os
 import re
 from datetime import datetime, date
 from urllib.parse import urlencode
 import json
-from database import fetch_all_calls, fetch_calls_by_filters, get_pool
+from functools import partial
+from database import fetch_all_calls, pool_manager
+from migrations import run_migrations
+from category_cache import get_categories
+from jobs import JobManager
+from category_registry import find_category_id
+from result_cache import result_cache, filter_key
+from aggregates import get_dashboard
+from history import get_comparison
+from storage import storage, load_synthetic, MEMORY_STORAGE_SYNTHETIC_CALLS
+from scheduler import RefreshScheduler, SCHEDULER_ENABLED
 
 # Windows-specific fix for Playwright subprocess execution
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-app = FastAPI()
+# "browser" drives the portal UI with Playwright, "http" reads the portal's search backend directly
+SCRAPER_ENGINE = os.getenv("SCRAPER_ENGINE", "browser").lower()
+
+# One warm Chromium shared by every request of the browser engine
+browser_manager = BrowserManager()
+
+if SCRAPER_ENGINE == "http":
+    run_scraper = scrape_eu_portal_http
+else:
+    run_scraper = partial(scrape_eu_portal, browser_manager=browser_manager)
+
+# Single-flight queue for scrape runs started from the UI
+job_manager = JobManager(run_scraper)
+
+
+async def fetch_scheduled_categories() -> list:
+    cached = await get_categories(
+        False, True, True,
+        partial(run_scraper, get_categories_only=True, closed_option=False, forthcoming_option=True, open_option=True)
+    )
+    return cached["categories"]
+
+# Background refresh of open and forthcoming calls
+scheduler = RefreshScheduler(job_manager, fetch_scheduled_categories)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if storage.uses_database:
+        await pool_manager.start()
+        await run_migrations()
+    elif MEMORY_STORAGE_SYNTHETIC_CALLS:
+        stored = await load_synthetic(storage, MEMORY_STORAGE_SYNTHETIC_CALLS)
+        print(f"Loaded {stored} synthetic calls into memory storage")
+    # Runs still marked running were cut off by the previous process
+    await storage.interrupt_running_scrape_runs()
+    # A leftover flag would keep /loading waiting for a run that no longer exists
+    if os.path.exists("scraping_in_progress.json"):
+        os.remove("scraping_in_progress.json")
+    if SCRAPER_ENGINE != "http":
+        await browser_manager.start()
+    if SCHEDULER_ENABLED:
+        await scheduler.start()
+    yield
+    await scheduler.stop()
+    await job_manager.stop()
+    await browser_manager.stop()
+    if storage.uses_database:
+        await pool_manager.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(SessionMiddleware, secret_key="secretkey")
 
@@ -46,54 +108,30 @@ def format_date(value):
 
 templates.env.filters['format_date'] = format_date
 
-def format_number(value):
-    try:
-        # Convert the value to a float and format it with commas, no decimals
-        return "{:,.0f}".format(float(value))
-    except Exception as e:
-        return value
 
-templates.env.filters['format_number'] = format_number
+def format_age(seconds):
+    """Formats an age in seconds as a short human readable string."""
+    if seconds is None:
+        return ""
+    seconds = int(seconds)
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{seconds // 60} min ago"
+    if seconds < 86400:
+        return f"{seconds // 3600} h ago"
+    return f"{seconds // 86400} days ago"
 
+templates.env.filters['format_age'] = format_age
 
-def format_funding(value):
-    try:
-        # If the value is empty or not a string, just return it.
-        if not isinstance(value, str) or not value.strip():
-            return value
-
-        # Case 1: "~ 5000000"
-        if value.strip().startswith("~"):
-            # Extract the number after "~"
-            m = re.search(r"~\s*(\d+)", value)
-            if m:
-                num = int(m.group(1))
-                formatted_num = "{:,.0f}".format(num)
-                return f"~ {formatted_num}"
-
-        # Case 2: "Min: 400000 Max: 500000"
-        if "Min:" in value and "Max:" in value:
-            # Extract both numbers using a regex
-            m = re.search(r"Min:\s*(\d+)\s*Max:\s*(\d+)", value)
-            if m:
-                min_num = int(m.group(1))
-                max_num = int(m.group(2))
-                formatted_min = "{:,.0f}".format(min_num)
-                formatted_max = "{:,.0f}".format(max_num)
-                return f"Min: {formatted_min} Max: {formatted_max}"
-
-        # Fallback: if it's a plain number (as a string)
-        try:
-            num = float(value)
-            return "{:,.0f}".format(num)
-        except Exception:
-            return value
-    except Exception as e:
-        print("format_funding error:", e)
-        return value
 
+def format_amount(value):
+    """Formats a whole euro amount from the numeric columns with thousands separators."""
+    if value is None:
+        return ""
+    return "{:,}".format(value)
 
-templates.env.filters['format_funding'] = format_funding
+templates.env.filters['format_amount'] = format_amount
 
 # Serve static files (if needed)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -124,6 +162,7 @@ async def fetch_categories(
     ):
     """
     Fetch categories and pass them directly to /categories via query parameters.
+    Categories are served from the category cache; stale lists are refreshed in the background.
     """
 
     print(f"Raw Data from Form Submission → Closed: {closed}, Forthcoming: {forthcoming}, Open: {open_}")
@@ -135,23 +174,30 @@ async def fetch_categories(
 
     print(f"Converted Bools → Closed: {closed_bool}, Forthcoming: {forthcoming_bool}, Open: {open_bool}")
 
-    # Fetch categories from scraper
-    categories = await scrape_eu_portal(
-        get_categories_only=True,
-        closed_option=closed_bool,
-        forthcoming_option=forthcoming_bool,
-        open_option=open_bool,
+    # Fetch categories from the cache, falling back to the scraper
+    cached = await get_categories(
+        closed_bool, forthcoming_bool, open_bool,
+        partial(
+            run_scraper,
+            get_categories_only=True,
+            closed_option=closed_bool,
+            forthcoming_option=forthcoming_bool,
+            open_option=open_bool,
+        )
     )
+    categories = cached["categories"]
 
-    print("Categories Retrieved from Scraper:", categories)
+    print(f"Categories Retrieved (age {cached['age_seconds']}s, stale: {cached['stale']}):", categories)
 
     return templates.TemplateResponse("options.html", {
         "request": request,
         "categories": categories,
+        "categories_age": cached["age_seconds"],
+        "categories_stale": cached["stale"],
         "closed": closed_bool,
         "forthcoming": forthcoming_bool,
         "open": open_bool
-    })
+    }, headers={"X-Categories-Age": str(cached["age_seconds"])})
 
 
 @app.get("/categories")
@@ -177,27 +223,35 @@ async def categories_page(
     })
 
 @app.get("/loading")
-async def loading_page(request: Request, redirect_url: str):
+async def loading_page(request: Request, redirect_url: str, job_id: Optional[int] = None):
     """
     Displays a loading screen and redirects to the specified URL after a delay.
+    With a job id the screen is shown until that scrape job is done.
     """
 
     progress_flag = "scraping_in_progress.json"
 
     #wait_interval = 3
 
-    if not os.path.exists(progress_flag):
+    if job_id is not None:
+        job = job_manager.get(job_id)
+        if job is None or job.state in ("finished", "failed"):
+            return RedirectResponse(url=redirect_url)
+    elif not os.path.exists(progress_flag):
         return RedirectResponse(url=redirect_url)
 
     #await asyncio.sleep(wait_interval)
 
-    return templates.TemplateResponse("loading.html", {"request": request, "redirect_url": redirect_url})
+    return templates.TemplateResponse("loading.html", {
+        "request": request,
+        "redirect_url": redirect_url,
+        "job_id": job_id
+    })
 
 
 @app.post("/scrape")
 async def scrape_endpoint(
     request: Request,
-    background_tasks: BackgroundTasks,
     categories: List[str] = Form(...),
     closed: bool = Form(...),
     forthcoming: bool = Form(...),
@@ -205,39 +259,192 @@ async def scrape_endpoint(
 ):
     """
     Starts scraping for selected categories in the background with filtering options.
+    Overlapping requests share one scrape job.
     """
     print("Scrape Endpoint Called")
     print(f"Selected Categories: {categories}")
     print(f"Filters - Closed: {closed}, Forthcoming: {forthcoming}, Open: {open_}")
 
-    # Start the scraper with the selected filters
-    background_tasks.add_task(
-        scrape_eu_portal,
-        closed_option=closed,
-        forthcoming_option=forthcoming,
-        open_option=open_,
-        desired_category=categories
-    )
+    # Queue the scraper with the selected filters
+    job = job_manager.submit(closed, forthcoming, open_, categories)
 
-    return RedirectResponse(url="/loading?redirect_url=/results", status_code=303)
+    return RedirectResponse(url=f"/loading?redirect_url=/results&job_id={job.id}", status_code=303)
 
 
-@app.get("/results")
-async def get_results(request: Request):
+@app.get("/jobs")
+async def list_scrape_jobs():
     """
-    Fetches the scraped results and displays them in an HTML page.
+    Lists the queued, running and recent scrape jobs.
     """
-    default_status=["open for submission", "forthcoming"]
-    data = await fetch_calls_by_filters(keyword="", status=default_status, probability="All")
+    return job_manager.statuses()
+
+
+@app.get("/jobs/{job_id}")
+async def get_scrape_job(job_id: int):
+    """
+    Shows a scrape job's state, queue position, current category and page and elapsed time.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+    return job_manager.status(job)
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_scrape_job_events(job_id: int):
+    """
+    Streams a scrape job's progress events as Server-Sent Events until the job ends.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+
+    async def event_stream():
+        async for event in job.listen():
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/browser-status")
+async def browser_status():
+    """
+    Reports whether the shared browser is running and how often it has been (re)launched.
+    """
+    return browser_manager.status()
+
+
+@app.get("/scheduler-status")
+async def scheduler_status():
+    """
+    Reports whether scheduled refreshes are enabled and when the next one is due.
+    """
+    return scheduler.status()
+
+
+@app.get("/db-pool-status")
+async def db_pool_status():
+    """
+    Reports the database pool's in-use and idle connections and how long acquires waited.
+    """
+    return pool_manager.status()
+
+
+@app.get("/cache-status")
+async def cache_status():
+    """
+    Reports the result cache's size, hit and miss counters and the current data generation.
+    """
+    return result_cache.stats()
+
+
+@app.get("/runs")
+async def list_scrape_runs(limit: int = 20):
+    """
+    Lists the latest scrape runs with how many of their categories are done.
+    """
+    return await storage.fetch_scrape_runs(limit)
+
+
+@app.get("/runs/{run_id}")
+async def get_scrape_run(run_id: int):
+    """
+    Shows a scrape run with the status and last stored results page of each category.
+    """
+    run = await storage.fetch_scrape_run(run_id)
+    if run is None:
+        return {"error": "Run not found"}
+    return run
+
+
+@app.post("/runs/{run_id}/resume")
+async def resume_scrape_run(run_id: int):
+    """
+    Resumes an unfinished scrape run where it stopped.
+    """
+    run = await storage.fetch_scrape_run(run_id)
+    if run is None:
+        return {"error": "Run not found"}
+    if run["status"] == "finished":
+        return {"error": "Run already finished"}
+
+    # Same parameters, so the job's run picks up this run's checkpoint
+    params = run["params"]
+    job = job_manager.submit(params["closed"], params["forthcoming"], params["open"], params["categories"])
+    return RedirectResponse(url=f"/loading?redirect_url=/results&job_id={job.id}", status_code=303)
+
+
+def parse_amount_param(value: Optional[str]) -> Optional[int]:
+    """Parses an amount typed in a filter field, e.g. "500 000" or "500,000"; empty means no filter."""
+    digits = re.sub(r"[^\d]", "", value or "")
+    return int(digits) if digits else None
+
+
+async def render_results(request: Request, keyword: str, status: List[str], probability: str, mode: str,
+                         sort: str, order: str, after: Optional[str], before: Optional[str],
+                         page: int, page_size: int, min_funding: Optional[int] = None,
+                         max_funding: Optional[int] = None):
+    """
+    Renders one page of the results table.
+    """
+    def load_page(size):
+        key = ("page",) + filter_key(keyword, status, probability) + (
+            mode, min_funding, max_funding, sort, order, after, before, size
+        )
+        return result_cache.get_or_load(key, partial(
+            storage.fetch_calls_page, keyword=keyword, status=status, probability=probability, search_mode=mode,
+            sort=sort, order=order, after=after, before=before, page_size=size,
+            min_funding=min_funding, max_funding=max_funding
+        ))
+
+    result = await load_page(page_size)
+    total_pages = max(1, -(-result["total"] // page_size))
+    if before == "":
+        # "Last" was clicked: the last page holds the rows left after the full pages,
+        # so that it starts where the page number shown says it does
+        page = total_pages
+        remainder = result["total"] % page_size
+        if remainder:
+            result = await load_page(remainder)
 
     return templates.TemplateResponse("results.html", {
         "request": request,
-        "data": data,
-        "selected_status": default_status,
-        "keyword": "",
-        "selected_probability": "all"
+        "data": result["rows"],
+        "selected_status": status,  # List of selected statuses
+        "keyword": keyword,
+        "selected_probability": probability,
+        "search_mode": mode,
+        "min_funding": min_funding,
+        "max_funding": max_funding,
+        "sort": result["sort"],
+        "order": result["order"],
+        "total": result["total"],
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "next_cursor": result["next_cursor"],
+        "prev_cursor": result["prev_cursor"]
     })
 
+
+@app.get("/results")
+async def get_results(
+    request: Request,
+    sort: str = "deadline",
+    order: str = "asc",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=200)
+):
+    """
+    Fetches the scraped results and displays them in an HTML page, one page at a time.
+    """
+    default_status=["open for submission", "forthcoming"]
+    return await render_results(request, "", default_status, "all", "substring",
+                                sort, order, after, before, page, page_size)
+
 @app.get("/results_ssbi")
 async def results_iframe(request: Request):
 
@@ -249,16 +456,28 @@ async def search_calls(
     request: Request,
     keyword: str = "",
     status: List[str] = Query([]),
-    probability: str = "all"
+    probability: str = "all",
+    mode: str = "substring",
+    min_funding: Optional[str] = None,
+    max_funding: Optional[str] = None,
+    sort: str = "",
+    order: str = "asc",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=200)
 ):
-    data = await fetch_calls_by_filters(keyword=keyword, status=status, probability=probability)
-    return templates.TemplateResponse("results.html", {
-        "request": request,
-        "data": data,
-        "selected_status": status,  # List of selected statuses
-        "keyword": keyword,
-        "selected_probability": probability
-    })
+    """
+    Filters the calls, one page at a time. With mode=fulltext the keyword is a ranked
+    full-text query and, unless another sort is chosen, the best matches come first.
+    min_funding and max_funding keep the calls whose funding per project overlaps that range.
+    """
+    if not sort:
+        sort = "relevance" if mode == "fulltext" else "deadline"
+        order = "desc" if sort == "relevance" else order
+    return await render_results(request, keyword, status, probability, mode,
+                                sort, order, after, before, page, page_size,
+                                parse_amount_param(min_funding), parse_amount_param(max_funding))
 
 def extract_group_name(identifier):
     """Extracts the category group from an identifier"""
@@ -270,20 +489,51 @@ def extract_group_name(identifier):
     else:
         return identifier  # Fallback for unknown formats
 
+@app.get("/dashboard", response_class=HTMLResponse)
+async def dashboard(request: Request, cluster: str = "", status: List[str] = Query([])):
+    """
+    Shows the call count, budget, next deadline and probability mix per cluster and category.
+    """
+    clusters = await get_dashboard(cluster, status)
+    return templates.TemplateResponse("dashboard.html", {
+        "request": request,
+        "clusters": clusters,
+        "selected_cluster": cluster,
+        "selected_status": status
+    })
+
+
+@app.get("/dashboard-data")
+async def dashboard_data(cluster: str = "", status: List[str] = Query([])):
+    """
+    The dashboard's aggregates as JSON.
+    """
+    return await get_dashboard(cluster, status)
+
+
+@app.get("/compare")
+async def compare(a: str, b: str, cluster: str = "", category: str = ""):
+    """
+    Compares the stored calls at the end of two years or dates, e.g. /compare?a=2022&b=2023&cluster=CL5.
+    """
+    category_id = None
+    if category:
+        category_id = await find_category_id(category)
+        if category_id is None:
+            return JSONResponse({"error": "Category not found"}, status_code=404)
+    try:
+        comparison = await get_comparison(a, b, cluster or None, category_id)
+    except ValueError:
+        return JSONResponse({"error": "a and b must be years (2022) or dates (2023-06-30)"}, status_code=400)
+    return {**comparison, "category": category or None}
+
+
 @app.get("/category/{cat_name}", response_class=HTMLResponse)
 async def view_category(request: Request, cat_name: str):
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT sc.identifier
-            FROM scraped_calls AS sc
-            INNER JOIN categories AS c ON sc.category_id = c.id
-            WHERE lower(c.name) = lower($1)
-            """,
-            cat_name
-        )
-    identifiers = [row["identifier"] for row in rows]
+    identifiers = []
+    category_id = await find_category_id(cat_name)
+    if category_id is not None:
+        identifiers = await storage.fetch_category_identifiers(category_id)
     return templates.TemplateResponse("category.html", {
         "request": request,
         "category": cat_name,
@@ -308,51 +558,11 @@ async def export_excel(
 ):
     output_excel_path = "scraped_results.xlsx"
 
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        query = """
-            SELECT
-                sc.identifier,
-                sc.title,
-                sc.action_type,
-                sc.budget,
-                sc.funding_per_project,
-                sc.deadline_primary,
-                sc.deadline_secondary,
-                sc.accepted_projects,
-                sc.probability_rate,
-                sc.link,
-                sc.opening_date,
-                c.name AS category_name,
-                sc.status
-            FROM scraped_calls sc
-            INNER JOIN categories c ON sc.category_id = c.id
-            WHERE 1=1
-        """
-        params = []
-        idx = 1
-
-        if keyword.strip():
-            query += (
-                f" AND (lower(sc.identifier) ILIKE '%' || ${idx} || '%' "
-                f"OR lower(sc.title) ILIKE '%' || ${idx} || '%')"
-            )
-            params.append(keyword)
-            idx += 1
-
-        if statuses:
-            status_list = [s.strip().lower() for s in statuses.split(",") if s.strip()]
-            query += f" AND lower(sc.status) = ANY(${idx})"
-            params.append(status_list)
-            idx += 1
-
-        if probability.lower() != "all":
-            query += f" AND lower(sc.probability_rate) = ${idx}"
-            params.append(probability.lower())
-            idx += 1
-
-        rows = await conn.fetch(query, *params)
-        data = [dict(r) for r in rows]
+    status_list = [s.strip().lower() for s in statuses.split(",") if s.strip()]
+    data = await result_cache.get_or_load(
+        ("export",) + filter_key(keyword, status_list, probability),
+        partial(storage.fetch_export_rows, keyword, status_list, probability)
+    )
 
     if not data:
         return {"error": "No data found"}
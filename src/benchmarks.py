@@ -0,0 +1,240 @@
+"""
+Benchmarks for the scraper and the storage layer.
+
+Usage (from the src folder):
+    python benchmarks.py extraction --results-html results.html --details-html details.html [--iterations 20]
+    python benchmarks.py replay --har-dir recordings/run1 --category HORIZON-CL5-2024-D3-01 [--profile run.prof]
+    python benchmarks.py bulk [--rows 1000 --rows 10000 --rows 100000]
+    python benchmarks.py memory [--calls 100000] [--iterations 20] [--profile memory.prof]
+
+The HTML files are saved results and call details pages of the portal (e.g. from the
+browser's "Save page as"), so the benchmarks run offline. The bulk benchmark writes
+synthetic calls to the DATABASE_URL database and deletes them afterwards. The memory
+benchmark times the API's queries against the in-memory storage backend, without a database.
+"""
+import argparse
+import asyncio
+import cProfile
+import pstats
+import time
+from datetime import date, timedelta
+from playwright.async_api import async_playwright
+from database import get_pool, store_call, store_calls
+from category_registry import register_categories, invalidate
+from storage import MemoryStorage, load_synthetic
+from scraper import (
+    scrape_eu_portal, extract_result_cards, extract_detail_table, result_cards_js, detail_table_js
+)
+
+
+async def time_async(function, iterations: int) -> float:
+    """
+    Runs `function` `iterations` times and returns the mean duration in milliseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await function()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+async def benchmark_extraction(results_html: str, details_html: str, iterations: int):
+    """
+    Compares in-browser `evaluate` extraction with `page.content()` + BeautifulSoup on saved pages.
+    """
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        # The saved DOM is enough; the page's own scripts would try to reach the portal
+        context = await browser.new_context(java_script_enabled=False)
+        page = await context.new_page()
+
+        for name, path, extract, js in [
+            ("result cards", results_html, extract_result_cards, result_cards_js),
+            ("details table", details_html, extract_detail_table, detail_table_js),
+        ]:
+            if not path:
+                continue
+            with open(path, encoding="utf-8") as f:
+                await page.set_content(f.read(), wait_until="domcontentloaded")
+
+            payload_soup = len(await page.content())
+            payload_evaluate = len(str(await page.evaluate(js)))
+            soup_ms = await time_async(lambda: extract(page, extraction="soup"), iterations)
+            evaluate_ms = await time_async(lambda: extract(page, extraction="evaluate"), iterations)
+
+            print(f"{name}:")
+            print(f"  soup:     {soup_ms:8.2f} ms/page, {payload_soup:>9} chars over the pipe")
+            print(f"  evaluate: {evaluate_ms:8.2f} ms/page, {payload_evaluate:>9} chars over the pipe")
+            print(f"  speedup:  {soup_ms / evaluate_ms:8.2f}x")
+
+        await browser.close()
+
+
+async def benchmark_replay(har_dir: str, categories: list, closed: bool, forthcoming: bool, open_: bool,
+                           concurrent: bool):
+    """
+    Times a full scrape run served from a recording made with SCRAPER_RECORD_HAR_DIR.
+    """
+    start = time.perf_counter()
+    await scrape_eu_portal(
+        closed_option=closed,
+        forthcoming_option=forthcoming,
+        open_option=open_,
+        desired_category=categories,
+        concurrent=concurrent,
+        replay_har_dir=har_dir
+    )
+    print(f"Replayed scrape run: {time.perf_counter() - start:.2f} s")
+
+
+benchmark_category = "BENCHMARK-BULK-UPSERT"
+
+
+def synthetic_calls(rows: int, category_id: int, revision: int = 0) -> list:
+    """
+    Returns `rows` call records; a different `revision` changes every record's title.
+    """
+    today = date.today()
+    return [{
+        "identifier": f"BENCHMARK-{i:06d}",
+        "title": f"Synthetic call {i} (revision {revision})",
+        "action_type": "HORIZON-RIA",
+        "budget": str(1000000 + i),
+        "funding_per_project": "~ 500000",
+        "deadline_primary": today + timedelta(days=i % 365),
+        "deadline_secondary": None,
+        "opening_date": today,
+        "accepted_projects": "2",
+        "probability_rate": "Medium",
+        "link": f"https://example.org/calls/{i}",
+        "category_id": category_id,
+        "status": "Open For Submission",
+        "funding_rate": 100
+    } for i in range(rows)]
+
+
+async def delete_benchmark_calls(category_id: int):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute("DELETE FROM scraped_calls WHERE category_id = $1", category_id)
+        # The history trigger recorded the synthetic rows and their deletion
+        await conn.execute("DELETE FROM call_history WHERE identifier LIKE 'BENCHMARK-%'")
+
+
+async def store_per_row(records: list):
+    for record in records:
+        await store_call(record)
+
+
+async def benchmark_bulk(row_counts: list):
+    """
+    Compares per-row store_call with the batched store_calls, for fresh inserts and for updates.
+    """
+    category_id = (await register_categories([benchmark_category]))[benchmark_category]
+
+    print(f"{'rows':>8} {'method':>8} {'insert s':>10} {'update s':>10} {'rows/s':>10}")
+    try:
+        for rows in row_counts:
+            for name, store in [("per-row", store_per_row), ("batch", store_calls)]:
+                await delete_benchmark_calls(category_id)
+
+                start = time.perf_counter()
+                await store(synthetic_calls(rows, category_id))
+                insert_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                await store(synthetic_calls(rows, category_id, revision=1))
+                update_s = time.perf_counter() - start
+
+                print(f"{rows:>8} {name:>8} {insert_s:>10.2f} {update_s:>10.2f} {rows / insert_s:>10.0f}")
+    finally:
+        await delete_benchmark_calls(category_id)
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute("DELETE FROM categories WHERE id = $1", category_id)
+        invalidate()
+
+
+async def benchmark_memory(calls: int, iterations: int):
+    """
+    Times the queries behind /results, /search, /category and /export-excel on the memory backend.
+    """
+    memory = MemoryStorage()
+    start = time.perf_counter()
+    await load_synthetic(memory, calls)
+    print(f"Loaded {calls} synthetic calls: {time.perf_counter() - start:.2f} s")
+
+    first_page = await memory.fetch_calls_page(sort="budget")
+    category_id = next(iter((await memory.fetch_category_ids()).values()))
+    queries = [
+        ("first page", lambda: memory.fetch_calls_page()),
+        ("next page by budget", lambda: memory.fetch_calls_page(sort="budget", after=first_page["next_cursor"])),
+        ("last page", lambda: memory.fetch_calls_page(before="")),
+        ("status and probability", lambda: memory.fetch_calls_page(status=["forthcoming"], probability="high")),
+        ("keyword", lambda: memory.fetch_calls_page(keyword="cl5-2024")),
+        ("funding range", lambda: memory.fetch_calls_page(min_funding=2000000, max_funding=3000000)),
+        ("full-text by relevance", lambda: memory.fetch_calls_page(keyword="hydrogen or battery -soil",
+                                                                    search_mode="fulltext", sort="relevance")),
+        ("category", lambda: memory.fetch_category_identifiers(category_id)),
+        ("export", lambda: memory.fetch_export_rows("", ["open for submission"], "all")),
+    ]
+    for name, query in queries:
+        print(f"{name:>24}: {await time_async(query, iterations):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    extraction = subparsers.add_parser("extraction", help="Compare in-browser and BeautifulSoup extraction")
+    extraction.add_argument("--results-html", help="Saved results page with sedia-result-card elements")
+    extraction.add_argument("--details-html", help="Saved call details page with the eui-table")
+    extraction.add_argument("--iterations", type=int, default=20)
+
+    replay = subparsers.add_parser("replay", help="Time a full scrape run served from a HAR recording")
+    replay.add_argument("--har-dir", required=True, help="Folder with the HAR files of a recorded run")
+    replay.add_argument("--category", action="append", default=[], help="Category to scrape (repeatable, 0 for all)")
+    replay.add_argument("--closed", action="store_true")
+    replay.add_argument("--no-forthcoming", action="store_true")
+    replay.add_argument("--no-open", action="store_true")
+    replay.add_argument("--concurrent", action="store_true")
+    replay.add_argument("--profile", help="Write cProfile stats of the run to this file")
+
+    bulk = subparsers.add_parser("bulk", help="Compare per-row and batched storing of calls")
+    bulk.add_argument("--rows", type=int, action="append", default=[],
+                      help="Number of calls to store (repeatable, default 1000, 10000 and 100000)")
+
+    memory = subparsers.add_parser("memory", help="Time the API's queries on the in-memory storage backend")
+    memory.add_argument("--calls", type=int, default=100000, help="Number of synthetic calls")
+    memory.add_argument("--iterations", type=int, default=20)
+    memory.add_argument("--profile", help="Write cProfile stats of the benchmark to this file")
+
+    args = parser.parse_args()
+    if args.benchmark == "extraction":
+        asyncio.run(benchmark_extraction(args.results_html, args.details_html, args.iterations))
+    elif args.benchmark == "replay":
+        run = lambda: asyncio.run(benchmark_replay(
+            args.har_dir, args.category or ["0"], args.closed, not args.no_forthcoming, not args.no_open,
+            args.concurrent
+        ))
+        if args.profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(run)
+            profiler.dump_stats(args.profile)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+        else:
+            run()
+    elif args.benchmark == "bulk":
+        asyncio.run(benchmark_bulk(args.rows or [1000, 10000, 100000]))
+    elif args.benchmark == "memory":
+        run = lambda: asyncio.run(benchmark_memory(args.calls, args.iterations))
+        if args.profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(run)
+            profiler.dump_stats(args.profile)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+        else:
+            run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+from playwright.async_api import async_playwright
+from browser_profile import BrowserProfile
+
+# Seconds between background health checks of the shared browser
+BROWSER_HEALTH_CHECK_INTERVAL = float(os.getenv("BROWSER_HEALTH_CHECK_INTERVAL", "30"))
+
+
+class BrowserManager:
+    """
+    Keeps one Chromium running for the lifetime of the app and hands it out to the scrapers.
+
+    The browser is launched when the app starts, checked periodically in the background
+    and relaunched on demand if it crashed or was disconnected.
+    """
+
+    def __init__(self, launch_options: dict = None):
+        self.launch_options = launch_options if launch_options is not None else BrowserProfile().launch_options()
+        self.playwright = None
+        self.browser = None
+        self.lock = asyncio.Lock()
+        self.health_task = None
+        self.launch_count = 0
+
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        try:
+            await self.get_browser()
+        except Exception as e:
+            # The next request retries the launch
+            print(f"Error launching the shared browser: {e}")
+        self.health_task = asyncio.create_task(self.health_check_loop())
+
+    async def stop(self):
+        if self.health_task:
+            self.health_task.cancel()
+            self.health_task = None
+        async with self.lock:
+            if self.browser and self.browser.is_connected():
+                await self.browser.close()
+            self.browser = None
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+
+    def is_healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    async def get_browser(self):
+        """
+        Returns the shared browser, relaunching it first if it is not connected.
+        """
+        async with self.lock:
+            if not self.is_healthy():
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+                if self.browser is not None:
+                    print("Shared browser is not connected. Relaunching.")
+                self.browser = await self.playwright.chromium.launch(headless=True, **self.launch_options)
+                self.launch_count += 1
+                print(f"Shared browser launched (launch #{self.launch_count}).")
+            return self.browser
+
+    async def health_check_loop(self):
+        while True:
+            await asyncio.sleep(BROWSER_HEALTH_CHECK_INTERVAL)
+            if not self.is_healthy():
+                try:
+                    await self.get_browser()
+                except Exception as e:
+                    print(f"Error relaunching the shared browser: {e}")
+
+    def status(self) -> dict:
+        return {
+            "healthy": self.is_healthy(),
+            "launch_count": self.launch_count,
+            "contexts": len(self.browser.contexts) if self.is_healthy() else 0
+        }
@@ -0,0 +1,159 @@
+import glob
+import os
+import uuid
+from datetime import datetime
+from urllib.parse import urlparse
+
+# The lean profile blocks resources that are irrelevant for the text we extract and starts
+# Chromium with unneeded features disabled.
+SCRAPER_LEAN_BROWSER = os.getenv("SCRAPER_LEAN_BROWSER", "false").lower() == "true"
+
+# Playwright resource types to block, e.g. image, font, media, stylesheet
+SCRAPER_BLOCKED_RESOURCE_TYPES = [
+    t.strip() for t in os.getenv("SCRAPER_BLOCKED_RESOURCE_TYPES", "image,font,media").split(",") if t.strip()
+]
+
+# Domains (and their subdomains) whose requests are blocked
+SCRAPER_BLOCKED_DOMAINS = [
+    d.strip().lower() for d in os.getenv(
+        "SCRAPER_BLOCKED_DOMAINS",
+        "webanalytics.europa.eu,google-analytics.com,googletagmanager.com,doubleclick.net,hotjar.com"
+    ).split(",") if d.strip()
+]
+
+# Record mode saves all traffic of a run as HAR files (one per browser context) in this folder
+SCRAPER_RECORD_HAR_DIR = os.getenv("SCRAPER_RECORD_HAR_DIR")
+
+# Replay mode serves a run recorded with SCRAPER_RECORD_HAR_DIR from this folder and aborts
+# every request that is not in the recording, so no network access is needed
+SCRAPER_REPLAY_HAR_DIR = os.getenv("SCRAPER_REPLAY_HAR_DIR")
+
+lean_launch_args = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-gpu",
+    "--mute-audio",
+    "--no-first-run"
+]
+
+lean_viewport = {"width": 1024, "height": 768}
+
+
+def is_blocked_domain(url: str, blocked_domains: list) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in blocked_domains)
+
+
+class BrowserProfile:
+    """
+    Creates browser contexts for a scrape run and counts their network traffic.
+
+    With `lean` enabled, contexts get a small viewport, no service workers and a
+    `route` handler that aborts requests of blocked resource types and domains.
+    Bytes transferred are counted in both modes so the savings can be compared.
+
+    With `record_har_dir` every context records its traffic to a HAR file in that folder;
+    with `replay_har_dir` every context is served from the HAR files in that folder.
+    """
+
+    def __init__(self, lean: bool = SCRAPER_LEAN_BROWSER,
+                 blocked_resource_types: list = None, blocked_domains: list = None,
+                 record_har_dir: str = SCRAPER_RECORD_HAR_DIR, replay_har_dir: str = SCRAPER_REPLAY_HAR_DIR):
+        self.lean = lean
+        self.record_har_dir = record_har_dir
+        self.replay_har_dir = replay_har_dir
+        self.context_count = 0
+        # Names this run's HAR files so that recordings of several runs in one folder do not overwrite each other
+        self.run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.blocked_resource_types = set(blocked_resource_types if blocked_resource_types is not None
+                                          else SCRAPER_BLOCKED_RESOURCE_TYPES)
+        self.blocked_domains = blocked_domains if blocked_domains is not None else SCRAPER_BLOCKED_DOMAINS
+        self.requests_finished = 0
+        self.requests_blocked = 0
+        self.bytes_transferred = 0
+
+    def launch_options(self) -> dict:
+        return {"args": lean_launch_args} if self.lean else {}
+
+    async def new_context(self, browser, **options):
+        """
+        Opens a new context on `browser` with this profile's settings and traffic counters.
+        """
+        if self.lean:
+            options.setdefault("viewport", lean_viewport)
+            options.setdefault("service_workers", "block")
+            options.setdefault("reduced_motion", "reduce")
+
+        self.context_count += 1
+        if self.record_har_dir:
+            os.makedirs(self.record_har_dir, exist_ok=True)
+            # The HAR file is written when the context is closed
+            options.setdefault("record_har_path",
+                               os.path.join(self.record_har_dir, f"run-{self.run_id}-context-{self.context_count}.har"))
+            options.setdefault("record_har_content", "embed")
+
+        context = await browser.new_context(**options)
+        context.on("requestfinished", self.count_request)
+
+        if self.lean:
+            await context.route("**/*", self.route_request)
+        if self.replay_har_dir:
+            await self.route_from_recording(context)
+        return context
+
+    async def route_from_recording(self, context):
+        """
+        Serves the context from every recorded HAR file and aborts requests missing from them.
+        """
+        har_files = sorted(glob.glob(os.path.join(self.replay_har_dir, "*.har")))
+        if not har_files:
+            raise FileNotFoundError(f"No HAR files found in {self.replay_har_dir}")
+
+        # Routes run in reverse registration order: the HAR files first, then the abort
+        await context.route("**/*", self.abort_unrecorded)
+        for har_file in har_files:
+            await context.route_from_har(har_file, not_found="fallback")
+
+    async def abort_unrecorded(self, route):
+        print(f"Request not in recording, aborting: {route.request.method} {route.request.url}")
+        await route.abort()
+
+    async def route_request(self, route):
+        request = route.request
+        if request.resource_type in self.blocked_resource_types or is_blocked_domain(request.url, self.blocked_domains):
+            self.requests_blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def count_request(self, request):
+        self.requests_finished += 1
+        try:
+            sizes = await request.sizes()
+            self.bytes_transferred += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            # The page may already be closed when the sizes are requested
+            pass
+
+    def summary(self) -> dict:
+        return {
+            "lean": self.lean,
+            "mode": self.mode(),
+            "requests_finished": self.requests_finished,
+            "requests_blocked": self.requests_blocked,
+            "bytes_transferred": self.bytes_transferred
+        }
+
+    def mode(self) -> str:
+        if self.replay_har_dir:
+            return "replay"
+        if self.record_har_dir:
+            return "record"
+        return "live"
+
+    def print_summary(self):
+        print(f"Browser traffic (lean={self.lean}, {self.mode()}): {self.requests_finished} requests, "
+              f"{self.bytes_transferred / (1024 * 1024):.2f} MB transferred, {self.requests_blocked} requests blocked")
@@ -0,0 +1,90 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from storage import storage
+
+# Seconds after which a cached category list is refreshed in the background
+CATEGORY_CACHE_TTL = int(os.getenv("CATEGORY_CACHE_TTL", "3600"))
+
+# status_key -> {"categories": [...], "fetched_at": datetime}
+memory_cache = {}
+
+# Status keys with a background refresh in flight
+refreshing = {}
+
+
+def status_key(closed: bool, forthcoming: bool, open_: bool) -> str:
+    return f"closed={int(closed)},forthcoming={int(forthcoming)},open={int(open_)}"
+
+
+def age_seconds(entry: dict) -> float:
+    return (datetime.now(timezone.utc) - entry["fetched_at"]).total_seconds()
+
+
+async def refresh_categories(key: str, fetch_categories) -> dict:
+    categories = await fetch_categories()
+    entry = {"categories": categories, "fetched_at": datetime.now(timezone.utc)}
+    memory_cache[key] = entry
+    try:
+        await storage.store_category_cache(key, categories, entry["fetched_at"])
+    except Exception as e:
+        print(f"Error storing category cache for {key}: {e}")
+    return entry
+
+
+def schedule_refresh(key: str, fetch_categories):
+    """
+    Starts a background refresh of `key` unless one is already running.
+    """
+    if key in refreshing:
+        return
+
+    async def run():
+        try:
+            await refresh_categories(key, fetch_categories)
+            print(f"Category cache refreshed for {key}")
+        except Exception as e:
+            print(f"Error refreshing category cache for {key}: {e}")
+        finally:
+            refreshing.pop(key, None)
+
+    refreshing[key] = asyncio.create_task(run())
+
+
+async def get_categories(closed: bool, forthcoming: bool, open_: bool, fetch_categories) -> dict:
+    """
+    Returns the categories of a status filter combination from memory or the database.
+
+    Fresh entries are returned as they are. Stale entries are returned immediately while
+    `fetch_categories` refreshes them in the background. Only when nothing is cached does the
+    request wait for `fetch_categories`.
+
+    Returns:
+        A dictionary with the categories, their age in seconds and whether they are stale.
+    """
+    key = status_key(closed, forthcoming, open_)
+
+    entry = memory_cache.get(key)
+    if entry is None:
+        try:
+            entry = await storage.fetch_category_cache(key)
+        except Exception as e:
+            print(f"Error reading category cache for {key}: {e}")
+            entry = None
+        if entry is not None:
+            memory_cache[key] = entry
+
+    if entry is None:
+        entry = await refresh_categories(key, fetch_categories)
+
+    age = age_seconds(entry)
+    stale = age > CATEGORY_CACHE_TTL
+    if stale:
+        schedule_refresh(key, fetch_categories)
+
+    return {
+        "categories": list(entry["categories"]),
+        "age_seconds": int(age),
+        "stale": stale,
+        "refreshing": key in refreshing
+    }
@@ -0,0 +1,74 @@
+import os
+import time
+from storage import storage
+
+# Lookups of unknown names reload the map from storage at most this often
+CATEGORY_REGISTRY_RELOAD_SECONDS = float(os.getenv("CATEGORY_REGISTRY_RELOAD_SECONDS", "60"))
+
+# name -> id of every known category
+category_ids = {}
+
+# lower(name) -> id, for case-insensitive lookups from URLs
+category_ids_lower = {}
+
+# time.monotonic() of the last reload, 0 when the map has to be reloaded on the next miss
+last_reload = 0.0
+
+
+def remember(ids: dict):
+    category_ids.update(ids)
+    category_ids_lower.update({name.lower(): category_id for name, category_id in ids.items()})
+
+
+def invalidate():
+    """
+    Forgets all category ids; the next lookup reloads them from storage.
+    Call it whenever categories are added, renamed or deleted.
+    """
+    global last_reload
+    category_ids.clear()
+    category_ids_lower.clear()
+    last_reload = 0.0
+
+
+async def reload():
+    global last_reload
+    invalidate()
+    remember(await storage.fetch_category_ids())
+    last_reload = time.monotonic()
+
+
+async def register_categories(names: list) -> dict:
+    """
+    Stores the categories that are not known yet with one upsert and returns {name: id} of all `names`.
+    New categories invalidate and reload the registry.
+    """
+    missing = [name for name in dict.fromkeys(names) if name not in category_ids]
+    if missing:
+        await storage.store_categories(missing)
+        # Reload the whole map, so lookups that missed before find the new categories
+        await reload()
+    return {name: category_ids[name] for name in names}
+
+
+async def get_category_id(name: str) -> int:
+    """
+    Returns the id of a category from memory, reloading the registry once if it is unknown.
+    """
+    if name not in category_ids:
+        # Stored by another process, or the registry was invalidated
+        await reload()
+    if name not in category_ids:
+        raise Exception(f"Category '{name}' not found.")
+    return category_ids[name]
+
+
+async def find_category_id(name: str):
+    """
+    Case-insensitive lookup of a category id; returns None for unknown categories.
+    Unknown names reload the map at most once per CATEGORY_REGISTRY_RELOAD_SECONDS.
+    """
+    if name.lower() not in category_ids_lower and \
+            time.monotonic() - last_reload >= CATEGORY_REGISTRY_RELOAD_SECONDS:
+        await reload()
+    return category_ids_lower.get(name.lower())
@@ -0,0 +1,103 @@
+import json
+from storage import storage
+
+
+def run_params(closed_option, forthcoming_option, open_option, categories: list) -> dict:
+    return {
+        "closed": bool(closed_option),
+        "forthcoming": bool(forthcoming_option),
+        "open": bool(open_option),
+        "categories": sorted(categories)
+    }
+
+
+class RunCheckpoint:
+    """
+    Durable state of a scrape run: the run id, each category's status and the last results
+    page of each category whose calls are all stored.
+
+    A run started with the same statuses and categories as an unfinished run resumes it:
+    finished categories are skipped and partially scraped categories skip their stored pages.
+    """
+
+    def __init__(self, run_id: int, categories: dict):
+        self.run_id = run_id
+        # category -> {"status": ..., "last_page": ...}
+        self.categories = categories
+        # category -> set of stored page numbers above last_page
+        self.completed_pages = {}
+
+    @classmethod
+    async def start(cls, params: dict, resume: bool = True):
+        """
+        Resumes the latest unfinished run with the same parameters, or creates a new run.
+        """
+        params_key = json.dumps(params, sort_keys=True)
+        run_id = await storage.find_resumable_scrape_run(params_key) if resume else None
+
+        if run_id is not None:
+            run = await storage.fetch_scrape_run(run_id)
+            categories = {row["category"]: {"status": row["status"], "last_page": row["last_page"]}
+                          for row in run["categories"]}
+            await storage.update_scrape_run(run_id, "running")
+            done = sum(1 for state in categories.values() if state["status"] == "done")
+            print(f"Resuming scrape run {run_id}: {done} of {len(categories)} categories already done.")
+        else:
+            run_id = await storage.create_scrape_run(params_key, params, params["categories"])
+            categories = {category: {"status": "pending", "last_page": 0} for category in params["categories"]}
+            print(f"Started scrape run {run_id}.")
+
+        return cls(run_id, categories)
+
+    def pending_categories(self, categories: list) -> list:
+        """
+        Returns the categories of `categories` that are not done yet, in their original order.
+        """
+        return [category for category in categories
+                if self.categories.get(category, {}).get("status") != "done"]
+
+    def last_page(self, category: str) -> int:
+        return self.categories.get(category, {}).get("last_page", 0)
+
+    async def category_started(self, category: str):
+        self.categories.setdefault(category, {"status": "pending", "last_page": 0})["status"] = "running"
+        await storage.update_scrape_run_category(self.run_id, category, "running")
+
+    async def page_done(self, category: str, page_number: int):
+        """
+        Records that every call of a results page is stored. Pages can finish out of order, so
+        the checkpoint only advances over consecutive stored pages.
+        """
+        state = self.categories[category]
+        completed = self.completed_pages.setdefault(category, set())
+        completed.add(page_number)
+
+        last_page = state["last_page"]
+        while last_page + 1 in completed:
+            last_page += 1
+            completed.discard(last_page)
+
+        if last_page != state["last_page"]:
+            state["last_page"] = last_page
+            await storage.update_scrape_run_category(self.run_id, category, "running", last_page)
+
+    async def category_done(self, category: str):
+        self.categories[category]["status"] = "done"
+        await storage.update_scrape_run_category(self.run_id, category, "done")
+
+    async def category_failed(self, category: str, error: Exception):
+        self.categories[category]["status"] = "failed"
+        await storage.update_scrape_run_category(self.run_id, category, "failed", error=str(error))
+
+    async def finish(self):
+        failed = [category for category, state in self.categories.items() if state["status"] != "done"]
+        if failed:
+            await storage.update_scrape_run(self.run_id, "failed", f"Unfinished categories: {', '.join(failed)}")
+            print(f"Scrape run {self.run_id} ended with unfinished categories: {failed}")
+        else:
+            await storage.update_scrape_run(self.run_id, "finished")
+            print(f"Scrape run {self.run_id} finished.")
+
+    async def fail(self, error: Exception):
+        await storage.update_scrape_run(self.run_id, "failed", str(error))
+        print(f"Scrape run {self.run_id} failed: {error}")
@@ -1,43 +1,367 @@
+import asyncio
 import asyncpg
+import base64
+import bisect
 import os
-from datetime import datetime
+import time
+import json
+from datetime import datetime, date
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from typing import List
-from fastapi import Query
 
 load_dotenv()
 
 # Replace with your actual PostgreSQL connection URL or set DATABASE_URL in your environment.
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Global connection pool variable
-pool: asyncpg.Pool = None
+# Connection pool sizing and per-connection prepared statement cache
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Seconds after which idle connections above the minimum are closed
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", "300"))
 
-async def get_pool() -> asyncpg.Pool:
-    global pool
-    if pool is None:
-        pool = await asyncpg.create_pool(dsn=DATABASE_URL)
-    return pool
+# Upper bounds (ms) of the acquire-wait histogram buckets
+acquire_wait_buckets_ms = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+
+class PoolManager:
+    """
+    Owns the app's asyncpg pool: created once under a lock, warmed up and closed by the
+    FastAPI lifespan, and instrumented so the pool can be sized under load.
+
+    `acquire()` is used like asyncpg's Pool.acquire() and records how long each caller
+    waited for a connection.
+    """
+
+    def __init__(self, dsn: str = DATABASE_URL, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 statement_cache_size: int = DB_STATEMENT_CACHE_SIZE,
+                 max_inactive_lifetime: float = DB_POOL_MAX_INACTIVE_LIFETIME):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.statement_cache_size = statement_cache_size
+        self.max_inactive_lifetime = max_inactive_lifetime
+        self.pool = None
+        self.lock = asyncio.Lock()
+        self.acquires = 0
+        self.waiting = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        # One count per bucket of acquire_wait_buckets_ms, plus one for slower waits
+        self.wait_histogram = [0] * (len(acquire_wait_buckets_ms) + 1)
+
+    async def get_pool(self) -> asyncpg.Pool:
+        if self.pool is None:
+            async with self.lock:
+                # Another caller may have created it while this one waited
+                if self.pool is None:
+                    self.pool = await asyncpg.create_pool(
+                        dsn=self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        statement_cache_size=self.statement_cache_size,
+                        max_inactive_connection_lifetime=self.max_inactive_lifetime
+                    )
+        return self.pool
+
+    async def start(self):
+        """
+        Creates the pool and makes sure its minimum number of connections is established.
+        """
+        pool_obj = await self.get_pool()
+
+        async def ping():
+            async with pool_obj.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+
+        await asyncio.gather(*(ping() for _ in range(self.min_size)))
+        print(f"Database pool ready: {pool_obj.get_size()} connections (min {self.min_size}, max {self.max_size})")
+
+    async def stop(self):
+        async with self.lock:
+            if self.pool is not None:
+                try:
+                    await asyncio.wait_for(self.pool.close(), timeout=10)
+                except asyncio.TimeoutError:
+                    # Connections still busy after the grace period are cut off
+                    self.pool.terminate()
+                self.pool = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        pool_obj = await self.get_pool()
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            conn = await pool_obj.acquire()
+        finally:
+            self.waiting -= 1
+        self.record_wait((time.perf_counter() - start) * 1000)
+        try:
+            yield conn
+        finally:
+            await pool_obj.release(conn)
+
+    def record_wait(self, wait_ms: float):
+        self.acquires += 1
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        self.wait_histogram[bisect.bisect_left(acquire_wait_buckets_ms, wait_ms)] += 1
+
+    def status(self) -> dict:
+        size = self.pool.get_size() if self.pool else 0
+        idle = self.pool.get_idle_size() if self.pool else 0
+        labels = [f"<={bound}ms" for bound in acquire_wait_buckets_ms] + [f">{acquire_wait_buckets_ms[-1]}ms"]
+        return {
+            "open": self.pool is not None,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiting": self.waiting,
+            "acquires": self.acquires,
+            "acquire_wait_avg_ms": round(self.wait_total_ms / self.acquires, 2) if self.acquires else None,
+            "acquire_wait_max_ms": round(self.wait_max_ms, 2),
+            "acquire_wait_histogram": dict(zip(labels, self.wait_histogram))
+        }
+
+
+pool_manager = PoolManager()
+
+
+async def get_pool() -> PoolManager:
+    """
+    Returns the pool manager; use it like an asyncpg pool: `async with pool.acquire() as conn`.
+    """
+    await pool_manager.get_pool()
+    return pool_manager
+
+# Columns shown in the results table
+call_list_columns = """
+                sc.identifier,
+                sc.title,
+                sc.action_type,
+                sc.budget,
+                sc.funding_per_project,
+                sc.deadline_primary,
+                sc.deadline_secondary,
+                sc.accepted_projects,
+                sc.probability_rate,
+                sc.link,
+                sc.opening_date,
+                c.name AS category_name,
+                sc.status,
+                sc.funding_rate,
+                sc.budget_amount,
+                sc.funding_min,
+                sc.funding_max,
+                sc.grant_count
+"""
+
+# Sort key -> (SQL expression, type of its cursor parameter). Missing values sort last in
+# ascending order; the identifier breaks ties, so every row has a unique position.
+call_sort_keys = {
+    "deadline": ("coalesce(sc.deadline_primary, 'infinity'::date)", "date"),
+    "budget": ("coalesce(sc.budget_amount, 9223372036854775807)", "bigint"),
+    "funding": ("coalesce(sc.funding_max, 9223372036854775807)", "bigint"),
+    "opening_date": ("coalesce(sc.opening_date, 'infinity'::date)", "date"),
+    "identifier": ("sc.identifier", "text"),
+    "relevance": ("ts_rank(sc.search_vector, search_query)", "real"),
+}
+
+
+async def keyword_category_ids(conn, keyword: str) -> list:
+    """
+    Returns the ids of the categories whose name contains `keyword`, for build_call_filters.
+    """
+    rows = await conn.fetch("SELECT id FROM categories WHERE lower(name) ILIKE '%' || $1 || '%'", keyword)
+    return [row["id"] for row in rows]
+
+
+def build_call_filters(keyword: str, status: List[str], probability: str, fulltext: bool,
+                       min_funding: int = None, max_funding: int = None, category_ids: List[int] = None):
+    """
+    Builds the FROM and WHERE clauses shared by the call list and count queries.
+
+    `min_funding` and `max_funding` keep the calls whose funding per project range
+    overlaps the given range. A substring keyword also matches the calls of the
+    `category_ids` categories, looked up with keyword_category_ids.
+
+    Returns:
+        The SQL and its parameters.
+    """
+    params = []
+
+    if fulltext:
+        params.append(keyword)
+        query = f"""
+            FROM scraped_calls AS sc
+            INNER JOIN categories AS c ON sc.category_id = c.id
+            CROSS JOIN websearch_to_tsquery('english', ${len(params)}) AS search_query
+            WHERE sc.search_vector @@ search_query
+        """
+    else:
+        query = """
+            FROM scraped_calls AS sc
+            INNER JOIN categories AS c ON sc.category_id = c.id
+            WHERE 1=1
+        """
+
+    # Keyword filter (against identifier, title OR category name). The category ids are
+    # passed as an array, so the planner knows how many calls they match and one BitmapOr
+    # over scraped_calls' indexes serves the whole filter.
+    if keyword.strip() and not fulltext:
+        query += (
+            f" AND (lower(sc.identifier) ILIKE '%' || ${len(params) + 1} || '%' "
+            f"OR lower(sc.title) ILIKE '%' || ${len(params) + 1} || '%' "
+            f"OR sc.category_id = ANY(${len(params) + 2}::integer[]))"
+        )
+        params += [keyword, category_ids or []]
+
+    # Status filter (ANY array)
+    if status:
+        filtered = [s.lower() for s in status if s.lower() != "all"]
+        if filtered:
+            query += f" AND lower(sc.status) = ANY(${len(params)+1})"
+            params.append(filtered)
+
+    # Probability filter
+    if probability.lower() != "all":
+        query += f" AND lower(sc.probability_rate) = ${len(params)+1}"
+        params.append(probability.lower())
+
+    # Funding range filters
+    if min_funding is not None:
+        query += f" AND sc.funding_max >= ${len(params)+1}"
+        params.append(min_funding)
+    if max_funding is not None:
+        query += f" AND sc.funding_min <= ${len(params)+1}"
+        params.append(max_funding)
+
+    return query, params
+
+
+def encode_cursor(sort_value, identifier: str) -> str:
+    payload = json.dumps([sort_value, identifier], default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """
+    Returns the (sort value, identifier) of a cursor, or None if it is not a valid cursor.
+    """
+    try:
+        sort_value, identifier = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, identifier
+    except (ValueError, TypeError):
+        return None
+
+
+def cursor_param(sort_value, sort_type: str):
+    # asyncpg wants Python values matching the parameter type
+    if sort_type == "date":
+        # Missing dates sort as 'infinity', which asyncpg reads and writes as date.max
+        return date.fromisoformat(sort_value)
+    if sort_type == "bigint":
+        return int(sort_value)
+    if sort_type == "real":
+        return float(sort_value)
+    return sort_value
+
+
+async def fetch_calls_page(
+    keyword: str = "",
+    status: List[str] = None,
+    probability: str = "all",
+    search_mode: str = "substring",
+    sort: str = "deadline",
+    order: str = "asc",
+    after: str = None,
+    before: str = None,
+    page_size: int = 10,
+    min_funding: int = None,
+    max_funding: int = None
+) -> dict:
+    """
+    Returns one page of the calls matching the filters, with keyset pagination.
+
+    The page starts right after the `after` cursor, or ends right before the `before` cursor,
+    so every page costs the same however deep it is. Without a cursor the first page is
+    returned, or the last one when `before` is an empty string.
+
+    Returns:
+        A dictionary with the calls of the page, the total number of matching calls and the
+        cursors of the next and previous pages (None at either end).
+    """
+    fulltext = search_mode == "fulltext" and bool(keyword.strip())
+    if sort not in call_sort_keys or (sort == "relevance" and not fulltext):
+        sort = "relevance" if fulltext else "deadline"
+    descending = order == "desc"
+    sort_expression, sort_type = call_sort_keys[sort]
 
-async def get_category_id(category_name: str) -> int:
     pool_obj = await get_pool()
     async with pool_obj.acquire() as conn:
-        row = await conn.fetchrow("SELECT id FROM Categories WHERE name = $1", category_name)
-        if row:
-            return row["id"]
-        else:
-            raise Exception(f"Category '{category_name}' not found.")
+        category_ids = await keyword_category_ids(conn, keyword) if keyword.strip() and not fulltext else None
+        filters, params = build_call_filters(keyword, status or [], probability, fulltext,
+                                             min_funding, max_funding, category_ids)
+        count_query = f"SELECT count(*) {filters}"
+        count_params = list(params)
 
-async def fetch_calls_by_filters(
-    keyword: str = "",
-    status: List[str] = Query([]),
-    probability: str = "all"
-) -> list:
+        # Walking backwards reads the rows in reverse order and flips them afterwards
+        backwards = before is not None
+        cursor = decode_cursor(after if not backwards else before) if (after or before) else None
+        reverse = descending != backwards
+
+        query = f"SELECT {call_list_columns}, {sort_expression} AS sort_value {filters}"
+        if cursor is not None:
+            comparison = "<" if reverse else ">"
+            query += (f" AND ({sort_expression}, sc.identifier) {comparison} "
+                      f"(${len(params) + 1}::{sort_type}, ${len(params) + 2})")
+            params += [cursor_param(cursor[0], sort_type), cursor[1]]
+        direction = "DESC" if reverse else "ASC"
+        query += f" ORDER BY {sort_expression} {direction}, sc.identifier {direction} LIMIT ${len(params) + 1}"
+        # One extra row tells whether there is another page
+        params.append(page_size + 1)
+
+        total = await conn.fetchval(count_query, *count_params)
+        rows = [dict(row) for row in await conn.fetch(query, *params)]
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    first_cursor = encode_cursor(rows[0]["sort_value"], rows[0]["identifier"]) if rows else None
+    last_cursor = encode_cursor(rows[-1]["sort_value"], rows[-1]["identifier"]) if rows else None
+    if backwards:
+        has_next, has_prev = cursor is not None, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    for row in rows:
+        row.pop("sort_value")
+
+    return {
+        "rows": rows,
+        "total": total,
+        "sort": sort,
+        "order": "desc" if descending else "asc",
+        "next_cursor": last_cursor if has_next else None,
+        "prev_cursor": first_cursor if has_prev else None
+    }
+
+
+async def fetch_export_rows(keyword: str, status_list: List[str], probability: str) -> list:
+    """
+    Fetches the calls matching the export filters.
+    """
     pool_obj = await get_pool()
     async with pool_obj.acquire() as conn:
-        # Base SELECT + JOIN
         query = """
-            SELECT 
+            SELECT
                 sc.identifier,
                 sc.title,
                 sc.action_type,
@@ -51,62 +375,47 @@ async def fetch_calls_by_filters(
                 sc.opening_date,
                 c.name AS category_name,
                 sc.status,
-                sc.funding_rate
-            FROM scraped_calls AS sc
-            INNER JOIN categories AS c ON sc.category_id = c.id
+                sc.budget_amount,
+                sc.funding_min,
+                sc.funding_max,
+                sc.grant_count
+            FROM scraped_calls sc
+            INNER JOIN categories c ON sc.category_id = c.id
             WHERE 1=1
         """
         params = []
+        idx = 1
 
-        # Keyword filter (against identifier OR title)
         if keyword.strip():
             query += (
-                f" AND (lower(sc.identifier) ILIKE '%' || ${len(params) + 1} || '%' "
-                f"OR lower(sc.title) ILIKE '%' || ${len(params) + 1} || '%' "
-                f"OR lower(c.name) ILIKE '%' || ${len(params) + 1} || '%')"
+                f" AND (lower(sc.identifier) ILIKE '%' || ${idx} || '%' "
+                f"OR lower(sc.title) ILIKE '%' || ${idx} || '%')"
             )
             params.append(keyword)
+            idx += 1
 
-        # Status filter (ANY array)
-        if status:
-            filtered = [s.lower() for s in status if s.lower() != "all"]
-            if filtered:
-                query += f" AND lower(sc.status) = ANY(${len(params)+1})"
-                params.append(filtered)
+        if status_list:
+            query += f" AND lower(sc.status) = ANY(${idx})"
+            params.append(status_list)
+            idx += 1
 
-        # Probability filter
         if probability.lower() != "all":
-            query += f" AND lower(sc.probability_rate) = ${len(params)+1}"
+            query += f" AND lower(sc.probability_rate) = ${idx}"
             params.append(probability.lower())
-
-        # print("Built query:", query)
-        # print("Parameters:", params)
+            idx += 1
 
         rows = await conn.fetch(query, *params)
-        return [dict(row) for row in rows]
-
+        return [dict(r) for r in rows]
 
 
-async def store_category(name: str, description: str = "No Description") -> int:
+async def fetch_category_identifiers(category_id: int) -> list:
     """
-    Inserts (or updates) a category in the Categories table.
-    Assumes a Categories table defined as:
-      id SERIAL PRIMARY KEY,
-      name TEXT NOT NULL UNIQUE,
-      description TEXT
+    Returns the identifiers of the calls stored in a category.
     """
     pool_obj = await get_pool()
     async with pool_obj.acquire() as conn:
-        # Upsert the category: if a category with the given name already exists,
-        # update its description; otherwise, insert a new row.
-        await conn.execute("""
-            INSERT INTO Categories (name, description)
-            VALUES ($1, $2)
-            ON CONFLICT (name) DO NOTHING
-            
-            --ON CONFLICT (name) DO UPDATE
-              --SET description = EXCLUDED.description;
-        """, name, description)
+        rows = await conn.fetch("SELECT identifier FROM scraped_calls WHERE category_id = $1", category_id)
+        return [row["identifier"] for row in rows]
 
 
 async def store_call(data: dict):
@@ -115,7 +424,8 @@ async def store_call(data: dict):
     Expected keys:
       - identifier, title, action_type, budget, funding_per_project,
         deadline_primary, deadline_secondary, opening_date,
-        accepted_projects, probability_rate, link, category_id, status
+        accepted_projects, probability_rate, link, category_id, status,
+      funding_rate, description, budget_amount, funding_min, funding_max, grant_count
     """
     # We assume deadlines and opening_date are already stored as text.
     pool = await get_pool()
@@ -124,9 +434,10 @@ async def store_call(data: dict):
             INSERT INTO scraped_calls (
                 identifier, title, action_type, budget, funding_per_project,
                 deadline_primary, deadline_secondary, opening_date,
-                accepted_projects, probability_rate, link, category_id, status, funding_rate
+                accepted_projects, probability_rate, link, category_id, status, funding_rate, description,
+                budget_amount, funding_min, funding_max, grant_count
             )
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19)
             ON CONFLICT (identifier) DO UPDATE
             SET 
                 title = EXCLUDED.title,
@@ -141,7 +452,30 @@ async def store_call(data: dict):
                 link = EXCLUDED.link,
                 category_id = EXCLUDED.category_id,
                 status = EXCLUDED.status,
-                funding_rate = EXCLUDED.funding_rate
+                funding_rate = EXCLUDED.funding_rate,
+                description = EXCLUDED.description,
+                budget_amount = EXCLUDED.budget_amount,
+                funding_min = EXCLUDED.funding_min,
+                funding_max = EXCLUDED.funding_max,
+                grant_count = EXCLUDED.grant_count
+            -- Leave rows untouched when nothing changed
+            WHERE (
+                scraped_calls.title, scraped_calls.action_type, scraped_calls.budget,
+                scraped_calls.funding_per_project, scraped_calls.deadline_primary,
+                scraped_calls.deadline_secondary, scraped_calls.opening_date,
+                scraped_calls.accepted_projects, scraped_calls.probability_rate, scraped_calls.link,
+                scraped_calls.category_id, scraped_calls.status, scraped_calls.funding_rate,
+                scraped_calls.description, scraped_calls.budget_amount, scraped_calls.funding_min,
+                scraped_calls.funding_max, scraped_calls.grant_count
+            ) IS DISTINCT FROM (
+                EXCLUDED.title, EXCLUDED.action_type, EXCLUDED.budget,
+                EXCLUDED.funding_per_project, EXCLUDED.deadline_primary,
+                EXCLUDED.deadline_secondary, EXCLUDED.opening_date,
+                EXCLUDED.accepted_projects, EXCLUDED.probability_rate, EXCLUDED.link,
+                EXCLUDED.category_id, EXCLUDED.status, EXCLUDED.funding_rate,
+                EXCLUDED.description, EXCLUDED.budget_amount, EXCLUDED.funding_min,
+                EXCLUDED.funding_max, EXCLUDED.grant_count
+            )
         """,
         data.get("identifier"),
         data.get("title"),
@@ -156,19 +490,107 @@ async def store_call(data: dict):
         data.get("link"),
         data.get("category_id"),
         data.get("status"),
-        data.get("funding_rate")
+        data.get("funding_rate"),
+        data.get("description"),
+        data.get("budget_amount"),
+        data.get("funding_min"),
+        data.get("funding_max"),
+        data.get("grant_count")
         )
 
 
-async def fetch_all_categories():
+async def store_categories(names: List[str]) -> dict:
     """
-    Fetch all stored call records from the database.
-    Returns a list of dictionaries.
+    Registers many categories in one statement.
+
+    Returns:
+        {name: id} of every given category, whether it was new or already stored.
     """
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("SELECT * FROM categories")
-        return [dict(row) for row in rows]
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        # The final SELECT sees the table as it was before the INSERT, so new and
+        # existing categories each come back exactly once
+        rows = await conn.fetch("""
+            WITH input AS (
+                SELECT DISTINCT unnest($1::text[]) AS name
+            ), inserted AS (
+                INSERT INTO categories (name, description)
+                SELECT name, 'No Description' FROM input
+                ON CONFLICT (name) DO NOTHING
+                RETURNING id, name
+            )
+            SELECT id, name FROM inserted
+            UNION ALL
+            SELECT c.id, c.name FROM categories AS c INNER JOIN input ON c.name = input.name
+        """, list(names))
+        return {row["name"]: row["id"] for row in rows}
+
+
+async def fetch_category_ids() -> dict:
+    """
+    Returns {name: id} of all stored categories.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        rows = await conn.fetch("SELECT id, name FROM categories")
+        return {row["name"]: row["id"] for row in rows}
+
+
+# Columns written for every scraped call, in the order of store_call's parameters
+call_columns = [
+    "identifier", "title", "action_type", "budget", "funding_per_project",
+    "deadline_primary", "deadline_secondary", "opening_date",
+    "accepted_projects", "probability_rate", "link", "category_id", "status", "funding_rate",
+    "description", "budget_amount", "funding_min", "funding_max", "grant_count"
+]
+
+
+async def store_calls(records: List[dict]) -> int:
+    """
+    Inserts or updates many scraped call records in one transaction.
+
+    The records are copied into a temporary table and merged into scraped_calls with one
+    set-based upsert, instead of a round trip per record. Like store_call, rows whose
+    values did not change are left untouched.
+
+    Returns:
+        The number of inserted or updated rows.
+    """
+    if not records:
+        return 0
+
+    updates = ",\n                ".join(f"{column} = EXCLUDED.{column}" for column in call_columns[1:])
+    current = ", ".join(f"scraped_calls.{column}" for column in call_columns[1:])
+    excluded = ", ".join(f"EXCLUDED.{column}" for column in call_columns[1:])
+    columns = ", ".join(call_columns)
+
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(f"""
+                CREATE TEMP TABLE scraped_calls_batch ON COMMIT DROP AS
+                SELECT {columns} FROM scraped_calls WITH NO DATA;
+                -- Numbers the copied rows in their order in `records`
+                ALTER TABLE scraped_calls_batch ADD COLUMN seq BIGSERIAL
+            """)
+            await conn.copy_records_to_table(
+                "scraped_calls_batch",
+                records=[tuple(record.get(column) for column in call_columns) for record in records],
+                columns=call_columns
+            )
+            # DISTINCT ON keeps one row per identifier, the last one like storing row by row
+            # would; ON CONFLICT cannot touch a row twice
+            result = await conn.execute(f"""
+                INSERT INTO scraped_calls ({columns})
+                SELECT DISTINCT ON (identifier) {columns} FROM scraped_calls_batch
+                ORDER BY identifier, seq DESC
+                ON CONFLICT (identifier) DO UPDATE
+                SET
+                {updates}
+                WHERE ({current}) IS DISTINCT FROM ({excluded})
+            """)
+    # Status is "INSERT 0 <rows>"
+    return int(result.split()[-1])
 
 
 async def fetch_all_calls():
@@ -178,3 +600,336 @@ async def fetch_all_calls():
         return [dict(row) for row in rows]
 
 
+async def fetch_category_cache(status_key: str):
+    """
+    Returns the cached categories and their fetch time for a status filter combination, or None.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT categories, fetched_at FROM category_cache WHERE status_key = $1", status_key
+        )
+        return dict(row) if row else None
+
+
+async def store_category_cache(status_key: str, categories: List[str], fetched_at: datetime):
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.execute("""
+            INSERT INTO category_cache (status_key, categories, fetched_at)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (status_key) DO UPDATE
+            SET categories = EXCLUDED.categories,
+                fetched_at = EXCLUDED.fetched_at
+        """, status_key, categories, fetched_at)
+
+
+async def fetch_call_fingerprints(identifiers: List[str]) -> dict:
+    """
+    Returns {identifier: {"card_hash": ..., "content_hash": ..., "verified_at": ...}} for the stored identifiers.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT identifier, card_hash, content_hash, verified_at FROM call_fingerprints "
+            "WHERE identifier = ANY($1)",
+            identifiers
+        )
+        return {row["identifier"]: dict(row) for row in rows}
+
+
+async def store_call_fingerprints(fingerprints: List[tuple]):
+    """
+    Upserts (identifier, card_hash, content_hash) fingerprints.
+    """
+    if not fingerprints:
+        return
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.executemany("""
+            INSERT INTO call_fingerprints (identifier, card_hash, content_hash, updated_at, verified_at)
+            VALUES ($1, $2, $3, now(), now())
+            ON CONFLICT (identifier) DO UPDATE
+            SET card_hash = EXCLUDED.card_hash,
+                content_hash = EXCLUDED.content_hash,
+                updated_at = EXCLUDED.updated_at,
+                verified_at = EXCLUDED.verified_at
+        """, fingerprints)
+
+
+async def touch_call_fingerprints(identifiers: List[str]):
+    """
+    Marks the details of calls as fetched now without changing their fingerprints.
+    """
+    if not identifiers:
+        return
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.execute(
+            "UPDATE call_fingerprints SET verified_at = now() WHERE identifier = ANY($1)", identifiers
+        )
+
+
+async def create_scrape_run(params_key: str, params: dict, categories: List[str]) -> int:
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        async with conn.transaction():
+            run_id = await conn.fetchval(
+                "INSERT INTO scrape_runs (params_key, params) VALUES ($1, $2::jsonb) RETURNING id",
+                params_key, json.dumps(params)
+            )
+            await conn.executemany(
+                "INSERT INTO scrape_run_categories (run_id, category) VALUES ($1, $2)",
+                [(run_id, category) for category in categories]
+            )
+        return run_id
+
+
+async def find_resumable_scrape_run(params_key: str):
+    """
+    Returns the id of the latest unfinished run with the same parameters, or None.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        return await conn.fetchval("""
+            SELECT id FROM scrape_runs
+            WHERE params_key = $1 AND status <> 'finished'
+            ORDER BY started_at DESC
+            LIMIT 1
+        """, params_key)
+
+
+async def fetch_scrape_run(run_id: int):
+    """
+    Returns a run with the state of each of its categories, or None.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        run = await conn.fetchrow("SELECT * FROM scrape_runs WHERE id = $1", run_id)
+        if run is None:
+            return None
+        categories = await conn.fetch(
+            "SELECT category, status, last_page, error, updated_at FROM scrape_run_categories WHERE run_id = $1",
+            run_id
+        )
+        result = dict(run)
+        result["params"] = json.loads(result["params"])
+        result["categories"] = [dict(row) for row in categories]
+        return result
+
+
+async def fetch_scrape_runs(limit: int = 20) -> list:
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT r.id, r.status, r.error, r.started_at, r.updated_at, r.finished_at,
+                   count(c.category) AS categories,
+                   count(c.category) FILTER (WHERE c.status = 'done') AS categories_done
+            FROM scrape_runs r
+            LEFT JOIN scrape_run_categories c ON c.run_id = r.id
+            GROUP BY r.id
+            ORDER BY r.started_at DESC
+            LIMIT $1
+        """, limit)
+        return [dict(row) for row in rows]
+
+
+async def update_scrape_run(run_id: int, status: str, error: str = None):
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.execute("""
+            UPDATE scrape_runs
+            SET status = $2, error = $3, updated_at = now(),
+                finished_at = CASE WHEN $2 = 'finished' THEN now() ELSE finished_at END
+            WHERE id = $1
+        """, run_id, status, error)
+
+
+async def update_scrape_run_category(run_id: int, category: str, status: str, last_page: int = None,
+                                     error: str = None):
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.execute("""
+            UPDATE scrape_run_categories
+            SET status = $3, last_page = COALESCE($4, last_page), error = $5, updated_at = now()
+            WHERE run_id = $1 AND category = $2
+        """, run_id, category, status, last_page, error)
+
+
+async def interrupt_running_scrape_runs():
+    """
+    Marks runs left 'running' by a stopped process as interrupted, so they can be resumed.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.execute(
+            "UPDATE scrape_runs SET status = 'interrupted', updated_at = now() WHERE status = 'running'"
+        )
+
+
+async def fetch_category_last_scraped() -> dict:
+    """
+    Returns {category: time its latest scrape finished} over all scrape runs.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT category, max(updated_at) AS scraped_at
+            FROM scrape_run_categories
+            WHERE status = 'done'
+            GROUP BY category
+        """)
+        return {row["category"]: row["scraped_at"] for row in rows}
+
+
+async def fetch_category_next_deadlines(statuses: List[str]) -> dict:
+    """
+    Returns {category: nearest upcoming primary deadline} of the calls with one of `statuses`.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT c.name, min(sc.deadline_primary) AS next_deadline
+            FROM scraped_calls AS sc
+            INNER JOIN categories AS c ON sc.category_id = c.id
+            WHERE lower(sc.status) = ANY($1) AND sc.deadline_primary >= current_date
+            GROUP BY c.name
+        """, [s.lower() for s in statuses])
+        return {row["name"]: row["next_deadline"] for row in rows}
+
+
+async def refresh_call_aggregates():
+    """
+    Recomputes the call_aggregates view without blocking readers of the old contents.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY call_aggregates")
+
+
+async def fetch_call_aggregates(cluster: str = None, status: List[str] = None) -> list:
+    """
+    Returns the precomputed per cluster, category and status aggregates.
+    """
+    query = "SELECT * FROM call_aggregates WHERE 1=1"
+    params = []
+    if cluster:
+        params.append(cluster.upper())
+        query += f" AND cluster = ${len(params)}"
+    if status:
+        params.append([s.lower() for s in status])
+        query += f" AND status = ANY(${len(params)})"
+    query += " ORDER BY cluster, category, status"
+
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        rows = await conn.fetch(query, *params)
+        return [dict(row) for row in rows]
+
+
+async def compare_calls(as_of_a: datetime, as_of_b: datetime, cluster: str = None,
+                        category_id: int = None) -> list:
+    """
+    Compares the calls as they were stored at two points in time.
+
+    Each call's state at a point in time is rebuilt from call_history by taking the latest
+    value of every field changed before it, so only the changed fields are ever stored.
+    Calls deleted before a point in time (tombstoned) are not part of its snapshot.
+
+    Args:
+        as_of_a: End (exclusive) of the first snapshot.
+        as_of_b: End (exclusive) of the second snapshot.
+        cluster: Only compare calls of this cluster (e.g. CL5).
+        category_id: Only compare calls that were stored in this category.
+
+    Returns:
+        One row per call with its change ('added', 'removed', 'changed' or 'unchanged'),
+        the differing fields as {field: {"from": ..., "to": ...}}, and its status and budget
+        in both snapshots.
+    """
+    params = [as_of_a, as_of_b]
+    scope = ""
+    if cluster:
+        params.append(cluster.upper())
+        scope += f" AND call_cluster(h.identifier) = ${len(params)}"
+    if category_id is not None:
+        params.append(category_id)
+        # From the history, so calls deleted since are still compared
+        scope += (f" AND h.identifier IN (SELECT identifier FROM call_history "
+                  f"WHERE (changes ->> 'category_id')::integer = ${len(params)})")
+
+    # Rows written in one transaction share changed_at; the id orders them
+    query = f"""
+        WITH history AS (
+            SELECT h.id, h.identifier, h.change, h.changes, h.changed_at
+            FROM call_history AS h
+            WHERE h.changed_at < greatest($1::timestamptz, $2::timestamptz){scope}
+        ),
+        fields AS (
+            SELECT h.id, h.identifier, f.key, f.value, h.changed_at
+            FROM history AS h
+            CROSS JOIN LATERAL jsonb_each(h.changes) AS f
+        ),
+        -- Calls whose last change before a snapshot is a delete are not part of it
+        deleted AS (
+            SELECT 'a' AS snapshot, identifier FROM (
+                SELECT DISTINCT ON (identifier) identifier, change
+                FROM history WHERE changed_at < $1
+                ORDER BY identifier, changed_at DESC, id DESC
+            ) AS latest_a WHERE change = 'delete'
+            UNION ALL
+            SELECT 'b', identifier FROM (
+                SELECT DISTINCT ON (identifier) identifier, change
+                FROM history WHERE changed_at < $2
+                ORDER BY identifier, changed_at DESC, id DESC
+            ) AS latest_b WHERE change = 'delete'
+        ),
+        snapshot_a AS (
+            SELECT identifier, jsonb_object_agg(key, value) AS fields
+            FROM (
+                SELECT DISTINCT ON (identifier, key) identifier, key, value
+                FROM fields WHERE changed_at < $1
+                ORDER BY identifier, key, changed_at DESC, id DESC
+            ) AS latest
+            WHERE identifier NOT IN (SELECT identifier FROM deleted WHERE snapshot = 'a')
+            GROUP BY identifier
+        ),
+        snapshot_b AS (
+            SELECT identifier, jsonb_object_agg(key, value) AS fields
+            FROM (
+                SELECT DISTINCT ON (identifier, key) identifier, key, value
+                FROM fields WHERE changed_at < $2
+                ORDER BY identifier, key, changed_at DESC, id DESC
+            ) AS latest
+            WHERE identifier NOT IN (SELECT identifier FROM deleted WHERE snapshot = 'b')
+            GROUP BY identifier
+        )
+        SELECT
+            coalesce(a.identifier, b.identifier) AS identifier,
+            CASE
+                WHEN a.identifier IS NULL THEN 'added'
+                WHEN b.identifier IS NULL THEN 'removed'
+                WHEN a.fields = b.fields THEN 'unchanged'
+                ELSE 'changed'
+            END AS change,
+            (
+                SELECT jsonb_object_agg(key, jsonb_build_object('from', a.fields -> key, 'to', b.fields -> key))
+                FROM jsonb_object_keys(coalesce(a.fields, '{{}}') || coalesce(b.fields, '{{}}')) AS key
+                WHERE a.fields -> key IS DISTINCT FROM b.fields -> key
+            ) AS differences,
+            a.fields ->> 'status' AS status_a,
+            b.fields ->> 'status' AS status_b,
+            (a.fields ->> 'budget_amount')::bigint AS budget_a,
+            (b.fields ->> 'budget_amount')::bigint AS budget_b
+        FROM snapshot_a AS a
+        FULL OUTER JOIN snapshot_b AS b ON b.identifier = a.identifier
+        ORDER BY change, identifier
+    """
+
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        rows = await conn.fetch(query, *params)
+        return [
+            {**dict(row), "differences": json.loads(row["differences"]) if row["differences"] else {}}
+            for row in rows
+        ]
@@ -0,0 +1,63 @@
+"""
+Local stand-in for the portal's search backend that serves responses recorded with
+HTTP_SCRAPER_RECORD_DIR, so the HTTP scraper engine can run without network access.
+
+Usage:
+    python fixture_server.py <fixture_dir> [port]
+
+Then point the HTTP engine at it:
+    EU_SEARCH_API_URL=http://127.0.0.1:<port>/search-api
+    EU_TOPIC_DETAILS_URL=http://127.0.0.1:<port>/topicDetails
+"""
+import json
+import os
+import sys
+from aiohttp import web
+from http_scraper import fixture_key
+
+
+async def read_form_json(form, name: str):
+    value = form.get(name)
+    if value is None:
+        return None
+    # Fields sent as blobs arrive as file fields
+    if hasattr(value, "file"):
+        value = value.file.read().decode("utf-8")
+    return json.loads(value)
+
+
+def serve_fixture(fixture_dir: str, name: str) -> web.Response:
+    path = os.path.join(fixture_dir, name)
+    if not os.path.exists(path):
+        raise web.HTTPNotFound(text=f"No recorded response {name}")
+    with open(path, encoding="utf-8") as f:
+        return web.json_response(json.load(f))
+
+
+def create_fixture_app(fixture_dir: str) -> web.Application:
+    """
+    Creates an app serving recorded search, facet and topic detail responses from `fixture_dir`.
+    """
+    async def search_handler(request):
+        endpoint = request.match_info["endpoint"]
+        form = await request.post()
+        query = await read_form_json(form, "query")
+        page_number = int(request.query.get("pageNumber", 1))
+        return serve_fixture(fixture_dir, fixture_key(endpoint, {"query": query, "pageNumber": page_number}))
+
+    async def topic_handler(request):
+        identifier = request.match_info["identifier"]
+        return serve_fixture(fixture_dir, fixture_key("topic", {"identifier": identifier}))
+
+    app = web.Application()
+    app.router.add_post("/search-api/{endpoint:search|facet}", search_handler)
+    app.router.add_get("/topicDetails/{identifier}.json", topic_handler)
+    return app
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    web.run_app(create_fixture_app(sys.argv[1]), host="127.0.0.1", port=port)
@@ -0,0 +1,55 @@
+import re
+from datetime import datetime, timedelta, timezone
+from storage import storage
+from result_cache import result_cache
+
+
+def parse_as_of(value: str) -> datetime:
+    """
+    Parses the end of a comparison snapshot.
+
+    Args:
+        value: A year ("2022") for the end of that year, or a date ("2023-06-30") for the end of that day.
+
+    Returns:
+        The first instant after the snapshot, in UTC.
+    """
+    value = (value or "").strip()
+    if re.fullmatch(r"\d{4}", value):
+        return datetime(int(value) + 1, 1, 1, tzinfo=timezone.utc)
+    day = datetime.strptime(value, "%Y-%m-%d")
+    return (day + timedelta(days=1)).replace(tzinfo=timezone.utc)
+
+
+def summarize_comparison(rows: list) -> dict:
+    """
+    Counts the calls per change and totals their budgets and statuses in both snapshots.
+    Unchanged calls are only counted.
+    """
+    summary = {
+        "added": 0, "removed": 0, "changed": 0, "unchanged": 0,
+        "total_budget_a": 0, "total_budget_b": 0, "status_a": {}, "status_b": {}
+    }
+    calls = []
+    for row in rows:
+        summary[row["change"]] += 1
+        for side in ("a", "b"):
+            if row["change"] == ("added" if side == "a" else "removed"):
+                continue
+            summary[f"total_budget_{side}"] += row[f"budget_{side}"] or 0
+            status = (row[f"status_{side}"] or "unknown").lower()
+            summary[f"status_{side}"][status] = summary[f"status_{side}"].get(status, 0) + 1
+        if row["change"] != "unchanged":
+            calls.append({"identifier": row["identifier"], "change": row["change"],
+                          "differences": row["differences"]})
+    return {"summary": summary, "calls": calls}
+
+
+async def get_comparison(a: str, b: str, cluster: str = None, category_id: int = None) -> dict:
+    """
+    Compares the stored calls at the ends of `a` and `b` (years or dates).
+    """
+    as_of_a, as_of_b = parse_as_of(a), parse_as_of(b)
+    key = ("compare", as_of_a, as_of_b, (cluster or "").upper(), category_id)
+    rows = await result_cache.get_or_load(key, lambda: storage.compare_calls(as_of_a, as_of_b, cluster, category_id))
+    return {"a": a, "b": b, "cluster": cluster, **summarize_comparison(rows)}
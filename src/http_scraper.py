@@ -0,0 +1,349 @@
+import aiohttp
+import asyncio
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from bs4 import BeautifulSoup
+from category_registry import register_categories
+from scraper import store_category_results, format_date, format_openingdate
+from incremental import ChangeTracker, SCRAPER_INCREMENTAL
+from checkpoints import RunCheckpoint, run_params
+from progress import set_progress_callback, report_progress
+
+
+# Endpoints used by the portal page itself. Point them at a fixture server to run offline.
+SEARCH_API_URL = os.getenv("EU_SEARCH_API_URL", "https://api.tech.ec.europa.eu/search-api/prod/rest")
+TOPIC_DETAILS_URL = os.getenv("EU_TOPIC_DETAILS_URL", "https://ec.europa.eu/info/funding-tenders/opportunities/data/topicDetails")
+TOPIC_PAGE_URL = "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/topic-details"
+
+# Size of the shared connection pool and therefore of the detail fetch fan-out
+HTTP_SCRAPER_MAX_CONNECTIONS = int(os.getenv("HTTP_SCRAPER_MAX_CONNECTIONS", "10"))
+HTTP_SCRAPER_PAGE_SIZE = int(os.getenv("HTTP_SCRAPER_PAGE_SIZE", "100"))
+
+# When set, every backend response is saved here under its fixture key so the run can be
+# served again by fixture_server.py
+HTTP_SCRAPER_RECORD_DIR = os.getenv("HTTP_SCRAPER_RECORD_DIR")
+
+horizon_programme_id = "43108390"
+
+status_codes = {
+    "closed": "31094503",
+    "forthcoming": "31094501",
+    "open": "31094502"
+}
+
+# Status labels as shown on the portal's result cards
+status_labels = {
+    "31094503": "Closed",
+    "31094501": "Forthcoming",
+    "31094502": "Open For Submission"
+}
+
+
+def fixture_key(kind: str, params: dict) -> str:
+    """
+    Returns the file name a backend response is recorded under and served from.
+    """
+    if kind == "topic":
+        return f"topic_{params['identifier'].lower()}.json"
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return f"{kind}_{digest}.json"
+
+
+def record_response(kind: str, params: dict, payload: dict):
+    if not HTTP_SCRAPER_RECORD_DIR:
+        return
+    os.makedirs(HTTP_SCRAPER_RECORD_DIR, exist_ok=True)
+    path = os.path.join(HTTP_SCRAPER_RECORD_DIR, fixture_key(kind, params))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+
+def build_search_query(selected_statuses: dict, category: str = None) -> dict:
+    """
+    Builds the search backend query the portal sends for the Horizon programme and the selected statuses.
+    """
+    statuses = [status_codes[status] for status, selected in selected_statuses.items() if selected]
+    must = [
+        {"terms": {"type": ["1", "2", "8"]}},
+        {"terms": {"status": statuses}},
+        {"terms": {"frameworkProgramme": [horizon_programme_id]}}
+    ]
+    if category:
+        must.append({"terms": {"callIdentifier": [category]}})
+    return {"bool": {"must": must}}
+
+
+def search_form(query: dict) -> aiohttp.FormData:
+    form = aiohttp.FormData()
+    form.add_field("query", json.dumps(query), content_type="application/json", filename="blob")
+    form.add_field("languages", json.dumps(["en"]), content_type="application/json", filename="blob")
+    form.add_field("sort", json.dumps({"order": "DESC", "field": "sortStatus"}),
+                   content_type="application/json", filename="blob")
+    return form
+
+
+async def post_search(session, endpoint: str, query: dict, page_number: int = 1) -> dict:
+    params = {"apiKey": "SEDIA", "text": "***", "pageSize": HTTP_SCRAPER_PAGE_SIZE, "pageNumber": page_number}
+    async with session.post(f"{SEARCH_API_URL}/{endpoint}", params=params, data=search_form(query)) as response:
+        response.raise_for_status()
+        payload = await response.json(content_type=None)
+    record_response(endpoint, {"query": query, "pageNumber": page_number}, payload)
+    return payload
+
+
+async def fetch_categories_http(session, selected_statuses: dict) -> list:
+    """
+    Returns the call identifiers listed in the portal's 'Call' filter for the selected statuses.
+    """
+    payload = await post_search(session, "facet", build_search_query(selected_statuses))
+    for facet in payload.get("facets", []):
+        if facet.get("name") == "callIdentifier":
+            return [value.get("value") for value in facet.get("values", []) if value.get("value")]
+    return []
+
+
+async def fetch_topics(session, selected_statuses: dict, category: str) -> list:
+    """
+    Pages through the search backend and returns the metadata of every topic in the category.
+    """
+    query = build_search_query(selected_statuses, category)
+    topics = []
+    page_number = 1
+    while True:
+        payload = await post_search(session, "search", query, page_number)
+        results = payload.get("results", [])
+        topics.extend(result.get("metadata", {}) for result in results)
+        report_progress("page_parsed", category=category, page=page_number, cards=len(results))
+        total = int(payload.get("totalResults", 0))
+        if not results or len(topics) >= total:
+            break
+        page_number += 1
+    return topics
+
+
+async def fetch_topic_details(session, semaphore, identifier: str) -> dict:
+    async with semaphore:
+        async with session.get(f"{TOPIC_DETAILS_URL}/{identifier.lower()}.json") as response:
+            if response.status == 404:
+                return {}
+            response.raise_for_status()
+            payload = await response.json(content_type=None)
+    record_response("topic", {"identifier": identifier}, payload)
+    return payload.get("TopicDetails", {})
+
+
+def first_value(metadata: dict, key: str, default=None):
+    values = metadata.get(key)
+    if isinstance(values, list):
+        return values[0] if values else default
+    return values if values is not None else default
+
+
+def parse_backend_date(value):
+    """
+    Parses the date formats used by the search backend ("2024-02-20T17:00:00.000+0100",
+    "2024-02-20", "20 February 2024").
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    parsed = format_openingdate(value[:10])
+    if parsed:
+        return parsed
+    parsed = format_date(value)
+    if parsed:
+        return parsed
+    try:
+        return datetime.strptime(value, "%d %b %Y").date()
+    except ValueError:
+        return None
+
+
+def table_rows_from_budget(identifier: str, budget_overview: dict, funding_rate_int):
+    """
+    Converts the budget overview of a topic into rows shaped like the detail page table rows.
+
+    Returns:
+        The table rows and the action type (e.g. RIA, IA) of the topic.
+    """
+    table_rows = []
+    action_type = "No action"
+    actions = budget_overview.get("budgetTopicActionMap", {}) if budget_overview else {}
+    for action_rows in actions.values():
+        for action in action_rows:
+            raw_identifier = action.get("action", identifier)
+            row_identifier = raw_identifier.split(" ")[0] if raw_identifier else identifier
+            if row_identifier.lower() != identifier.lower():
+                continue
+
+            # Use the latest year with a budget, like the last non-empty budget column of the table
+            budget_years = action.get("budgetYearMap", {})
+            budget = None
+            for year in sorted(budget_years):
+                if budget_years[year] not in (None, ""):
+                    budget = str(budget_years[year])
+
+            min_funding = action.get("minContribution")
+            max_funding = action.get("maxContribution")
+            if min_funding and max_funding and min_funding != max_funding:
+                funding_per_submission = f"Min: {min_funding} Max: {max_funding}"
+            elif min_funding or max_funding:
+                funding_per_submission = f"~ {min_funding or max_funding}"
+            else:
+                funding_per_submission = "No funding info"
+
+            deadlines = [parse_backend_date(d) for d in action.get("deadlineDates", [])]
+            deadlines = [d for d in deadlines if d]
+            if len(deadlines) > 1:
+                deadline = tuple(deadlines)
+            else:
+                deadline = deadlines[0] if deadlines else None
+
+            # Extract the action type (e.g., RIA, IA)
+            action_match = re.search(r'-(RIA|IA|CSA|MSCA|EIC)', raw_identifier)
+            if action_match:
+                action_type = action_match.group(1)
+
+            table_rows.append({
+                "Identifier": identifier,
+                "Intensity Rate": "Coming soon",
+                "Opening Date": parse_backend_date(action.get("plannedOpeningDate")),
+                "Budget": budget,
+                "Deadline": deadline,
+                "Funding Per Project": funding_per_submission,
+                "Accepted Projects": str(action.get("expectedGrants", "")),
+                "Funding Rate": funding_rate_int
+            })
+    return table_rows, action_type
+
+
+def parse_topic(metadata: dict, details: dict):
+    """
+    Turns the search metadata and topic details of one topic into a card record and its table rows.
+    """
+    identifier = first_value(metadata, "identifier", "No identifier")
+    status_code = first_value(metadata, "status")
+
+    description = " ".join(filter(None, [details.get("description"), details.get("conditions")]))
+    page_text = BeautifulSoup(description, "html.parser").get_text(separator=" ", strip=True)
+    match = re.search(r'funding rate of\s+(\d+)%', page_text, re.IGNORECASE)
+    funding_rate_int = int(match.group(1)) if match else None
+
+    budget_overview = details.get("budgetOverviewJSONItem")
+    if not budget_overview:
+        raw_overview = first_value(metadata, "budgetOverview")
+        budget_overview = json.loads(raw_overview) if raw_overview else {}
+
+    table_rows, action_type = table_rows_from_budget(identifier, budget_overview, funding_rate_int)
+    description_text = BeautifulSoup(details.get("description") or "", "html.parser").get_text(separator=" ", strip=True)
+    for row in table_rows:
+        row["Description"] = description_text or None
+
+    card = {
+        "Identifier": identifier,
+        "Title": first_value(metadata, "title", "No title"),
+        "Status": status_labels.get(status_code, "No status found"),
+        "Link": f"{TOPIC_PAGE_URL}/{identifier.lower()}",
+        "Action": action_type
+    }
+    return card, table_rows
+
+
+async def scrape_category_http(session, semaphore, selected_statuses: dict, category: str, change_tracker=None):
+    report_progress("category_started", category=category)
+    topics = [metadata for metadata in await fetch_topics(session, selected_statuses, category)
+              if first_value(metadata, "identifier")]
+    print(f"Found {len(topics)} topics for category: {category}")
+
+    if change_tracker is not None:
+        # Topics whose card fields did not change since the last run are skipped entirely
+        await change_tracker.load([first_value(metadata, "identifier") for metadata in topics])
+        topics = [metadata for metadata in topics if not change_tracker.card_unchanged(parse_topic(metadata, {})[0])]
+
+    # Topic details are fetched concurrently over the pooled connections
+    details = await asyncio.gather(*(
+        fetch_topic_details(session, semaphore, first_value(metadata, "identifier")) for metadata in topics
+    ), return_exceptions=True)
+
+    titles_data = []
+    table_data = []
+    for metadata, topic_details in zip(topics, details):
+        if isinstance(topic_details, Exception):
+            print(f"Error fetching topic details for {first_value(metadata, 'identifier')}: {topic_details}")
+            topic_details = {}
+        card, table_rows = parse_topic(metadata, topic_details)
+        titles_data.append(card)
+        table_data.extend(table_rows)
+
+    await store_category_results(titles_data, table_data, category, change_tracker)
+
+
+async def scrape_eu_portal_http(closed_option, forthcoming_option, open_option, desired_category: list = None,
+                                get_categories_only: bool = False, incremental: bool = SCRAPER_INCREMENTAL,
+                                resume: bool = True, on_progress=None):
+    """
+    Scrapes the same calls as `scrape_eu_portal`, reading the portal's JSON search and topic
+    detail endpoints directly instead of driving the UI in a browser.
+
+    Runs are checkpointed per category; with `resume` finished categories of an unfinished
+    run with the same parameters are skipped. `on_progress` receives the run's progress events.
+    """
+    set_progress_callback(on_progress)
+    selected_statuses = {
+        "closed": closed_option,
+        "forthcoming": forthcoming_option,
+        "open": open_option
+    }
+
+    connector = aiohttp.TCPConnector(limit=HTTP_SCRAPER_MAX_CONNECTIONS)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        options = await fetch_categories_http(session, selected_statuses)
+        print("Extracted Options:", options)
+
+        await register_categories(options)
+
+        if get_categories_only:
+            return options
+
+        selected_categories = [category for category in desired_category if category in options]
+        if "0" in desired_category:  # If "0" is provided, select all
+            selected_categories = options
+
+        checkpoint = await RunCheckpoint.start(
+            run_params(closed_option, forthcoming_option, open_option, selected_categories), resume
+        )
+        report_progress("run_started", run_id=checkpoint.run_id, categories=selected_categories)
+
+        # Create "scraping in progress" flag
+        open("scraping_in_progress.json", "w").close()
+        try:
+            change_tracker = ChangeTracker() if incremental else None
+            semaphore = asyncio.Semaphore(HTTP_SCRAPER_MAX_CONNECTIONS)
+            for category in checkpoint.pending_categories(selected_categories):
+                await checkpoint.category_started(category)
+                try:
+                    await scrape_category_http(session, semaphore, selected_statuses, category, change_tracker)
+                    await checkpoint.category_done(category)
+                except Exception as e:
+                    print(f"Error scraping category {category}: {e}")
+                    await checkpoint.category_failed(category, e)
+
+            if change_tracker is not None:
+                change_tracker.print_summary()
+        except Exception as e:
+            await checkpoint.fail(e)
+            report_progress("run_failed", run_id=checkpoint.run_id, error=str(e))
+            raise
+        finally:
+            # Another job may already have removed the shared flag
+            if os.path.exists("scraping_in_progress.json"):
+                os.remove("scraping_in_progress.json")
+
+        await checkpoint.finish()
+        report_progress("run_finished", run_id=checkpoint.run_id,
+                        failed_categories=[category for category in selected_categories
+                                           if checkpoint.categories[category]["status"] != "done"])
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from storage import storage
+
+# Incremental mode skips details pages of calls whose card did not change and only writes
+# calls whose content changed
+SCRAPER_INCREMENTAL = os.getenv("SCRAPER_INCREMENTAL", "false").lower() == "true"
+
+# Deadlines, budgets and funding are only on the details page, so an unchanged card only
+# skips the details while they were fetched less than this many days ago
+SCRAPER_DETAIL_TTL_DAYS = float(os.getenv("SCRAPER_DETAIL_TTL_DAYS", "7"))
+
+card_fields = ["Identifier", "Title", "Status", "Link"]
+
+
+def fingerprint(values: dict) -> str:
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def card_fingerprint(card: dict) -> str:
+    """
+    Fingerprint of the fields shown on a result card.
+    """
+    return fingerprint({field: card.get(field) for field in card_fields})
+
+
+def content_fingerprint(record: dict) -> str:
+    """
+    Fingerprint of a full call record, i.e. the card fields and the details table row.
+    """
+    return fingerprint(record)
+
+
+class ChangeTracker:
+    """
+    Decides per call whether it is new, changed or unchanged since the last run.
+
+    Stored fingerprints are loaded in batches per results page, and the fingerprints of
+    stored calls are saved in one batch per category.
+    """
+
+    def __init__(self):
+        self.stored = {}
+        self.card_hashes = {}
+        self.pending = []
+        # Identifiers whose details were fetched and found unchanged
+        self.verified = []
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+
+    async def load(self, identifiers: list):
+        missing = [identifier for identifier in identifiers if identifier not in self.stored]
+        if missing:
+            self.stored.update(await storage.fetch_call_fingerprints(missing))
+
+    def card_unchanged(self, card: dict) -> bool:
+        """
+        Returns True (and counts the call as unchanged) if the card matches the last stored run
+        and the details were fetched within SCRAPER_DETAIL_TTL_DAYS, in which case its details
+        page does not need to be fetched.
+        """
+        card_hash = card_fingerprint(card)
+        self.card_hashes[card["Identifier"]] = card_hash
+        stored = self.stored.get(card["Identifier"])
+        fresh = (stored is not None and stored.get("verified_at") is not None and
+                 datetime.now(timezone.utc) - stored["verified_at"] < timedelta(days=SCRAPER_DETAIL_TTL_DAYS))
+        if fresh and stored["card_hash"] == card_hash:
+            self.unchanged += 1
+            return True
+        return False
+
+    def record_changed(self, record: dict) -> bool:
+        """
+        Returns True (and counts the call as new or changed) if the record has to be written.
+        """
+        content_hash = content_fingerprint(record)
+        stored = self.stored.get(record["identifier"])
+        if stored and stored["content_hash"] == content_hash:
+            self.unchanged += 1
+            self.verified.append(record["identifier"])
+            return False
+        if stored:
+            self.changed += 1
+        else:
+            self.new += 1
+        return True
+
+    def mark_stored(self, record: dict):
+        identifier = record["identifier"]
+        card_hash = self.card_hashes.get(identifier, "")
+        content_hash = content_fingerprint(record)
+        self.stored[identifier] = {"card_hash": card_hash, "content_hash": content_hash,
+                                   "verified_at": datetime.now(timezone.utc)}
+        self.pending.append((identifier, card_hash, content_hash))
+
+    async def save(self):
+        pending, self.pending = self.pending, []
+        verified, self.verified = self.verified, []
+        await storage.store_call_fingerprints(pending)
+        await storage.touch_call_fingerprints(verified)
+
+    def summary(self) -> dict:
+        return {"new": self.new, "changed": self.changed, "unchanged": self.unchanged}
+
+    def print_summary(self):
+        print(f"Incremental run: {self.new} new, {self.changed} changed, {self.unchanged} unchanged calls.")
@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+
+# How many scrape jobs may run at the same time; further jobs wait in the queue
+SCRAPE_MAX_CONCURRENT_JOBS = int(os.getenv("SCRAPE_MAX_CONCURRENT_JOBS", "1"))
+
+# How many finished or failed jobs are kept for the status endpoints
+SCRAPE_JOB_HISTORY = int(os.getenv("SCRAPE_JOB_HISTORY", "50"))
+
+# How many progress events of a job are replayed to a client that connects late
+SCRAPE_JOB_EVENT_BACKLOG = int(os.getenv("SCRAPE_JOB_EVENT_BACKLOG", "200"))
+
+ALL_CATEGORIES = "0"
+
+# Events after which a job's progress stream ends
+final_events = ("job_finished", "job_failed")
+
+
+class ScrapeJob:
+    """
+    A scrape of some categories for one combination of call statuses.
+
+    Queued jobs still take in categories of new requests with the same statuses; once a
+    job is running its categories are fixed.
+    """
+
+    def __init__(self, job_id: int, statuses: tuple, categories: list):
+        self.id = job_id
+        # (closed, forthcoming, open)
+        self.statuses = statuses
+        self.categories = list(categories)
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.run_id = None
+        self.current_category = None
+        self.current_page = None
+        self.categories_done = 0
+        self.calls_stored = 0
+        self.error = None
+        self.task = None
+        self.events = deque(maxlen=SCRAPE_JOB_EVENT_BACKLOG)
+        self.subscribers = set()
+
+    def covers(self, categories: list) -> bool:
+        return ALL_CATEGORIES in self.categories or set(categories) <= set(self.categories)
+
+    def add_categories(self, categories: list):
+        if ALL_CATEGORIES in categories:
+            self.categories = [ALL_CATEGORIES]
+        elif ALL_CATEGORIES not in self.categories:
+            self.categories += [category for category in categories if category not in self.categories]
+
+    def update_progress(self, event: dict):
+        """
+        Progress callback handed to the scraper (see progress.py).
+        """
+        self.publish(event)
+        name = event["event"]
+        if name == "category_started":
+            if self.current_category is not None and self.current_category != event["category"]:
+                self.categories_done += 1
+            self.current_category = event["category"]
+            self.current_page = None
+        elif name == "page_parsed":
+            self.current_category = event["category"]
+            self.current_page = event["page"]
+        elif name == "calls_stored":
+            self.calls_stored += event["count"]
+        elif name in ("run_started", "run_finished", "run_failed"):
+            self.run_id = event.get("run_id")
+
+    def publish(self, event: dict):
+        """
+        Sends a progress event to every listener of this job.
+        """
+        event = {"job_id": self.id, **event}
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    async def listen(self):
+        """
+        Yields this job's progress events, starting with the ones already sent, until the job ends.
+        """
+        queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        self.subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["event"] in final_events:
+                    return
+        finally:
+            self.subscribers.discard(queue)
+
+    def elapsed_seconds(self):
+        if self.started_at is None:
+            return None
+        return round((self.finished_at or time.time()) - self.started_at, 1)
+
+    def status(self, queue_position: int = None) -> dict:
+        closed, forthcoming, open_ = self.statuses
+        return {
+            "id": self.id,
+            "state": self.state,
+            "closed": closed,
+            "forthcoming": forthcoming,
+            "open": open_,
+            "categories": self.categories,
+            "queue_position": queue_position,
+            "current_category": self.current_category,
+            "current_page": self.current_page,
+            "categories_done": self.categories_done,
+            "calls_stored": self.calls_stored,
+            "run_id": self.run_id,
+            "waiting_seconds": round((self.started_at or time.time()) - self.created_at, 1),
+            "elapsed_seconds": self.elapsed_seconds(),
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs scrape jobs in the background, at most `max_concurrent` at a time.
+
+    Requests are single-flight: a request whose categories are already being scraped with
+    the same statuses joins that job, and the rest of its categories are merged into the
+    queued job for those statuses, so no page is crawled twice for overlapping requests.
+    """
+
+    def __init__(self, runner, max_concurrent: int = SCRAPE_MAX_CONCURRENT_JOBS):
+        self.runner = runner
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.jobs = {}
+        self.ids = itertools.count(1)
+
+    def submit(self, closed: bool, forthcoming: bool, open_: bool, categories: list) -> ScrapeJob:
+        """
+        Returns the job that scrapes `categories`, joining or extending an existing job when possible.
+        """
+        statuses = (bool(closed), bool(forthcoming), bool(open_))
+        categories = [ALL_CATEGORIES] if ALL_CATEGORIES in categories else list(dict.fromkeys(categories))
+
+        same_statuses = [job for job in self.jobs.values()
+                         if job.statuses == statuses and job.state in ("queued", "running")]
+
+        running = [job for job in same_statuses if job.state == "running"]
+        for job in running:
+            if job.covers(categories):
+                print(f"Scrape request joins running job {job.id}")
+                return job
+
+        if ALL_CATEGORIES not in categories:
+            # Categories already being scraped are left out; the rest goes to a queued job
+            covering = [job for job in running if set(categories) & set(job.categories)]
+            categories = [category for category in categories if not any(job.covers([category]) for job in running)]
+            if covering and not categories:
+                # Several running jobs cover the request together
+                print(f"Scrape request joins running jobs {[job.id for job in covering]}")
+                return covering[0]
+
+        for job in same_statuses:
+            if job.state == "queued":
+                job.add_categories(categories)
+                print(f"Scrape request merged into queued job {job.id}: {job.categories}")
+                return job
+
+        job = ScrapeJob(next(self.ids), statuses, categories)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self.run(job))
+        print(f"Scrape job {job.id} queued: {categories}")
+        self.prune()
+        return job
+
+    async def run(self, job: ScrapeJob):
+        async with self.semaphore:
+            job.state = "running"
+            job.started_at = time.time()
+            job.publish({"event": "job_started", "time": job.started_at, "categories": job.categories})
+            closed, forthcoming, open_ = job.statuses
+            try:
+                await self.runner(
+                    closed_option=closed,
+                    forthcoming_option=forthcoming,
+                    open_option=open_,
+                    desired_category=job.categories,
+                    on_progress=job.update_progress
+                )
+                job.state = "finished"
+            except asyncio.CancelledError:
+                job.state = "failed"
+                job.error = "Cancelled on shutdown"
+                raise
+            except Exception as e:
+                job.state = "failed"
+                job.error = str(e)
+                print(f"Scrape job {job.id} failed: {e}")
+            finally:
+                job.finished_at = time.time()
+                job.publish({"event": f"job_{job.state}", "time": job.finished_at,
+                             "calls_stored": job.calls_stored, "error": job.error})
+
+    def prune(self):
+        done = [job for job in self.jobs.values() if job.state in ("finished", "failed")]
+        for job in done[:max(0, len(done) - SCRAPE_JOB_HISTORY)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id: int):
+        return self.jobs.get(job_id)
+
+    def queue_position(self, job: ScrapeJob):
+        """
+        1-based position among the queued jobs, or None when the job is not queued.
+        """
+        if job.state != "queued":
+            return None
+        queued = [other for other in self.jobs.values() if other.state == "queued"]
+        return queued.index(job) + 1
+
+    def status(self, job: ScrapeJob) -> dict:
+        return job.status(self.queue_position(job))
+
+    def statuses(self) -> list:
+        return [self.status(job) for job in reversed(list(self.jobs.values()))]
+
+    async def stop(self):
+        """
+        Cancels unfinished jobs on shutdown; their scrape runs stay resumable.
+        """
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
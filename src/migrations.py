@@ -0,0 +1,406 @@
+"""
+Database schema of the app, applied in order at startup.
+
+Every migration runs once, in its own transaction, and is recorded in the
+schema_migrations table. Add new schema changes as new migrations at the end of
+`migrations`; never edit one that has been applied.
+
+Usage (from the src folder):
+    python migrations.py            apply pending migrations
+    python migrations.py check      check with EXPLAIN that the search queries use their indexes
+"""
+import asyncio
+import json
+import sys
+from database import get_pool, build_call_filters, keyword_category_ids
+
+# Serializes migrations of app instances starting at the same time
+migration_lock_id = 4242001
+
+migrations = [
+    (1, "calls and categories", """
+        CREATE TABLE IF NOT EXISTS categories (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT
+        );
+        CREATE TABLE IF NOT EXISTS scraped_calls (
+            id SERIAL PRIMARY KEY,
+            identifier TEXT NOT NULL UNIQUE,
+            title TEXT,
+            action_type TEXT,
+            budget TEXT,
+            funding_per_project TEXT,
+            deadline_primary DATE,
+            deadline_secondary DATE,
+            opening_date DATE,
+            accepted_projects TEXT,
+            probability_rate TEXT,
+            link TEXT,
+            category_id INTEGER REFERENCES categories(id),
+            status TEXT,
+            funding_rate INTEGER
+        );
+    """),
+    (2, "category cache, fingerprints and scrape runs", """
+        CREATE TABLE IF NOT EXISTS category_cache (
+            status_key TEXT PRIMARY KEY,
+            categories TEXT[] NOT NULL,
+            fetched_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS call_fingerprints (
+            identifier TEXT PRIMARY KEY,
+            card_hash TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS scrape_runs (
+            id SERIAL PRIMARY KEY,
+            params_key TEXT NOT NULL,
+            params JSONB NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            error TEXT,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ
+        );
+        CREATE TABLE IF NOT EXISTS scrape_run_categories (
+            run_id INTEGER NOT NULL REFERENCES scrape_runs(id) ON DELETE CASCADE,
+            category TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            last_page INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (run_id, category)
+        );
+    """),
+    (3, "search indexes", """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+        -- Keyword search: lower(col) ILIKE '%' || $1 || '%'
+        CREATE INDEX IF NOT EXISTS scraped_calls_identifier_trgm
+            ON scraped_calls USING gin (lower(identifier) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS scraped_calls_title_trgm
+            ON scraped_calls USING gin (lower(title) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS categories_name_trgm
+            ON categories USING gin (lower(name) gin_trgm_ops);
+
+        -- Filters: lower(status) = ANY($1), lower(probability_rate) = $1, lower(c.name) = lower($1)
+        CREATE INDEX IF NOT EXISTS scraped_calls_status_lower ON scraped_calls (lower(status));
+        CREATE INDEX IF NOT EXISTS scraped_calls_probability_lower ON scraped_calls (lower(probability_rate));
+        CREATE INDEX IF NOT EXISTS categories_name_lower ON categories (lower(name));
+
+        -- Join and per-category lookups
+        CREATE INDEX IF NOT EXISTS scraped_calls_category_id ON scraped_calls (category_id);
+    """),
+    (4, "call descriptions and full-text search", """
+        ALTER TABLE scraped_calls ADD COLUMN IF NOT EXISTS description TEXT;
+
+        -- Identifier and title weigh more than the description in ts_rank
+        ALTER TABLE scraped_calls ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(identifier, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED;
+
+        CREATE INDEX IF NOT EXISTS scraped_calls_search_vector ON scraped_calls USING gin (search_vector);
+    """),
+    (5, "numeric budget, funding and grant columns", """
+        ALTER TABLE scraped_calls
+            ADD COLUMN IF NOT EXISTS budget_amount BIGINT,
+            ADD COLUMN IF NOT EXISTS funding_min BIGINT,
+            ADD COLUMN IF NOT EXISTS funding_max BIGINT,
+            ADD COLUMN IF NOT EXISTS grant_count INTEGER;
+
+        -- Backfill the stored calls like the scraper parses new ones
+        UPDATE scraped_calls SET
+            budget_amount = nullif(regexp_replace(budget, '[^0-9]', '', 'g'), '')::bigint,
+            grant_count = substring(accepted_projects FROM '[0-9]+')::integer,
+            funding_min = CASE
+                WHEN funding_per_project ~ 'Min:' THEN nullif(regexp_replace(
+                    substring(funding_per_project FROM 'Min:([^M]*)'), '[^0-9]', '', 'g'), '')::bigint
+                ELSE nullif(regexp_replace(funding_per_project, '[^0-9]', '', 'g'), '')::bigint
+            END,
+            funding_max = CASE
+                WHEN funding_per_project ~ 'Max:' THEN nullif(regexp_replace(
+                    substring(funding_per_project FROM 'Max:(.*)$'), '[^0-9]', '', 'g'), '')::bigint
+                ELSE nullif(regexp_replace(funding_per_project, '[^0-9]', '', 'g'), '')::bigint
+            END;
+
+        -- Funding range filters
+        CREATE INDEX IF NOT EXISTS scraped_calls_funding_min ON scraped_calls (funding_min);
+        CREATE INDEX IF NOT EXISTS scraped_calls_funding_max ON scraped_calls (funding_max);
+
+        -- Keyset pagination by budget and funding (see call_sort_keys in database.py)
+        CREATE INDEX IF NOT EXISTS scraped_calls_budget_sort
+            ON scraped_calls ((coalesce(budget_amount, 9223372036854775807)), identifier);
+        CREATE INDEX IF NOT EXISTS scraped_calls_funding_sort
+            ON scraped_calls ((coalesce(funding_max, 9223372036854775807)), identifier);
+    """),
+    (6, "call aggregates", """
+        -- Same as extract_cluster in api.py for Horizon calls (HORIZON-CL5-... -> CL5);
+        -- other programmes are grouped by their prefix
+        CREATE OR REPLACE FUNCTION call_cluster(identifier TEXT) RETURNS TEXT
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT CASE
+                WHEN upper(split_part(identifier, '-', 1)) = 'HORIZON' AND split_part(identifier, '-', 2) <> ''
+                    THEN upper(split_part(identifier, '-', 2))
+                ELSE upper(split_part(identifier, '-', 1))
+            END
+        $$;
+
+        -- next_deadline is relative to the last refresh, which follows every ingest
+        CREATE MATERIALIZED VIEW IF NOT EXISTS call_aggregates AS
+        SELECT
+            call_cluster(sc.identifier) AS cluster,
+            c.name AS category,
+            coalesce(lower(sc.status), 'unknown') AS status,
+            count(*) AS call_count,
+            sum(sc.budget_amount) AS total_budget,
+            percentile_cont(0.5) WITHIN GROUP (ORDER BY sc.budget_amount) AS median_budget,
+            min(sc.deadline_primary) FILTER (WHERE sc.deadline_primary >= current_date) AS next_deadline,
+            count(*) FILTER (WHERE lower(sc.probability_rate) = 'low') AS low_probability,
+            count(*) FILTER (WHERE lower(sc.probability_rate) = 'medium') AS medium_probability,
+            count(*) FILTER (WHERE lower(sc.probability_rate) = 'high') AS high_probability,
+            count(*) FILTER (WHERE lower(sc.probability_rate) NOT IN ('low', 'medium', 'high')
+                             OR sc.probability_rate IS NULL) AS unknown_probability
+        FROM scraped_calls AS sc
+        INNER JOIN categories AS c ON sc.category_id = c.id
+        GROUP BY 1, 2, 3;
+
+        -- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+        CREATE UNIQUE INDEX IF NOT EXISTS call_aggregates_key ON call_aggregates (cluster, category, status);
+    """),
+    (7, "call history", """
+        -- Append-only: one row per insert or change of a call, holding only the new values
+        -- of the fields that changed (all fields for an insert)
+        CREATE TABLE IF NOT EXISTS call_history (
+            id BIGSERIAL PRIMARY KEY,
+            identifier TEXT NOT NULL,
+            change TEXT NOT NULL,
+            changes JSONB NOT NULL,
+            changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS call_history_identifier ON call_history (identifier, changed_at);
+        CREATE INDEX IF NOT EXISTS call_history_cluster ON call_history (call_cluster(identifier), changed_at);
+
+        CREATE OR REPLACE FUNCTION record_call_history() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed JSONB;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                changed := to_jsonb(NEW) - 'id' - 'search_vector';
+            ELSE
+                SELECT jsonb_object_agg(new_field.key, new_field.value) INTO changed
+                FROM jsonb_each(to_jsonb(NEW) - 'id' - 'search_vector') AS new_field
+                INNER JOIN jsonb_each(to_jsonb(OLD)) AS old_field ON old_field.key = new_field.key
+                WHERE new_field.value IS DISTINCT FROM old_field.value;
+            END IF;
+
+            IF changed IS NOT NULL THEN
+                INSERT INTO call_history (identifier, change, changes)
+                VALUES (NEW.identifier, lower(TG_OP), changed);
+            END IF;
+            RETURN NULL;
+        END
+        $$;
+
+        DROP TRIGGER IF EXISTS scraped_calls_history ON scraped_calls;
+        CREATE TRIGGER scraped_calls_history
+            AFTER INSERT OR UPDATE ON scraped_calls
+            FOR EACH ROW EXECUTE FUNCTION record_call_history();
+
+        -- History starts with the calls stored so far
+        INSERT INTO call_history (identifier, change, changes)
+        SELECT identifier, 'insert', to_jsonb(sc) - 'id' - 'search_vector'
+        FROM scraped_calls AS sc;
+    """),
+    (8, "call history tombstones", """
+        -- Deleted calls get a tombstone row without fields, so comparisons see them as removed
+        CREATE OR REPLACE FUNCTION record_call_history() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed JSONB;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO call_history (identifier, change, changes)
+                VALUES (OLD.identifier, 'delete', '{}'::jsonb);
+                RETURN NULL;
+            ELSIF TG_OP = 'INSERT' THEN
+                changed := to_jsonb(NEW) - 'id' - 'search_vector';
+            ELSE
+                SELECT jsonb_object_agg(new_field.key, new_field.value) INTO changed
+                FROM jsonb_each(to_jsonb(NEW) - 'id' - 'search_vector') AS new_field
+                INNER JOIN jsonb_each(to_jsonb(OLD)) AS old_field ON old_field.key = new_field.key
+                WHERE new_field.value IS DISTINCT FROM old_field.value;
+            END IF;
+
+            IF changed IS NOT NULL THEN
+                INSERT INTO call_history (identifier, change, changes)
+                VALUES (NEW.identifier, lower(TG_OP), changed);
+            END IF;
+            RETURN NULL;
+        END
+        $$;
+
+        DROP TRIGGER IF EXISTS scraped_calls_history ON scraped_calls;
+        CREATE TRIGGER scraped_calls_history
+            AFTER INSERT OR UPDATE OR DELETE ON scraped_calls
+            FOR EACH ROW EXECUTE FUNCTION record_call_history();
+    """),
+    (9, "call fingerprint verification time", """
+        -- When the details of a call were last fetched, whether or not they had changed
+        ALTER TABLE call_fingerprints ADD COLUMN IF NOT EXISTS verified_at TIMESTAMPTZ;
+        UPDATE call_fingerprints SET verified_at = updated_at WHERE verified_at IS NULL;
+        ALTER TABLE call_fingerprints
+            ALTER COLUMN verified_at SET DEFAULT now(),
+            ALTER COLUMN verified_at SET NOT NULL;
+    """),
+    (10, "amounts backfilled like parse_amount", """
+        -- Migration 5 stripped every non-digit, so "12500000.00" became 1250000000.
+        -- Parse the amounts again the way parse_amount in scraper.py does: a dot or comma
+        -- followed by exactly three digits separates thousands, any other one is the
+        -- decimal separator, and the amount is rounded to whole euros.
+        CREATE OR REPLACE FUNCTION backfill_parse_amount(amount TEXT) RETURNS BIGINT
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT CASE
+                WHEN number = '' OR number LIKE '%.%.%' THEN NULL
+                ELSE round(number::numeric)::bigint
+            END
+            FROM (
+                SELECT replace(regexp_replace(
+                    btrim(regexp_replace(amount, '[^0-9.,]', '', 'g'), '.,'),
+                    '[.,]([0-9]{3})(?![0-9])', '\\1', 'g'), ',', '.') AS number
+            ) AS parsed
+        $$;
+
+        -- The history keeps what was scraped; a reparse is not a change of the calls
+        ALTER TABLE scraped_calls DISABLE TRIGGER scraped_calls_history;
+        UPDATE scraped_calls SET
+            budget_amount = backfill_parse_amount(budget),
+            funding_min = CASE
+                WHEN funding_per_project ~ 'Min:' THEN backfill_parse_amount(
+                    substring(funding_per_project FROM 'Min:([^M]*)'))
+                ELSE backfill_parse_amount(funding_per_project)
+            END,
+            funding_max = CASE
+                WHEN funding_per_project ~ 'Max:' THEN backfill_parse_amount(
+                    substring(funding_per_project FROM 'Max:(.*)$'))
+                ELSE backfill_parse_amount(funding_per_project)
+            END;
+        ALTER TABLE scraped_calls ENABLE TRIGGER scraped_calls_history;
+
+        DROP FUNCTION backfill_parse_amount(TEXT);
+        REFRESH MATERIALIZED VIEW call_aggregates;
+    """),
+    (11, "drop unused category name indexes", """
+        -- Categories are looked up by id or through the in-memory registry, and the keyword
+        -- search reads the few hundred category names with a sequential scan
+        DROP INDEX IF EXISTS categories_name_lower;
+        DROP INDEX IF EXISTS categories_name_trgm;
+    """),
+]
+
+
+async def run_migrations():
+    """
+    Applies the migrations that are not recorded in schema_migrations yet.
+    """
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1)", migration_lock_id)
+        try:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+            applied = {row["version"] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+
+            for version, name, sql in migrations:
+                if version in applied:
+                    continue
+                async with conn.transaction():
+                    await conn.execute(sql)
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", version, name
+                    )
+                print(f"Applied migration {version}: {name}")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", migration_lock_id)
+
+
+def index_checks() -> list:
+    """
+    Returns (description, filters, indexes the plan must use) for the filters of the results
+    and search pages. The queries are the count queries the app runs, built like
+    fetch_calls_page builds them, so the check covers the SQL that is actually executed.
+    """
+    return [
+        ("keyword", dict(keyword="electrolyser"), ["scraped_calls_identifier_trgm", "scraped_calls_title_trgm"]),
+        ("status filter", dict(status=["open for submission", "forthcoming"]), ["scraped_calls_status_lower"]),
+        ("probability filter", dict(probability="high"), ["scraped_calls_probability_lower"]),
+        ("full-text search", dict(keyword="clean hydrogen", fulltext=True), ["scraped_calls_search_vector"]),
+        ("minimum funding", dict(min_funding=5000000), ["scraped_calls_funding_max"]),
+        ("maximum funding", dict(max_funding=500000), ["scraped_calls_funding_min"]),
+    ]
+
+
+def plan_indexes(plan: dict) -> set:
+    """
+    Returns the names of all indexes used anywhere in an EXPLAIN (FORMAT JSON) plan.
+    """
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        indexes |= plan_indexes(child)
+    return indexes
+
+
+async def check_index_usage() -> list:
+    """
+    Runs EXPLAIN on the search queries and reports whether each uses its expected indexes.
+
+    The planner picks the plan it would pick for the app, so the check needs a database
+    with realistic row counts and statistics: on small tables a sequential scan is cheaper
+    and the check fails.
+
+    Returns:
+        A list of {"check", "expected", "used", "ok"} dictionaries.
+    """
+    results = []
+    pool_obj = await get_pool()
+    async with pool_obj.acquire() as conn:
+        for description, filters, expected in index_checks():
+            filters = {"keyword": "", "status": [], "probability": "all", "fulltext": False, **filters}
+            if filters["keyword"] and not filters["fulltext"]:
+                filters["category_ids"] = await keyword_category_ids(conn, filters["keyword"])
+            sql, params = build_call_filters(**filters)
+            explained = await conn.fetchval(f"EXPLAIN (FORMAT JSON) SELECT count(*) {sql}", *params)
+            plan = (json.loads(explained) if isinstance(explained, str) else explained)[0]["Plan"]
+            used = plan_indexes(plan)
+            results.append({
+                "check": description,
+                "expected": expected,
+                "used": sorted(used),
+                "ok": set(expected) <= used
+            })
+    return results
+
+
+async def main(command: str) -> int:
+    await run_migrations()
+    if command != "check":
+        return 0
+
+    results = await check_index_usage()
+    for result in results:
+        print(f"{'ok  ' if result['ok'] else 'FAIL'} {result['check']}: uses {', '.join(result['used']) or 'no index'}")
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "migrate")))
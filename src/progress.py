@@ -0,0 +1,28 @@
+import time
+from contextvars import ContextVar
+
+# Callback receiving the progress events of the current scrape run. Kept in a context
+# variable so concurrent runs and their tasks each report to their own listener.
+current_progress_callback: ContextVar = ContextVar("current_progress_callback", default=None)
+
+
+def set_progress_callback(callback):
+    """
+    Sets the callback that receives the progress events of the current run.
+    """
+    current_progress_callback.set(callback)
+
+
+def report_progress(event: str, **data):
+    """
+    Reports a progress event of the current run, e.g. category_started, page_parsed,
+    calls_stored, run_finished or run_failed.
+    """
+    callback = current_progress_callback.get()
+    if callback is None:
+        return
+    try:
+        callback({"event": event, "time": time.time(), **data})
+    except Exception as e:
+        # A broken listener must never break the scrape
+        print(f"Error reporting progress event {event}: {e}")
@@ -0,0 +1,141 @@
+import os
+import time
+from contextvars import ContextVar
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Upper bound for waits on a real page signal (results changing, network going idle, ...)
+READINESS_TIMEOUT_MS = int(os.getenv("SCRAPER_READINESS_TIMEOUT_MS", "30000"))
+
+# Upper bound for waits inside dropdown scroll loops. When nothing changes within this time
+# the dropdown is considered fully loaded, so it is kept short.
+DROPDOWN_SETTLE_TIMEOUT_MS = int(os.getenv("SCRAPER_DROPDOWN_SETTLE_TIMEOUT_MS", "2000"))
+
+result_card_links_js = """
+() => Array.from(document.querySelectorAll('sedia-result-card a.eui-u-text-link'))
+    .map(a => a.getAttribute('href'))
+    .join('|')
+"""
+
+# Wait timings of the current scrape run: {label: [(seconds, timed_out), ...]}.
+# Kept in a context variable so concurrent runs and their tasks each record into their own dict.
+current_wait_timings: ContextVar = ContextVar("current_wait_timings", default=None)
+
+
+def start_wait_recording() -> dict:
+    """
+    Starts a fresh wait timing record for the current run and returns it.
+    """
+    timings = {}
+    current_wait_timings.set(timings)
+    return timings
+
+
+def record_wait(label: str, seconds: float, timed_out: bool = False):
+    timings = current_wait_timings.get()
+    if timings is None:
+        return
+    timings.setdefault(label, []).append((seconds, timed_out))
+
+
+def summarize_wait_timings(timings: dict) -> dict:
+    """
+    Aggregates the recorded waits per label into count, total, mean, max and timeouts.
+    """
+    summary = {}
+    for label, waits in timings.items():
+        durations = [seconds for seconds, _ in waits]
+        summary[label] = {
+            "count": len(durations),
+            "total": round(sum(durations), 3),
+            "mean": round(sum(durations) / len(durations), 3),
+            "max": round(max(durations), 3),
+            "timeouts": sum(1 for _, timed_out in waits if timed_out)
+        }
+    return summary
+
+
+def print_wait_summary(timings: dict):
+    summary = summarize_wait_timings(timings)
+    print("Readiness wait timings (seconds):")
+    for label, stats in sorted(summary.items(), key=lambda item: item[1]["total"], reverse=True):
+        print(f"  {label}: count={stats['count']} total={stats['total']} mean={stats['mean']} "
+              f"max={stats['max']} timeouts={stats['timeouts']}")
+
+
+async def timed_wait(label: str, awaitable) -> bool:
+    """
+    Awaits a Playwright wait and records how long it took.
+
+    A timeout is recorded and logged but not raised, so a missing signal degrades to a
+    bounded delay instead of aborting the scrape.
+
+    Returns:
+        True if the signal arrived, False if the wait timed out.
+    """
+    start = time.perf_counter()
+    timed_out = False
+    try:
+        await awaitable
+    except PlaywrightTimeoutError:
+        timed_out = True
+        print(f"Readiness wait '{label}' timed out.")
+    finally:
+        record_wait(label, time.perf_counter() - start, timed_out)
+    return not timed_out
+
+
+async def get_result_card_key(page) -> str:
+    """
+    Returns a key identifying the result cards currently shown (their detail links).
+    """
+    return await page.evaluate(result_card_links_js)
+
+
+async def wait_for_results_change(page, previous_key: str, label: str = "results_change",
+                                  timeout: int = READINESS_TIMEOUT_MS) -> bool:
+    """
+    Waits until the set of 'sedia-result-card' links differs from `previous_key` and is not empty.
+    """
+    return await timed_wait(label, page.wait_for_function(
+        f"""(previous) => {{
+            const key = ({result_card_links_js})();
+            return key !== '' && key !== previous;
+        }}""",
+        arg=previous_key,
+        timeout=timeout
+    ))
+
+
+async def wait_for_network_idle(page, label: str = "network_idle", timeout: int = READINESS_TIMEOUT_MS) -> bool:
+    return await timed_wait(label, page.wait_for_load_state("networkidle", timeout=timeout))
+
+
+async def wait_for_selector_ready(page, selector: str, label: str, timeout: int = READINESS_TIMEOUT_MS) -> bool:
+    return await timed_wait(label, page.wait_for_selector(selector, timeout=timeout))
+
+
+async def wait_for_dropdown_growth(dropdown_container, previous_count: int, label: str = "dropdown_growth",
+                                   timeout: int = DROPDOWN_SETTLE_TIMEOUT_MS) -> bool:
+    """
+    Waits until the dropdown holds more than `previous_count` items.
+    """
+    handle = await dropdown_container.element_handle()
+    return await timed_wait(label, dropdown_container.page.wait_for_function(
+        "([node, count]) => node.querySelectorAll('button.eui-dropdown-item').length > count",
+        arg=[handle, previous_count],
+        timeout=timeout
+    ))
+
+
+async def wait_for_dropdown_scroll(dropdown_container, previous_scroll_top: float, label: str = "dropdown_scroll",
+                                   timeout: int = DROPDOWN_SETTLE_TIMEOUT_MS) -> bool:
+    """
+    Waits until a scroll inside the dropdown has been applied and the rendered items have settled.
+    """
+    handle = await dropdown_container.element_handle()
+    return await timed_wait(label, dropdown_container.page.wait_for_function(
+        """([node, previous]) => node.scrollTop !== previous
+            || node.scrollTop + node.clientHeight >= node.scrollHeight""",
+        arg=[handle, previous_scroll_top],
+        timeout=timeout
+    ))
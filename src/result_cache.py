@@ -0,0 +1,101 @@
+import json
+import os
+from collections import OrderedDict
+
+# Memory budget of the cached query results, in bytes (estimated from their JSON size)
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Bumped by the ingest path after calls are written; results of older generations are stale
+data_generation = 0
+
+
+def bump_generation():
+    """
+    Marks all cached results as stale. Call it after calls were written to the database.
+    """
+    global data_generation
+    data_generation += 1
+    result_cache.clear()
+
+
+def estimate_size(value) -> int:
+    return len(json.dumps(value, default=str))
+
+
+class ResultCache:
+    """
+    LRU cache of query results with a memory cap.
+
+    Keys include the data generation, so a bump makes every cached result miss even
+    before it is cleared.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_or_load(self, key: tuple, load):
+        """
+        Returns the cached result of `key`, or awaits `load()` and caches its result.
+        """
+        key = (data_generation,) + key
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+
+        self.misses += 1
+        generation = data_generation
+        value = await load()
+        if generation == data_generation:
+            # Results loaded while an ingest bumped the generation may already be stale
+            self.put(key, value)
+        return value
+
+    def put(self, key: tuple, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "generation": data_generation,
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions
+        }
+
+
+result_cache = ResultCache()
+
+
+def filter_key(keyword: str, statuses: list, probability: str) -> tuple:
+    """
+    Normalizes search filters so equivalent requests share a cache entry.
+    """
+    return (
+        keyword.strip().lower(),
+        tuple(sorted({status.strip().lower() for status in statuses if status.strip()})),
+        (probability or "all").lower()
+    )
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from datetime import date
+from storage import storage
+
+# Refresh open and forthcoming calls in the background
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
+
+# Every category is refreshed at least once per window; refreshes are spread evenly across it
+SCHEDULER_WINDOW_HOURS = float(os.getenv("SCHEDULER_WINDOW_HOURS", "24"))
+
+# Categories with a call deadline within SCHEDULER_URGENT_DAYS are refreshed this often instead
+SCHEDULER_URGENT_INTERVAL_HOURS = float(os.getenv("SCHEDULER_URGENT_INTERVAL_HOURS", "6"))
+SCHEDULER_URGENT_DAYS = int(os.getenv("SCHEDULER_URGENT_DAYS", "14"))
+
+# Shortest gap between two scheduled refreshes
+SCHEDULER_MIN_GAP_SECONDS = float(os.getenv("SCHEDULER_MIN_GAP_SECONDS", "60"))
+
+# Call statuses kept fresh by the scheduler
+scheduled_statuses = ["open for submission", "forthcoming"]
+
+
+class RefreshScheduler:
+    """
+    Keeps open and forthcoming calls fresh without waiting for a user to start a scrape.
+
+    One category is refreshed at a time, with the gaps sized so that all due refreshes fit
+    evenly in the window. Categories with close deadlines come due more often than dormant
+    ones. Refreshes go through the job manager, so they merge with user requests.
+    """
+
+    def __init__(self, job_manager, fetch_categories,
+                 window_hours: float = SCHEDULER_WINDOW_HOURS,
+                 urgent_interval_hours: float = SCHEDULER_URGENT_INTERVAL_HOURS,
+                 urgent_days: int = SCHEDULER_URGENT_DAYS):
+        self.job_manager = job_manager
+        # Returns the current categories of open and forthcoming calls
+        self.fetch_categories = fetch_categories
+        self.window = window_hours * 3600
+        self.urgent_interval = min(urgent_interval_hours * 3600, self.window)
+        self.urgent_days = urgent_days
+        # category -> time.time() of its last refresh
+        self.last_refreshed = {}
+        self.next_refresh_at = None
+        self.task = None
+
+    async def start(self):
+        try:
+            for category, scraped_at in (await storage.fetch_category_last_scraped()).items():
+                self.last_refreshed[category] = scraped_at.timestamp()
+        except Exception as e:
+            print(f"Error loading last scrape times: {e}")
+        self.task = asyncio.create_task(self.loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def interval(self, category: str, deadlines: dict) -> float:
+        deadline = deadlines.get(category)
+        if deadline is not None and (deadline - date.today()).days <= self.urgent_days:
+            return self.urgent_interval
+        return self.window
+
+    async def plan(self):
+        """
+        Returns the categories due for a refresh, most overdue first, and the gap until the next refresh.
+        """
+        categories = [category for category in await self.fetch_categories() if category != "0"]
+        deadlines = await storage.fetch_category_next_deadlines(scheduled_statuses)
+        now = time.time()
+
+        intervals = {category: self.interval(category, deadlines) for category in categories}
+        overdue = {category: now - self.last_refreshed.get(category, 0) - interval
+                   for category, interval in intervals.items()}
+        due = sorted((category for category in categories if overdue[category] >= 0),
+                     key=lambda category: overdue[category], reverse=True)
+
+        # Refreshes per window if every category is refreshed at its own interval
+        refreshes = sum(self.window / interval for interval in intervals.values())
+        gap = max(self.window / refreshes if refreshes else self.window, SCHEDULER_MIN_GAP_SECONDS)
+        return due, gap
+
+    async def loop(self):
+        while True:
+            gap = SCHEDULER_MIN_GAP_SECONDS
+            try:
+                due, gap = await self.plan()
+                if due:
+                    category = due[0]
+                    job = self.job_manager.submit(False, True, True, [category])
+                    self.last_refreshed[category] = time.time()
+                    print(f"Scheduled refresh of {category} (job {job.id}), {len(due) - 1} more due")
+            except Exception as e:
+                print(f"Error in scheduled refresh: {e}")
+            self.next_refresh_at = time.time() + gap
+            await asyncio.sleep(gap)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.task is not None,
+            "window_hours": self.window / 3600,
+            "urgent_interval_hours": self.urgent_interval / 3600,
+            "categories_tracked": len(self.last_refreshed),
+            "next_refresh_in_seconds": (round(max(self.next_refresh_at - time.time(), 0))
+                                        if self.next_refresh_at else None)
+        }
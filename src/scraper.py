@@ -1,6 +1,5 @@
 #TODO
 # - Draft reader (pdf)
-# - Comparison (2022 v 2023 for one category) (for later phase)
 # - Sorting realtime on table and export it like that (sort by deadline)
 # - Funding intensity rate (funding rate in description)
 
@@ -10,11 +9,24 @@ from bs4 import BeautifulSoup
 import pandas as pd
 import re
 import os
+import time
 from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 import json
-from database import store_call, store_category, get_category_id
+from storage import storage
+from category_registry import register_categories, get_category_id
+from browser_profile import BrowserProfile, SCRAPER_LEAN_BROWSER, SCRAPER_RECORD_HAR_DIR, SCRAPER_REPLAY_HAR_DIR
+from incremental import ChangeTracker, SCRAPER_INCREMENTAL
+from checkpoints import RunCheckpoint, run_params
+from progress import set_progress_callback, report_progress
+from result_cache import bump_generation
+from aggregates import schedule_refresh as schedule_aggregates_refresh
+from readiness import (
+    start_wait_recording, print_wait_summary, get_result_card_key, wait_for_results_change,
+    wait_for_network_idle, wait_for_selector_ready, wait_for_dropdown_growth, wait_for_dropdown_scroll
+)
 
 
 # Save results in JSON format
@@ -26,6 +38,33 @@ csv_folder = "."
 # Name of the output Excel file
 output_excel = "combined_excel_file.xlsx"
 
+PORTAL_URL = "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/calls-for-proposals"
+
+# Concurrent mode gives every category its own browser context instead of switching
+# categories one after the other on a single page. The limit bounds how many contexts
+# (and therefore open portal sessions) exist at the same time.
+SCRAPER_CONCURRENT = os.getenv("SCRAPER_CONCURRENT", "false").lower() == "true"
+SCRAPER_MAX_CONCURRENCY = int(os.getenv("SCRAPER_MAX_CONCURRENCY", "4"))
+
+# Number of reusable tabs fetching call details pages per category
+SCRAPER_DETAIL_TABS = int(os.getenv("SCRAPER_DETAIL_TABS", "4"))
+
+# "evaluate" extracts cards and detail tables with one in-browser evaluate per page,
+# "soup" serializes the page and parses it with BeautifulSoup
+SCRAPER_EXTRACTION = os.getenv("SCRAPER_EXTRACTION", "evaluate").lower()
+
+status_dict = {
+    "closed": "31094503",  # Checkbox ID for Closed
+    "forthcoming": "31094501",  # Checkbox ID for Forthcoming
+    "open": "31094502"  # Checkbox ID for Open
+}
+
+# Selector for the dropdown container
+dropdown_container_selector = 'div.eui-u-overflow-auto'
+
+next_button_selector = 'button:has(eui-icon-svg[icon="eui-caret-right"][aria-label="Go to next page"])'
+next_icon_selector = 'eui-icon-svg[icon="eui-caret-right"][aria-label="Go to next page"]'
+
 async def status_click(page, status_dict, selected_statuses, all_filters_selector):
     """
     Opens the 'All Filters' menu, checks/unchecks statuses, and applies additional filters.
@@ -39,7 +78,9 @@ async def status_click(page, status_dict, selected_statuses, all_filters_selecto
 
     # Step 1: Open the "All Filters" menu (stays open)
     await page.click(all_filters_selector)
-    await asyncio.sleep(2)  # Allow time for filters to fully expand
+    # Wait until the status checkboxes of the expanded filters are rendered
+    for checkbox_id in status_dict.values():
+        await wait_for_selector_ready(page, f"input.eui-input-checkbox[id='{checkbox_id}']", "filters_expand")
 
     # Step 2: Apply status filters
     for status, checkbox_id in status_dict.items():
@@ -63,7 +104,7 @@ async def status_click(page, status_dict, selected_statuses, all_filters_selecto
     # Step 4: Click "Apply Filters" if necessary (Modify selector accordingly)
     apply_button_selector = "button:has-text('View results')"  # Adjust this based on actual button
     await page.click(apply_button_selector)
-    await asyncio.sleep(2)  # Wait for filters to be applied
+    await wait_for_network_idle(page, "filters_apply")  # Wait for filters to be applied
 
     print("Filters applied successfully.")
 
@@ -80,6 +121,55 @@ def calculate_probability_rate(accepted_projects):
     except ValueError:
         return "Unknown"
 
+def parse_amount(text):
+    """
+    Parses a scraped amount like "5 000 000", "5000000.", "€ 2,500,000", "2.500" or
+    "1.234.567,50" into whole euros.
+
+    A dot or comma followed by exactly three digits separates thousands; any other one is
+    the decimal separator. migrations.py backfills stored amounts with the same rules.
+
+    Returns:
+        The amount as an int, or None if the text holds no number.
+    """
+    if text is None or isinstance(text, float):
+        return None
+    number = re.sub(r"[^\d.,]", "", str(text)).strip(".,")
+    number = re.sub(r"[.,](\d{3})(?!\d)", r"\1", number).replace(",", ".")
+    if not number or number.count(".") > 1:
+        return None
+    return int(Decimal(number).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def parse_funding_range(funding_per_project):
+    """
+    Parses "Min: X Max: Y", "~ X" or a plain amount into (funding_min, funding_max).
+    """
+    if not isinstance(funding_per_project, str):
+        return None, None
+    match = re.search(r"Min:\s*([\d.,\s]+?)\s*Max:\s*([\d.,\s]+)", funding_per_project)
+    if match:
+        return parse_amount(match.group(1)), parse_amount(match.group(2))
+    amount = parse_amount(funding_per_project.lstrip("~ "))
+    return amount, amount
+
+
+def parse_grant_count(accepted_projects):
+    """
+    Parses the indicative number of grants, e.g. "3" or "2 to 4" (the first number is kept).
+    """
+    match = re.search(r"\d+", accepted_projects) if isinstance(accepted_projects, str) else None
+    return int(match.group()) if match else None
+
+
+def optional_int(value):
+    """
+    Returns `value` as an int, or None if it is missing. Merged columns with missing values
+    become float with NaN, which the integer columns cannot store.
+    """
+    return None if value is None or pd.isna(value) else int(value)
+
+
 def format_openingdate(date_string):
     try:
         # Convert ISO date string (YYYY-MM-DD) to a date object
@@ -105,508 +195,998 @@ def format_date(date_string):
         return None
 
 
-async def scrape_eu_portal(closed_option, forthcoming_option, open_option, desired_category: list = None, get_categories_only: bool = False):
-    async with async_playwright() as p:
+async def apply_portal_filters(page, selected_statuses):
+    """
+    Loads the portal on the given page and applies the Horizon programme and status filters.
 
-        # Create "scraping in progress" flag
-        open("scraping_in_progress.json", "w").close()
+    Args:
+        page: The Playwright page instance.
+        selected_statuses: A dictionary specifying which statuses should be checked (True) or unchecked (False).
+    """
+    # Navigate to the portal
+    await page.goto(PORTAL_URL)
 
-        print("Searching for calls. Please be patient")
-        # Launch the browser
-        browser = await p.chromium.launch(headless=True)  #change to False to run with UI
-        page = await browser.new_page()
+    # Press the Programme button
+    button_selector = "button[data-e2e='eui-button']:has-text('Programme')"
+    await page.wait_for_selector(button_selector)
+    await page.click(button_selector)
 
-        # Navigate to the portal
-        await page.goto("https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/calls-for-proposals")
+    # Press the HORIZON button
+    horizon_button_selector = "button.eui-dropdown-item:has-text('Horizon Europe (HORIZON)')"
+    await page.wait_for_selector(horizon_button_selector, timeout=30000)
+    await page.click(horizon_button_selector)
 
-    # ======================================= Apply Filters ===========================================
+    filters_menu_selector = "button.eui-button:has-text('All filters')"  # The selector for the all filters
 
-        # Press the Programme button
-        button_selector = "button[data-e2e='eui-button']:has-text('Programme')"
-        await page.wait_for_selector(button_selector)
-        await page.click(button_selector)
+    await status_click(page, status_dict, selected_statuses, filters_menu_selector)
 
-        # Press the HORIZON button
-        horizon_button_selector = "button.eui-dropdown-item:has-text('Horizon Europe (HORIZON)')"
-        await page.wait_for_selector(horizon_button_selector, timeout=30000)
-        await page.click(horizon_button_selector)
 
-        status_dict = {
-            "closed": "31094503",  # Checkbox ID for Closed
-            "forthcoming": "31094501",  # Checkbox ID for Forthcoming
-            "open": "31094502"  # Checkbox ID for Open
-        }
+async def open_call_dropdown(page):
+    """
+    Opens the 'Call' dropdown and returns a locator for its scrollable container.
+    """
+    # Press the Call button
+    submission_status_button_selector = "button.eui-button:has-text('Call')"
+    await page.wait_for_selector(submission_status_button_selector, timeout=30000)
+    await page.click(submission_status_button_selector)
 
-        selected_statuses = {
-            "closed": closed_option,  # User wants "Closed" selected
-            "forthcoming": forthcoming_option,  # User wants "Forthcoming" unselected
-            "open": open_option  # User wants "Open" selected
-        }
+    # Wait for the dropdown container to load
+    await page.wait_for_selector(dropdown_container_selector, timeout=30000)
 
-        filters_menu_selector = "button.eui-button:has-text('All filters')"  # The selector for the all filters
+    # Locate the dropdown container
+    return page.locator(dropdown_container_selector)
 
-        await status_click(page, status_dict, selected_statuses, filters_menu_selector)
 
+async def collect_category_options(dropdown_container) -> list:
+    """
+    Scrolls through the open 'Call' dropdown and returns the names of all categories in it.
+    """
+    # Scroll through the dropdown container to ensure all items are visible
+    await dropdown_container.evaluate('(node) => node.scrollTop = 0')  # Start at the top
 
+    # Continuously scroll until all items are loaded
+    previous_item_count = 0
+    max_scroll_attempts = 10  # Prevent infinite scrolling
 
-        # Press the Call button
-        submission_status_button_selector = "button.eui-button:has-text('Call')"
-        await page.wait_for_selector(submission_status_button_selector, timeout=30000)
-        await page.click(submission_status_button_selector)
+    for _ in range(max_scroll_attempts):
+        current_item_count = await dropdown_container.locator('button.eui-dropdown-item').count()
 
-        #============ fetch all the available calls and ask to choose one ====================
+        if current_item_count > previous_item_count:
+            previous_item_count = current_item_count
+            await dropdown_container.evaluate('(node) => node.scrollBy(0, 200)')
+            # Wait for the scroll to load more items; a timeout means the list is complete
+            await wait_for_dropdown_growth(dropdown_container, current_item_count)
+        else:
+            break  # Exit loop if no new items are loaded
 
-        # Selector for the dropdown container
-        dropdown_container_selector = 'div.eui-u-overflow-auto'
+    print(f"Total buttons found after scrolling: {previous_item_count}")
 
-        # Wait for the dropdown container to load
-        await page.wait_for_selector(dropdown_container_selector, timeout=30000)
+    # Now fetch all the options
+    options = []
+
+    # Locate all dropdown buttons
+    buttons = dropdown_container.locator('button.eui-dropdown-item')
+
+    for i in range(previous_item_count):
+        try:
+            # Locate the specific span with 'eui-u-pr-s' class
+            span = buttons.nth(i).locator('span.eui-u-pr-s')
+
+            # Extract the text content
+            span_text = await span.evaluate('(node) => node.childNodes[0]?.nodeValue')
+            if span_text:
+                span_text = span_text.strip()
+            options.append(span_text)
+
+        except Exception as e:
+            print(f"Error processing button {i}: {e}")
+
+    return options
+
+
+async def select_category(page, category, max_scroll_attempts: int = 50):
+    """
+    Scrolls INSIDE the open 'Call' dropdown until the category button is visible and clicks it.
+    """
+    for j in range(max_scroll_attempts):
+
+        # Ensure the dropdown is visible
+        await page.locator(dropdown_container_selector).scroll_into_view_if_needed()
 
-        # Locate the dropdown container
+        # Wait for the dropdown container to be available
         dropdown_container = page.locator(dropdown_container_selector)
+        await page.wait_for_selector(dropdown_container_selector, timeout=30000)
 
-        # Scroll through the dropdown container to ensure all items are visible
-        await dropdown_container.evaluate('(node) => node.scrollTop = 0')  # Start at the top
+        # Scroll through the dropdown to find the desired option
 
-        # Continuously scroll until all items are loaded
-        previous_item_count = 0
-        max_scroll_attempts = 10  # Prevent infinite scrolling
+        try:
+            # Try to locate the option
+            option = dropdown_container.locator(
+                f'button.eui-dropdown-item:has(span:text-is("{category}"))')
+            if await option.is_visible():
+                await option.scroll_into_view_if_needed()
+                await option.click()
+                print(f"Clicked on the option: {category}")
+                return
+        except Exception:
+            pass
 
-        for _ in range(max_scroll_attempts):
-            current_item_count = await dropdown_container.locator('button.eui-dropdown-item').count()
+        # Scroll down inside the dropdown
+        scroll_top = await dropdown_container.evaluate('(node) => node.scrollTop')
+        await dropdown_container.evaluate('(node) => node.scrollBy(0, 200)')
+        await wait_for_dropdown_scroll(dropdown_container, scroll_top)
 
-            if current_item_count > previous_item_count:
-                previous_item_count = current_item_count
-                await dropdown_container.evaluate('(node) => node.scrollBy(0, 200)')
-                await asyncio.sleep(0.5)  # Use asyncio.sleep()
-            else:
-                break  # Exit loop if no new items are loaded
+    raise Exception(f"Category '{category}' not found in the Call dropdown.")
 
-        print(f"Total buttons found after scrolling: {previous_item_count}")
 
-        # Now fetch all the options
-        options = []
+async def switch_category(page, previous_category, category):
+    """
+    Clears the previously selected category chip and selects the next category on the same page.
+    """
+    # Press the chip of the previous category
+    submission_status_button_selector = f"button.eui-button:has-text('{previous_category}')"
+    await page.wait_for_selector(submission_status_button_selector, timeout=30000)
+    await page.click(submission_status_button_selector)
 
-        # Locate all dropdown buttons
-        buttons = dropdown_container.locator('button.eui-dropdown-item')
+    # Define the button selector specifically for the "X" button
+    x_button_selector = 'button.eui-button--basic.eui-button--icon-only[data-e2e="eui-button"] eui-icon-svg[icon="eui-close"]'
 
-        for i in range(previous_item_count):
-            try:
-                # Locate the specific span with 'eui-u-pr-s' class
-                span = buttons.nth(i).locator('span.eui-u-pr-s')
+    # Wait for the button to appear and ensure it is visible
+    await page.wait_for_selector(x_button_selector, timeout=5000)
 
-                # Extract the text content
-                span_text = await span.evaluate('(node) => node.childNodes[0]?.nodeValue')
-                if span_text:
-                    span_text = span_text.strip()
-                options.append(span_text)
+    # Scroll to the button to ensure it's in view
+    await page.locator(x_button_selector).scroll_into_view_if_needed()
 
-            except Exception as e:
-                print(f"Error processing button {i}: {e}")
+    # Click the button
+    try:
+        await page.click(x_button_selector)
+        print("X button clicked successfully!")
+        await wait_for_network_idle(page, "category_clear")
+
+        await open_call_dropdown(page)
+        await select_category(page, category)
+
+    except Exception as e:
+        print(f"Error clicking the X button: {e}")
+
+
+# In-browser extraction: one evaluate per page returns compact JSON instead of the whole DOM
+result_cards_js = """
+() => Array.from(document.querySelectorAll('sedia-result-card')).map(card => {
+    const text = (selector) => {
+        const element = card.querySelector(selector);
+        return element ? element.textContent.trim() : null;
+    };
+    const link = card.querySelector('a.eui-u-text-link.eui-u-font-l.eui-u-font-regular');
+    return {
+        title: link ? link.textContent.trim() : null,
+        href: link ? link.getAttribute('href') : null,
+        identifier: text('sedia-result-card-type span.ng-star-inserted'),
+        status: text('eui-card-header-right-content eui-chip span.eui-label')
+    };
+})
+"""
+
+detail_table_js = """
+() => {
+    const table = document.querySelector('table.eui-table');
+    const match = /funding rate of\\s+(\\d+)%/i.exec(document.body.innerText);
+    const descriptionCard = Array.from(document.querySelectorAll('eui-card')).find(card => {
+        const header = card.querySelector('eui-card-header');
+        return header && /topic description/i.test(header.textContent);
+    });
+    const descriptionContent = descriptionCard && descriptionCard.querySelector('eui-card-content');
+    return {
+        headers: table ? Array.from(table.querySelectorAll('thead tr th')).map(th => th.textContent.trim()) : [],
+        rows: table ? Array.from(table.querySelectorAll('tbody tr')).map(
+            tr => Array.from(tr.children).filter(td => td.tagName === 'TD').map(td => td.textContent.trim())
+        ) : [],
+        fundingRate: match ? parseInt(match[1], 10) : null,
+        description: descriptionContent ? descriptionContent.innerText.trim() : null
+    };
+}
+"""
+
+
+def parse_result_cards(html):
+    """
+    Parses the result cards of a results page with BeautifulSoup.
 
-        # Print all extracted options
-        print("Extracted Options:", options)
+    Returns:
+        A list of (card, href) tuples; href is None for cards without a link.
+    """
+    soup = BeautifulSoup(html, "html.parser")
 
-        for category in options:
-            await store_category(category)
+    cards = []
+    for item in soup.select("sedia-result-card"):
+        # Extract title (name)
+        title_element = item.select_one("a.eui-u-text-link.eui-u-font-l.eui-u-font-regular")
+        title = title_element.text.strip() if title_element else "No title"
 
-        #==================================== get input =========================================
+        # Extract identifier
+        identifier_element = item.select_one("sedia-result-card-type span.ng-star-inserted")
+        identifier = identifier_element.text.strip() if identifier_element else "No identifier"
 
-        menu_option_call = 1
-        for i in range(len(options)):
-            print(menu_option_call, ") ", options[i])
-            menu_option_call += 1
+        # Extract status
+        status_element = item.select_one("eui-card-header-right-content eui-chip span.eui-label")
+        status = status_element.text.strip() if status_element else "No status found"
 
-        if get_categories_only:
-            await browser.close()
-            return options  # Return list of categories to `/home`
+        # Extract href link
+        href = title_element['href'] if title_element and title_element.has_attr('href') else None
 
-        selected_categories = [category for category in desired_category if category in options]
+        cards.append(({"Identifier": identifier, "Title": title, "Status": status,
+                       "Link": "https://ec.europa.eu" + (href or "No link")}, href))
+    return cards
 
-        if "0" in desired_category:  # If "0" is provided, select all
-            selected_categories = options
 
-        print(selected_categories)
+def cards_from_evaluate(raw_cards):
+    """
+    Converts the records returned by `result_cards_js` into the (card, href) tuples of `parse_result_cards`.
+    """
+    cards = []
+    for raw in raw_cards:
+        href = raw.get("href")
+        cards.append(({
+            "Identifier": raw.get("identifier") or "No identifier",
+            "Title": raw.get("title") or "No title",
+            "Status": raw.get("status") or "No status found",
+            "Link": "https://ec.europa.eu" + (href or "No link")
+        }, href))
+    return cards
+
+
+async def extract_result_cards(page, extraction: str = SCRAPER_EXTRACTION):
+    """
+    Extracts the result cards shown on the page, in the browser or with BeautifulSoup.
+    """
+    if extraction == "evaluate":
+        try:
+            return cards_from_evaluate(await page.evaluate(result_cards_js))
+        except Exception as e:
+            print(f"In-browser card extraction failed, falling back to BeautifulSoup: {e}")
+    return parse_result_cards(await page.content())
 
-        # ============================ Pagination and Data Extraction =====================================
 
-        counter_for_menu = 0
-        for category in selected_categories:
-            await asyncio.sleep(0.5)  # 500ms
-            if counter_for_menu > 0:
-                # Press the Call button
-                submission_status_button_selector = f"button.eui-button:has-text('{selected_categories[counter_for_menu - 1]}')"
-                await page.wait_for_selector(submission_status_button_selector, timeout=30000)
-                await page.click(submission_status_button_selector)
+def parse_detail_page(html):
+    """
+    Parses a call details page into detail table rows with BeautifulSoup.
 
-                # Define the button selector specifically for the "X" button
-                x_button_selector = 'button.eui-button--basic.eui-button--icon-only[data-e2e="eui-button"] eui-icon-svg[icon="eui-close"]'
+    Args:
+        html: The HTML content of the call details page.
 
-                # Wait for the button to appear and ensure it is visible
-                await page.wait_for_selector(x_button_selector, timeout=5000)
+    Returns:
+        The table rows and a mapping of identifier to action type (e.g. RIA, IA).
 
-                # Scroll to the button to ensure it's in view
-                await page.locator(x_button_selector).scroll_into_view_if_needed()
+    Raises:
+        ValueError: If the table or one of its expected columns is missing.
+    """
+    soup = BeautifulSoup(html, "html.parser")
 
-                # Click the button
-                try:
-                    await page.click(x_button_selector)
-                    print("X button clicked successfully!")
-                    await asyncio.sleep(2)
-
-                    submission_status_button_selector = "button.eui-button:has-text('Call')"
-                    await page.wait_for_selector(submission_status_button_selector, timeout=30000)
-                    await page.click(submission_status_button_selector)
-
-                    # Scroll INSIDE the menu to find and click the category button
-                    for j in range(len(selected_categories)):
-
-                        # Selector for the dropdown container
-                        dropdown_container_selector = 'div.eui-u-overflow-auto'
-                        # Ensure the dropdown is visible
-                        await page.locator(dropdown_container_selector).scroll_into_view_if_needed()
-
-                        # Wait for the dropdown container to be available
-                        dropdown_container = page.locator(dropdown_container_selector)
-                        await page.wait_for_selector(dropdown_container_selector, timeout=30000)
-
-                        # Scroll through the dropdown to find the desired option
-
-                        try:
-                            # Try to locate the option
-                            option = dropdown_container.locator(
-                                f'button.eui-dropdown-item:has(span:text-is("{category}"))')
-                            if await option.is_visible():
-                                await option.scroll_into_view_if_needed()
-                                await option.click()
-                                print(f"Clicked on the option: {category}")
-                                break  # Break the while loop to process the next option
-                        except Exception:
-                            pass
-
-                        # Scroll down inside the dropdown
-                        await dropdown_container.evaluate('(node) => node.scrollBy(0, 200)')
-                        await asyncio.sleep(0.5)  # 500ms
-
-                except Exception as e:
-                    print(f"Error clicking the X button: {e}")
+    #funding rate extractor
+    page_text = soup.get_text(separator=" ", strip=True)
+
+    # Use regex to search for the funding rate pattern.
+    match = re.search(r'funding rate of\s+(\d+)%', page_text, re.IGNORECASE)
+    funding_rate_int = int(match.group(1)) if match else None
+
+    header_cells = soup.select('table.eui-table thead tr th')
+    headers = [cell.get_text(strip=True) for cell in header_cells]
+
+    rows = [[cell.text.strip() for cell in row.find_all('td', recursive=False)]
+            for row in soup.select('table.eui-table tbody tr')]
+
+    description = None
+    for card in soup.select('eui-card'):
+        header = card.select_one('eui-card-header')
+        content = card.select_one('eui-card-content')
+        if header and content and "topic description" in header.get_text(" ", strip=True).lower():
+            description = content.get_text(separator=" ", strip=True)
+            break
+
+    return parse_detail_table(headers, rows, funding_rate_int, description)
+
+
+def parse_detail_table(headers, rows, funding_rate_int, description=None):
+    """
+    Converts the header and cell texts of a details table into detail table rows.
+
+    Args:
+        headers: The header texts of the table.
+        rows: The cell texts of every table body row.
+        funding_rate_int: The funding rate found on the page, if any.
+        description: The topic description text of the page, if any.
+
+    Returns:
+        The table rows and a mapping of identifier to action type (e.g. RIA, IA).
+
+    Raises:
+        ValueError: If the table or one of its expected columns is missing.
+    """
+    identifier_to_action = {}
+    table_data = []
+
+    def cell_text(cells, index):
+        # Columns are numbered from 1, like td:nth-child
+        return cells[index - 1] if 0 < index <= len(cells) else None
+
+    deadline_index = headers.index("Deadline") + 1
+    open_date_index = headers.index("Opening date") + 1
+    funding_per_sub_index = headers.index("Contributions") + 1
+    budget_index_first = 2
+    budget_index_last = headers.index("Stages")
+
+
+
+    accepted_projects_index = None
+    for idx, h in enumerate(headers, start=1):
+        normalized = h.replace("\n", " ").strip().lower()
+        if "indicative number" in normalized and "grants" in normalized:
+            accepted_projects_index = idx
+            break
+    if accepted_projects_index is None:
+        raise ValueError("Accepted Projects column not found")
+
+    #TODO change following for loop to take care of malformed table stuff maybe if else
+    for cells in rows:
+        # Extract identifier and truncate at the first whitespace
+        raw_identifier = cell_text(cells, 1)
+        identifier = raw_identifier.split(" ")[0] if raw_identifier else "No identifier"
+
+        # Extract the action type (e.g., RIA, IA)
+        action_match = re.search(r'-(RIA|IA|CSA|MSCA|EIC)', raw_identifier or "")
+        action_type = action_match.group(1) if action_match else "No action"
+
+        open_date_element = cell_text(cells, open_date_index)
+        formatted_opendate = format_openingdate(open_date_element)
+
+
+        # Add to the temporary dictionary
+        identifier_to_action[identifier] = action_type
+
+        # Extract budget
+        raw_budget = cell_text(cells, budget_index_first)
+        budget = raw_budget.replace(" ", "").rstrip(".")
+
+        # Iterate over the remaining budget columns until we hit "Stages".
+        for i in range(budget_index_first + 1, budget_index_last):
+            value = cell_text(cells, i)
+            if value:  # update only if non-empty
+                budget = value.replace(" ", "").rstrip(".")
+
+
+        # Extract deadline
+        deadline = cell_text(cells, deadline_index)
+        formatted_deadline = format_date(deadline)
 
+
+        # Extract funding per submission
+        raw_funding = cell_text(cells, funding_per_sub_index) or "No funding info"
+        if "to" in raw_funding:
+            min_funding, max_funding = map(lambda x: x.replace(" ", ""),
+                                           raw_funding.split("to"))
+            funding_per_submission = f"Min: {min_funding} Max: {max_funding}"
+        elif "around" in raw_funding:
+            funding_per_submission = f"~ {raw_funding.replace('around', '').strip()}"
+        else:
+            funding_per_submission = raw_funding
+
+        # Extract accepted submissions
+        accepted_submissions = cell_text(cells, accepted_projects_index)
+
+
+        # Append to table_data
+        table_data.append({
+            "Identifier": identifier,
+            "Intensity Rate": "Coming soon",
+            "Opening Date": formatted_opendate,
+            "Budget": budget,
+            "Deadline": formatted_deadline,
+            "Funding Per Project": funding_per_submission,
+            "Accepted Projects": accepted_submissions,
+            "Funding Rate": funding_rate_int,
+            "Description": description
+        })
+
+    return table_data, identifier_to_action
+
+
+async def extract_detail_table(tab, extraction: str = SCRAPER_EXTRACTION):
+    """
+    Extracts the details table of a call details page, in the browser or with BeautifulSoup.
+
+    Returns:
+        The table rows and a mapping of identifier to action type (e.g. RIA, IA).
+    """
+    if extraction == "evaluate":
+        data = await tab.evaluate(detail_table_js)
+        return parse_detail_table(data["headers"], data["rows"], data["fundingRate"], data.get("description"))
+
+    html = await tab.content()
+    # Parse off the event loop so pagination keeps going meanwhile
+    return await asyncio.to_thread(parse_detail_page, html)
+
+
+class DetailFetcher:
+    """
+    Fetches call details pages concurrently on a bounded set of reusable tabs.
+
+    Fetches are scheduled while the results pages are still being paginated, so detail
+    loading overlaps with list pagination. At most `max_tabs` tabs are open at a time and
+    each tab is reused for later links instead of being closed.
+    """
+
+    def __init__(self, context, max_tabs: int = SCRAPER_DETAIL_TABS):
+        self.context = context
+        self.semaphore = asyncio.Semaphore(max(1, max_tabs))
+        self.idle_tabs = []
+        # Every tab opened, idle or busy, so close() can close them all
+        self.tabs = []
+        self.tasks = {}
+
+    def schedule(self, identifier, link):
+        """
+        Starts fetching the details of a call unless it is already scheduled.
+        """
+        if link not in self.tasks:
+            self.tasks[link] = asyncio.create_task(self.fetch(identifier, link))
+
+    async def fetch(self, identifier, link):
+        async with self.semaphore:
+            if self.idle_tabs:
+                tab = self.idle_tabs.pop()
             else:
-                # Locate the button with the matching span text
-                matching_button = page.locator(f'button.eui-dropdown-item:has(span:text-is("{category}"))')
-                print(f"Found button for category: {category}")
-                # Click the matching button
-                await matching_button.first.click()
-                print("clicked")
+                tab = await self.context.new_page()
+                self.tabs.append(tab)
+            try:
+                await tab.goto(link)
+                try:
+                    # Wait for the table inside the card
+                    await tab.wait_for_selector('table.eui-table', timeout=30000)
+                    return await extract_detail_table(tab)
+                except Exception:
+                    print(f"Table not found for {identifier}, attempting fallback to 'Total funding available'")
+                    return await self.fetch_fallback(tab, identifier)
+            except Exception as e:
+                print(f"Error fetching details for {identifier}: {e}")
+                return [], {}
+            finally:
+                self.idle_tabs.append(tab)
+
+    async def fetch_fallback(self, tab, identifier):
+        # Attempt to locate the budget in "Total funding available"
+        funding_container = tab.locator(
+            'div.eui-input-group:has(div:has-text("Total funding available"))')
+        budget_element = funding_container.locator('div.eui-u-font-m')
+        if await budget_element.count() == 0:
+            print("No budget found in fallback.")
+            return [], {}
+
+        raw_budget = (await budget_element.first.text_content()).strip()
+        budget = raw_budget.replace("\u202f", "").replace(",", "").replace("€", "").strip()
+        print(f"Extracted Budget from fallback: {budget}")
+        return [{
+            "Identifier": identifier,
+            "Intensity Rate": "Coming soon",
+            "Budget": budget,
+            "Deadline": "No deadline found",
+            "Opening Date": "No opening date found",
+            "Funding Per Project": "No funding info",
+            "Accepted Projects": "No submission info"
+        }], {}
+
+    async def results_for(self, links) -> dict:
+        """
+        Waits for the scheduled fetches of `links` and returns {link: (table_rows, identifier_to_action)}.
+        """
+        links = [link for link in links if link in self.tasks]
+        fetched = await asyncio.gather(*(self.tasks[link] for link in links))
+        return dict(zip(links, fetched))
+
+    async def close(self):
+        for task in self.tasks.values():
+            task.cancel()
+        # Let cancelled fetches unwind before their tabs are closed
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        for tab in self.tabs:
+            try:
+                await tab.close()
+            except Exception as e:
+                print(f"Error closing details tab: {e}")
+        self.tabs = []
+        self.idle_tabs = []
 
-            # safety delay
-            await asyncio.sleep(5)  # 5s
 
-            next_button_selector = 'button:has(eui-icon-svg[icon="eui-caret-right"][aria-label="Go to next page"])'
-            next_icon_selector = 'eui-icon-svg[icon="eui-caret-right"][aria-label="Go to next page"]'
+async def store_results_page(detail_fetcher, titles_data, category, stored_identifiers, page_number,
+                             change_tracker=None, checkpoint=None):
+    """
+    Waits for the details of one results page, stores its calls and checkpoints the page.
 
-            # Initialize data containers
-            titles_data = []
-            table_data = []
+    Args:
+        detail_fetcher: The DetailFetcher the page's details were scheduled on.
+        titles_data: The result cards of the page.
+        category: The name of the category.
+        stored_identifiers: Identifiers already stored for the category, shared by all its pages.
+        page_number: The number of the results page, starting at 1.
+        change_tracker: Optional ChangeTracker of an incremental run.
+        checkpoint: Optional RunCheckpoint recording the stored page.
+    """
+    details = await detail_fetcher.results_for([item["Link"] for item in titles_data])
+
+    # Every call takes its table row, action and funding rate from its own details page
+    table_data = []
+    for item in titles_data:
+        table_rows, identifier_to_action = details.get(item["Link"], ([], {}))
+        item["Action"] = identifier_to_action.get(item["Identifier"], "No action")
+
+        matching_rows = [row for row in table_rows if row["Identifier"] == item["Identifier"]]
+        if table_rows and not matching_rows:
+            # The other rows belong to other topics and would be stored without a title
+            print(f"No budget row for {item['Identifier']} on its details page, skipping "
+                  f"{len(table_rows)} rows of other topics")
+        for row in matching_rows:
+            if row["Identifier"] not in stored_identifiers:
+                stored_identifiers.add(row["Identifier"])
+                table_data.append(row)
 
-            while True:
-                # Wait for results to load
-                await page.wait_for_selector("sedia-result-card")
+    await store_category_results(titles_data, table_data, category, change_tracker)
+    print(f"Stored page {page_number} of category {category} ({len(details)} details fetched)")
 
-                # Extract the HTML content
-                html = await page.content()
-                soup = BeautifulSoup(html, "html.parser")
+    if checkpoint is not None:
+        await checkpoint.page_done(category, page_number)
+
+
+async def scrape_category(context, page, category, change_tracker=None, checkpoint=None):
+    """
+    Walks through every results page of the currently selected category, fetches the details
+    page of every call and stores the merged records page by page.
 
+    Args:
+        context: The browser context used to open detail tabs.
+        page: The Playwright page showing the results of the category.
+        category: The name of the selected category.
+        change_tracker: Optional ChangeTracker; calls with unchanged cards are then not fetched.
+        checkpoint: Optional RunCheckpoint; pages stored by an earlier attempt are then skipped.
+    """
+    detail_fetcher = DetailFetcher(context)
+    stored_identifiers = set()
+    page_tasks = []
+
+    # Pages stored by an earlier attempt of this run are paginated over without extracting them
+    skip_pages = checkpoint.last_page(category) if checkpoint is not None else 0
+    if skip_pages:
+        print(f"Resuming category {category} after page {skip_pages}")
+    page_number = 0
+
+    report_progress("category_started", category=category, resumed_after_page=skip_pages)
+
+    try:
+        while True:
+            # Wait for results to load
+            await page.wait_for_selector("sedia-result-card")
+            page_number += 1
+
+            if page_number > skip_pages:
                 # Extract results on the current page
-                call_items = soup.select("sedia-result-card")
+                titles_data = []
+                page_cards = []
+                for card, href in await extract_result_cards(page):
+                    titles_data.append(card)
+                    if href:
+                        page_cards.append(card)
+
+                if change_tracker is not None:
+                    await change_tracker.load([card["Identifier"] for card in page_cards])
+
+                for card in page_cards:
+                    if change_tracker is not None and change_tracker.card_unchanged(card):
+                        continue
+                    # Fetch the call details in the background while paginating
+                    detail_fetcher.schedule(card["Identifier"], card["Link"])
+
+                report_progress("page_parsed", category=category, page=page_number, cards=len(titles_data))
+
+                # Store the page as soon as its details are in, while pagination goes on
+                page_tasks.append(asyncio.create_task(store_results_page(
+                    detail_fetcher, titles_data, category, stored_identifiers, page_number,
+                    change_tracker, checkpoint
+                )))
+
+            await page.wait_for_selector(next_button_selector)
+            # Locate the "Next" button
+            next_button = page.locator(next_button_selector)
+            # Debugging output
+            print("Checking Next button state...")
+            if  await next_button.count() > 0:
+                # Check if the button is disabled
+                is_disabled = await next_button.evaluate("(button) => button.disabled")
+                print(f"Is Next button disabled: {is_disabled}")
+
+                if is_disabled:
+                    print("Next button is disabled. Exiting pagination.")
+                    break
+            else:
+                print("Next button not found. Exiting pagination.")
+                break
 
-                for item in call_items:
-                    # Extract title (name)
-                    title_element = item.select_one("a.eui-u-text-link.eui-u-font-l.eui-u-font-regular")
-                    title = title_element.text.strip() if title_element else "No title"
+            # Wait for the eui-icon-svg element to appear
+            await page.wait_for_selector(next_icon_selector, timeout=20000)
 
-                    # Extract identifier
-                    identifier_element = item.select_one("sedia-result-card-type span.ng-star-inserted")
-                    identifier = identifier_element.text.strip() if identifier_element else "No identifier"
+            # Locate the icon
+            next_icon = page.locator(next_icon_selector)
 
-                    # Extract status
-                    status_element = item.select_one("eui-card-header-right-content eui-chip span.eui-label")
-                    status = status_element.text.strip() if status_element else "No status found"
+            # Debugging output
+            print("Next icon count:", await next_icon.count())
+            print("Next icon visible:", await next_icon.is_visible())
 
-                    # Extract href link
-                    href = title_element['href'] if title_element and title_element.has_attr('href') else "No link"
+            # Click the icon if available
+            if  await next_icon.count() > 0 and await next_icon.is_visible():
+                previous_key = await get_result_card_key(page)
+                await next_icon.click()
+                print("Clicked the 'Next' icon.")
+                # Wait until the next page's cards replace the current ones
+                await wait_for_results_change(page, previous_key, "next_page")
 
-                    # Append to titles_data
-                    titles_data.append({"Identifier": identifier, "Title": title, "Status": status, "Link": "https://ec.europa.eu"+href})
+            else:
+                print("Next icon not found or not visible. Exiting pagination.")
+                break
 
-                # Open the first card to extract table data or fallback to "Total funding available"
-                if len(table_data) == 0:  # Only fetch data from the first card
-                    first_call_link_element = call_items[0].select_one(
-                        "a.eui-u-text-link.eui-u-font-l.eui-u-font-regular")
-                    first_call_link = first_call_link_element['href'] if first_call_link_element else None
+        await asyncio.gather(*page_tasks)
+    finally:
+        for task in page_tasks:
+            task.cancel()
+        await detail_fetcher.close()
 
-                    if first_call_link:
-                        # Open a new tab for the first call details page
-                        new_tab = await browser.new_page()
-                        await new_tab.goto(f"https://ec.europa.eu{first_call_link}")
-                        print(f"Opened first call link in a new tab: {first_call_link}")
+    print(f"Fetched details of {len(detail_fetcher.tasks)} calls for category: {category}")
 
-                        try:
-                            # Wait for the table inside the card
-                            await new_tab.wait_for_selector('table.eui-table', timeout=30000)
 
-                            # Extract table data
-                            html = await new_tab.content()
-                            soup = BeautifulSoup(html, "html.parser")
-
-                            #funding rate extractor
-                            # Assume 'soup' is your BeautifulSoup object from the call details page
-                            page_text = soup.get_text(separator=" ", strip=True)
+async def store_category_results(titles_data, table_data, category_name, change_tracker=None):
+    """
+    Merges the result cards with the detail table rows of a category and stores every call.
 
-                            # Use regex to search for the funding rate pattern.
-                            match = re.search(r'funding rate of\s+(\d+)%', page_text, re.IGNORECASE)
-                            if match:
-                                funding_rate_int = int(match.group(1))
-                                print(f"Extracted funding rate (int): {funding_rate_int}")
-                            else:
-                                funding_rate_int = None
-                                print("Funding rate not found.")
-
-
-
-                            rows = soup.select('table.eui-table tbody tr')
-
-                            identifier_to_action = {}
-
-                            header_cells = soup.select('table.eui-table thead tr th')
-
-                            headers = [cell.get_text(strip=True) for cell in header_cells]
-                            deadline_index = headers.index("Deadline") + 1
-                            open_date_index = headers.index("Opening date") + 1
-                            funding_per_sub_index = headers.index("Contributions") + 1
-                            budget_index_first = 2
-                            budget_index_last = headers.index("Stages")
-
-
-
-                            accepted_projects_index = None
-                            for idx, h in enumerate(headers, start=1):
-                                normalized = h.replace("\n", " ").strip().lower()
-                                if "indicative number" in normalized and "grants" in normalized:
-                                    accepted_projects_index = idx
-                                    break
-                            if accepted_projects_index is None:
-                                raise ValueError("Accepted Projects column not found")
-
-                            #TODO change following for loop to take care of malformed table stuff maybe if else
-                            for row in rows:
-                                # Extract identifier and truncate at the first whitespace
-                                identifier_element = row.select_one('td:nth-child(1)')
-                                raw_identifier = identifier_element.text.strip()
-                                identifier = raw_identifier.split(" ")[0] if raw_identifier else "No identifier"
-
-                                # Extract the action type (e.g., RIA, IA)
-                                action_match = re.search(r'-(RIA|IA|CSA|MSCA|EIC)', raw_identifier)
-                                action_type = action_match.group(1) if action_match else "No action"
-
-                                open_date_element = row.select_one(f'td:nth-child({open_date_index})').text.strip()
-                                formatted_opendate = format_openingdate(open_date_element)
-
-
-                                # Add to the temporary dictionary
-                                identifier_to_action[identifier] = action_type
-
-                                # Extract budget
-                                raw_budget = row.select_one(f'td:nth-child({budget_index_first})').text.strip()
-                                budget = raw_budget.replace(" ", "").rstrip(".")
-
-                                # Iterate over the remaining budget columns until we hit "Stages".
-                                for i in range(budget_index_first + 1, budget_index_last):
-                                    cell = row.select_one(f'td:nth-child({i})')
-                                    if cell:
-                                        value = cell.text.strip()
-                                        if value != "":  # update only if non-empty
-                                            budget = value.replace(" ", "").rstrip(".")
-
-
-                                # Extract deadline
-                                deadline = row.select_one(f'td:nth-child({deadline_index})').text.strip()
-                                formatted_deadline = format_date(deadline)
-
-
-                                # Extract funding per submission
-                                funding_element = row.select_one(f'td:nth-child({funding_per_sub_index})')
-                                raw_funding = funding_element.text.strip() if funding_element else "No funding info"
-                                if "to" in raw_funding:
-                                    min_funding, max_funding = map(lambda x: x.replace(" ", ""),
-                                                                   raw_funding.split("to"))
-                                    funding_per_submission = f"Min: {min_funding} Max: {max_funding}"
-                                elif "around" in raw_funding:
-                                    funding_per_submission = f"~ {raw_funding.replace('around', '').strip()}"
-                                else:
-                                    funding_per_submission = raw_funding
-
-                                # Extract accepted submissions
-                                accepted_submissions = row.select_one(f'td:nth-child({accepted_projects_index})').text.strip()
-
-
-                                # Append to table_data
-                                table_data.append({
-                                    "Identifier": identifier,
-                                    "Intensity Rate": "Coming soon",
-                                    "Opening Date": formatted_opendate,
-                                    "Budget": budget,
-                                    "Deadline": formatted_deadline,
-                                    "Funding Per Project": funding_per_submission,
-                                    "Accepted Projects": accepted_submissions,
-                                    "Funding Rate": funding_rate_int
-                                })
-
-
-                            # Merge the Action Type into titles_data using the Identifier as the key
-                            for item in titles_data:
-                                item["Action"] = identifier_to_action.get(item["Identifier"], "No action")
-
-                        except Exception as e:
-                            print("Table not found, attempting fallback to 'Total funding available'")
-                            # Attempt to locate the budget in "Total funding available"
-                            try:
-                                funding_container =  new_tab.locator(
-                                    'div.eui-input-group:has(div:has-text("Total funding available"))')
-                                budget_element = funding_container.locator('div.eui-u-font-m')
-                                if await budget_element.count() > 0:
-                                    raw_budget = (await budget_element.first.text_content()).strip()
-                                    budget = raw_budget.replace("\u202f", "").replace(",", "").replace("€",
-                                                                                                       "").strip()
-                                    table_data.append({
-                                        "Identifier": "No identifier found",
-                                        "Intensity Rate": "Coming soon",
-                                        "Budget": budget,
-                                        "Deadline": "No deadline found",
-                                        "Opening Date": "No opening date found",
-                                        "Funding Per Project": "No funding info",
-                                        "Accepted Projects": "No submission info"
-                                    })
-                                    print(f"Extracted Budget from fallback: {budget}")
-                                else:
-                                    print("No budget found in fallback.")
-                            except Exception as fallback_error:
-                                print(f"Error during fallback extraction: {fallback_error}")
-
-                        finally:
-                            # Close the new tab after extraction
-                            await new_tab.close()
-
-                await page.wait_for_selector(next_button_selector)
-                # Locate the "Next" button
-                next_button = page.locator(next_button_selector)
-                # Debugging output
-                print("Checking Next button state...")
-                if  await next_button.count() > 0:
-                    # Check if the button is disabled
-                    is_disabled = await next_button.evaluate("(button) => button.disabled")
-                    print(f"Is Next button disabled: {is_disabled}")
-
-                    if is_disabled:
-                        print("Next button is disabled. Exiting pagination.")
-                        break
-                else:
-                    print("Next button not found. Exiting pagination.")
-                    break
+    Args:
+        titles_data: Records scraped from the result cards (Identifier, Title, Status, Link, Action).
+        table_data: Records scraped from the detail table (Identifier, Budget, Deadline, ...).
+        category_name: The category the records belong to.
+        change_tracker: Optional ChangeTracker; only new or changed calls are then written.
 
-                # Wait for the eui-icon-svg element to appear
-                await page.wait_for_selector(next_icon_selector, timeout=20000)
+    Returns:
+        The number of calls written.
+    """
+    # Merge data and save to CSV
+    table_df = pd.DataFrame(table_data)
+    titles_df = pd.DataFrame(titles_data)
+    if table_df.empty or titles_df.empty:
+        return 0
+
+    final_df = pd.merge(table_df, titles_df, on="Identifier", how="left")
+    # Ensure the 'Action' column exists, even if it's missing in titles_data
+    if 'Action' not in final_df.columns:
+        final_df['Action'] = "No action"
+
+    final_df['Probability Rate'] = final_df['Accepted Projects'].apply(calculate_probability_rate)
+
+    # Rearrange columns: 'Identifier', 'Action' first
+    columns_order = ['Identifier', 'Action'] + [col for col in final_df.columns if
+                                                col not in ['Identifier', 'Action']]
+    final_df = final_df[columns_order]
+
+    category_id = await get_category_id(category_name)
+    records = []
+
+    for _, row in final_df.iterrows():
+        raw_deadline = row.get("Deadline")
+
+        if raw_deadline is None:
+            # No deadline provided. Stored as NULL rather than a made-up date, which would
+            # also change the call's content fingerprint every day.
+            deadline_primary = None
+            deadline_secondary = None
+        elif isinstance(raw_deadline, str):
+            # If it's a string, format it into a date or tuple of dates.
+            formatted_deadline = format_date(raw_deadline)
+            if isinstance(formatted_deadline, tuple):
+                deadline_primary, deadline_secondary = formatted_deadline
+            else:
+                deadline_primary = formatted_deadline
+                deadline_secondary = None
+        elif isinstance(raw_deadline, tuple):
+            # Two-stage calls carry both deadlines
+            deadline_primary, deadline_secondary = raw_deadline[:2]
+        elif isinstance(raw_deadline, date):
+            # raw_deadline is already a date object
+            deadline_primary = raw_deadline
+            deadline_secondary = None
+        else:
+            # Fallback, e.g. NaN for a row without a deadline column: no deadline.
+            deadline_primary = None
+            deadline_secondary = None
+
+        opening_date = row.get("Opening Date")
+        if not isinstance(opening_date, date):
+            opening_date = None
+
+        status = row.get("Status")
+        if not isinstance(status, str):
+            status = "No status found"
+
+        description = row.get("Description")
+        if not isinstance(description, str) or not description:
+            description = None
+
+        funding_min, funding_max = parse_funding_range(row.get("Funding Per Project"))
+
+        record = {
+            "identifier": row.get("Identifier"),
+            "title": row.get("Title"),
+            "action_type": row.get("Action"),
+            "budget": row.get("Budget"),
+            "funding_per_project": row.get("Funding Per Project"),
+            "deadline_primary": deadline_primary,
+            "deadline_secondary": deadline_secondary,
+            "opening_date": opening_date,
+            "accepted_projects": row.get("Accepted Projects"),
+            "probability_rate": row.get("Probability Rate"),
+            "link": row.get("Link"),
+            "category_id": category_id,
+            "status": status,
+            "funding_rate": optional_int(row.get("Funding Rate")),
+            "description": description,
+            "budget_amount": parse_amount(row.get("Budget")),
+            "funding_min": funding_min,
+            "funding_max": funding_max,
+            "grant_count": parse_grant_count(row.get("Accepted Projects"))
+        }
+
+        if change_tracker is not None and not change_tracker.record_changed(record):
+            continue
+        records.append(record)
+
+    try:
+        await storage.store_calls(records)
+        stored_records = records
+    except Exception as batch_error:
+        # Store row by row so one bad record does not cost the whole batch
+        print(f"Error storing {len(records)} calls in one batch, storing them one by one: {batch_error}")
+        stored_records = []
+        for record in records:
+            try:
+                await storage.store_call(record)
+                stored_records.append(record)
+            except Exception as store_error:
+                print(f"Error during record extraction: {store_error}")
+
+    stored_count = len(stored_records)
+    if stored_count:
+        # Cached query results and the aggregates no longer match the database
+        bump_generation()
+        schedule_aggregates_refresh()
+    if change_tracker is not None:
+        for record in stored_records:
+            change_tracker.mark_stored(record)
+        await change_tracker.save()
+
+    report_progress("calls_stored", category=category_name, count=stored_count)
+    return stored_count
+
+
+async def scrape_categories_sequentially(context, page, selected_categories, change_tracker=None, checkpoint=None):
+    """
+    Scrapes the categories one after the other on a single page, switching the selected
+    category chip between them. A failing category stops the run.
+    """
+    counter_for_menu = 0
+    for category in selected_categories:
+        previous_key = await get_result_card_key(page)
+        if counter_for_menu > 0:
+            await switch_category(page, selected_categories[counter_for_menu - 1], category)
+
+        else:
+            # Locate the button with the matching span text
+            matching_button = page.locator(f'button.eui-dropdown-item:has(span:text-is("{category}"))')
+            print(f"Found button for category: {category}")
+            # Click the matching button
+            await matching_button.first.click()
+            print("clicked")
+
+        # Wait until the results of the selected category are shown
+        await wait_for_results_change(page, previous_key, "category_select")
+        await wait_for_network_idle(page, "category_select_idle")
+
+        if checkpoint is not None:
+            await checkpoint.category_started(category)
+        try:
+            await scrape_category(context, page, category, change_tracker, checkpoint)
+        except Exception as e:
+            if checkpoint is not None:
+                await checkpoint.category_failed(category, e)
+            raise
+        if checkpoint is not None:
+            await checkpoint.category_done(category)
+
+        counter_for_menu+=1
+
+
+async def scrape_categories_concurrently(browser, browser_profile, selected_categories, selected_statuses,
+                                         max_concurrency: int, change_tracker=None, checkpoint=None):
+    """
+    Scrapes every category in its own browser context, with at most `max_concurrency`
+    contexts open at the same time.
 
-                # Locate the icon
-                next_icon = page.locator(next_icon_selector)
+    Args:
+        browser: The launched Playwright browser.
+        browser_profile: The BrowserProfile that creates the contexts of the run.
+        selected_categories: The categories to scrape.
+        selected_statuses: A dictionary specifying which statuses should be checked (True) or unchecked (False).
+        max_concurrency: The maximum number of categories scraped at the same time.
+        change_tracker: Optional ChangeTracker shared by all categories of an incremental run.
+        checkpoint: Optional RunCheckpoint recording the progress of every category.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-                # Debugging output
-                print("Next icon count:", await next_icon.count())
-                print("Next icon visible:", await next_icon.is_visible())
+    async def scrape_in_own_context(category):
+        async with semaphore:
+            print(f"Starting category in its own context: {category}")
+            context = await browser_profile.new_context(browser)
+            try:
+                if checkpoint is not None:
+                    await checkpoint.category_started(category)
+                page = await context.new_page()
+                await apply_portal_filters(page, selected_statuses)
+                await open_call_dropdown(page)
+                previous_key = await get_result_card_key(page)
+                await select_category(page, category)
+
+                # Wait until the results of the selected category are shown
+                await wait_for_results_change(page, previous_key, "category_select")
+                await wait_for_network_idle(page, "category_select_idle")
+
+                await scrape_category(context, page, category, change_tracker, checkpoint)
+                if checkpoint is not None:
+                    await checkpoint.category_done(category)
+                print(f"Finished category: {category}")
+            except Exception as e:
+                print(f"Error scraping category {category}: {e}")
+                if checkpoint is not None:
+                    await checkpoint.category_failed(category, e)
+            finally:
+                await context.close()
 
-                # Click the icon if available
-                if  await next_icon.count() > 0 and await next_icon.is_visible():
-                    await next_icon.click()
-                    print("Clicked the 'Next' icon.")
-                    print("waiting for 30 sec to load next page")
-                    await asyncio.sleep(30)
+    await asyncio.gather(*(scrape_in_own_context(category) for category in selected_categories))
 
-                else:
-                    print("Next icon not found or not visible. Exiting pagination.")
-                    break
 
-                # Merge data and save to CSV
-            table_df = pd.DataFrame(table_data)
-            titles_df = pd.DataFrame(titles_data)
-            if not table_df.empty and not titles_df.empty:
-                final_df = pd.merge(table_df, titles_df, on="Identifier", how="left")
-                # Ensure the 'Action' column exists, even if it's missing in titles_data
-                if 'Action' not in final_df.columns:
-                    final_df['Action'] = "No action"
-
-                final_df['Probability Rate'] = final_df['Accepted Projects'].apply(calculate_probability_rate)
-
-                # Rearrange columns: 'Identifier', 'Action' first
-                columns_order = ['Identifier', 'Action'] + [col for col in final_df.columns if
-                                                            col not in ['Identifier', 'Action']]
-                final_df = final_df[columns_order]
-
-                for _, row in final_df.iterrows():
-                    raw_deadline = row.get("Deadline")
-
-                    if raw_deadline is None:
-                        # No deadline provided; assign defaults.
-                        deadline_primary = datetime.today().date()
-                        deadline_secondary = None
-                    elif isinstance(raw_deadline, str):
-                        # If it's a string, format it into a date or tuple of dates.
-                        formatted_deadline = format_date(raw_deadline)
-                        if isinstance(formatted_deadline, tuple):
-                            deadline_primary, deadline_secondary = formatted_deadline
-                        else:
-                            deadline_primary = formatted_deadline
-                            deadline_secondary = None
-                    elif isinstance(raw_deadline, date):
-                        # raw_deadline is already a date object
-                        deadline_primary = raw_deadline
-                        deadline_secondary = None
-                    else:
-                        # Fallback: assign default values if the data type is not recognized.
-                        deadline_primary = datetime.today().date()
-                        deadline_secondary = None
-
-                    try:
-                        accepted_projects = int(row.get("Accepted Projects", 0))
-                    except ValueError:
-                        accepted_projects = 0
-
-                    category_name = selected_categories[counter_for_menu]
-                    category_id = await get_category_id(category_name)
-
-                    record = {
-                        "identifier": row.get("Identifier"),
-                        "title": row.get("Title"),
-                        "action_type": row.get("Action"),
-                        "budget": row.get("Budget"),
-                        "funding_per_project": row.get("Funding Per Project"),
-                        "deadline_primary": deadline_primary,
-                        "deadline_secondary": deadline_secondary,
-                        "opening_date": formatted_opendate,
-                        "accepted_projects": row.get("Accepted Projects"),
-                        "probability_rate": row.get("Probability Rate"),
-                        "link": row.get("Link"),
-                        "category_id": category_id,
-                        "status": status,
-                        "funding_rate": row.get("Funding Rate")
-                    }
-
-                    try:
-                        await store_call(record)
-                    except Exception as store_error:
-                        print(f"Error during record extraction: {store_error}")
-
-            counter_for_menu+=1
-
-        os.remove("scraping_in_progress.json")
-        # Close the browser
-        await browser.close()
\ No newline at end of file
+async def scrape_eu_portal(closed_option, forthcoming_option, open_option, desired_category: list = None,
+                           get_categories_only: bool = False, concurrent: bool = SCRAPER_CONCURRENT,
+                           max_concurrency: int = SCRAPER_MAX_CONCURRENCY, lean_browser: bool = SCRAPER_LEAN_BROWSER,
+                           browser_manager=None, incremental: bool = SCRAPER_INCREMENTAL,
+                           record_har_dir: str = SCRAPER_RECORD_HAR_DIR, replay_har_dir: str = SCRAPER_REPLAY_HAR_DIR,
+                           resume: bool = True, on_progress=None):
+    """
+    Scrapes the Horizon calls of the selected categories, or only lists the categories.
+
+    With a `browser_manager` the run uses its shared, already running browser; otherwise a
+    browser is launched for this run and closed at the end.
+
+    With `record_har_dir` all traffic of the run, including pagination and detail tabs, is
+    recorded as HAR files; with `replay_har_dir` such a recording is served instead of the
+    live portal.
+
+    Every run is checkpointed in Postgres. With `resume` a run with the same statuses and
+    categories as an unfinished run continues it instead of starting over.
+
+    `on_progress` receives a dict for every progress event of the run (see progress.py).
+    """
+    set_progress_callback(on_progress)
+    browser_profile = BrowserProfile(lean=lean_browser, record_har_dir=record_har_dir, replay_har_dir=replay_har_dir)
+    options = dict(closed_option=closed_option, forthcoming_option=forthcoming_option, open_option=open_option,
+                   desired_category=desired_category, get_categories_only=get_categories_only,
+                   concurrent=concurrent, max_concurrency=max_concurrency, incremental=incremental,
+                   resume=resume)
+
+    if browser_manager is not None:
+        browser = await browser_manager.get_browser()
+        return await scrape_with_browser(browser, browser_profile, **options)
+
+    async with async_playwright() as p:
+        # Launch the browser
+        browser = await p.chromium.launch(headless=True, **browser_profile.launch_options())  #change to False to run with UI
+        try:
+            return await scrape_with_browser(browser, browser_profile, **options)
+        finally:
+            # Close the browser
+            await browser.close()
+
+
+async def scrape_with_browser(browser, browser_profile, closed_option, forthcoming_option, open_option,
+                              desired_category: list = None, get_categories_only: bool = False,
+                              concurrent: bool = SCRAPER_CONCURRENT, max_concurrency: int = SCRAPER_MAX_CONCURRENCY,
+                              incremental: bool = SCRAPER_INCREMENTAL, resume: bool = True):
+    """
+    Runs a scrape on an already launched browser. Every context the run opens is closed at the end.
+    """
+    print("Searching for calls. Please be patient")
+    run_start = time.perf_counter()
+    wait_timings = start_wait_recording()
+    context = await browser_profile.new_context(browser)
+    try:
+        page = await context.new_page()
+
+    # ======================================= Apply Filters ===========================================
+
+        selected_statuses = {
+            "closed": closed_option,  # User wants "Closed" selected
+            "forthcoming": forthcoming_option,  # User wants "Forthcoming" unselected
+            "open": open_option  # User wants "Open" selected
+        }
+
+        await apply_portal_filters(page, selected_statuses)
+
+        #============ fetch all the available calls and ask to choose one ====================
+
+        dropdown_container = await open_call_dropdown(page)
+        options = await collect_category_options(dropdown_container)
+
+        # Print all extracted options
+        print("Extracted Options:", options)
+
+        await register_categories(options)
+
+        #==================================== get input =========================================
+
+        menu_option_call = 1
+        for i in range(len(options)):
+            print(menu_option_call, ") ", options[i])
+            menu_option_call += 1
+
+        if get_categories_only:
+            print_wait_summary(wait_timings)
+            browser_profile.print_summary()
+            return options  # Return list of categories to `/home`
+
+        selected_categories = [category for category in desired_category if category in options]
+
+        if "0" in desired_category:  # If "0" is provided, select all
+            selected_categories = options
+
+        print(selected_categories)
+
+        change_tracker = ChangeTracker() if incremental else None
+
+        checkpoint = await RunCheckpoint.start(
+            run_params(closed_option, forthcoming_option, open_option, selected_categories), resume
+        )
+        report_progress("run_started", run_id=checkpoint.run_id, categories=selected_categories)
+        remaining_categories = checkpoint.pending_categories(selected_categories)
+
+        # Create "scraping in progress" flag
+        open("scraping_in_progress.json", "w").close()
+
+        # ============================ Pagination and Data Extraction =====================================
+
+        try:
+            if concurrent:
+                # Every category gets its own context
+                await scrape_categories_concurrently(browser, browser_profile, remaining_categories, selected_statuses,
+                                                     max_concurrency, change_tracker, checkpoint)
+            else:
+                await scrape_categories_sequentially(context, page, remaining_categories, change_tracker, checkpoint)
+        except Exception as e:
+            await checkpoint.fail(e)
+            report_progress("run_failed", run_id=checkpoint.run_id, error=str(e))
+            raise
+        finally:
+            # Never leave the flag behind, or /loading keeps waiting forever
+            if os.path.exists("scraping_in_progress.json"):
+                os.remove("scraping_in_progress.json")
+
+        await checkpoint.finish()
+        report_progress("run_finished", run_id=checkpoint.run_id,
+                        failed_categories=[category for category in selected_categories
+                                           if checkpoint.categories[category]["status"] != "done"])
+
+        print_wait_summary(wait_timings)
+        browser_profile.print_summary()
+        if change_tracker is not None:
+            change_tracker.print_summary()
+        print(f"Scrape run finished in {time.perf_counter() - run_start:.1f} s")
+    finally:
+        await context.close()
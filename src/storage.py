@@ -0,0 +1,746 @@
+"""
+Storage backends for the calls, categories and scraper state.
+
+Usage (from the src folder):
+    STORAGE_BACKEND=memory MEMORY_STORAGE_SYNTHETIC_CALLS=100000 uvicorn api:app
+
+"postgres" (the default) keeps the calls in the DATABASE_URL database. "memory" keeps them
+in process with indexed lookups, so the API and its templates can be load-tested and
+profiled without a database. The memory backend starts empty, or filled with
+MEMORY_STORAGE_SYNTHETIC_CALLS synthetic calls.
+"""
+import os
+import random
+import re
+import statistics
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+import database
+from database import encode_cursor, decode_cursor, cursor_param, call_sort_keys, call_columns
+
+# "postgres" or "memory"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres").lower()
+
+# Synthetic calls loaded into the memory backend at startup
+MEMORY_STORAGE_SYNTHETIC_CALLS = int(os.getenv("MEMORY_STORAGE_SYNTHETIC_CALLS", "0"))
+
+
+class Storage(ABC):
+    """
+    The storage operations of the API, the scraper and the scheduler. The signatures and
+    returned rows are those of the same-named functions in database.py.
+    """
+
+    # Whether the backend needs the database pool and migrations at startup
+    uses_database = False
+
+    # Calls and categories
+
+    @abstractmethod
+    async def fetch_calls_page(self, keyword: str = "", status: List[str] = None, probability: str = "all",
+                               search_mode: str = "substring", sort: str = "deadline", order: str = "asc",
+                               after: str = None, before: str = None, page_size: int = 10,
+                               min_funding: int = None, max_funding: int = None) -> dict: ...
+
+    @abstractmethod
+    async def fetch_export_rows(self, keyword: str, status_list: List[str], probability: str) -> list: ...
+
+    @abstractmethod
+    async def fetch_category_identifiers(self, category_id: int) -> list: ...
+
+    @abstractmethod
+    async def store_call(self, data: dict): ...
+
+    @abstractmethod
+    async def store_calls(self, records: List[dict]) -> int: ...
+
+    @abstractmethod
+    async def store_categories(self, names: List[str]) -> dict: ...
+
+    @abstractmethod
+    async def fetch_category_ids(self) -> dict: ...
+
+    @abstractmethod
+    async def fetch_category_next_deadlines(self, statuses: List[str]) -> dict: ...
+
+    # Aggregates and history
+
+    @abstractmethod
+    async def refresh_call_aggregates(self): ...
+
+    @abstractmethod
+    async def fetch_call_aggregates(self, cluster: str = None, status: List[str] = None) -> list: ...
+
+    @abstractmethod
+    async def compare_calls(self, as_of_a: datetime, as_of_b: datetime, cluster: str = None,
+                            category_id: int = None) -> list: ...
+
+    # Scraper state
+
+    @abstractmethod
+    async def fetch_category_cache(self, status_key: str): ...
+
+    @abstractmethod
+    async def store_category_cache(self, status_key: str, categories: List[str], fetched_at: datetime): ...
+
+    @abstractmethod
+    async def fetch_call_fingerprints(self, identifiers: List[str]) -> dict: ...
+
+    @abstractmethod
+    async def store_call_fingerprints(self, fingerprints: List[tuple]): ...
+
+    @abstractmethod
+    async def touch_call_fingerprints(self, identifiers: List[str]): ...
+
+    @abstractmethod
+    async def create_scrape_run(self, params_key: str, params: dict, categories: List[str]) -> int: ...
+
+    @abstractmethod
+    async def find_resumable_scrape_run(self, params_key: str): ...
+
+    @abstractmethod
+    async def fetch_scrape_run(self, run_id: int): ...
+
+    @abstractmethod
+    async def fetch_scrape_runs(self, limit: int = 20) -> list: ...
+
+    @abstractmethod
+    async def update_scrape_run(self, run_id: int, status: str, error: str = None): ...
+
+    @abstractmethod
+    async def update_scrape_run_category(self, run_id: int, category: str, status: str, last_page: int = None,
+                                         error: str = None): ...
+
+    @abstractmethod
+    async def interrupt_running_scrape_runs(self): ...
+
+    @abstractmethod
+    async def fetch_category_last_scraped(self) -> dict: ...
+
+
+class PostgresStorage(Storage):
+    """
+    Everything in the DATABASE_URL database.
+    """
+
+    uses_database = True
+
+    async def fetch_calls_page(self, *args, **kwargs) -> dict:
+        return await database.fetch_calls_page(*args, **kwargs)
+
+    async def fetch_export_rows(self, keyword: str, status_list: List[str], probability: str) -> list:
+        return await database.fetch_export_rows(keyword, status_list, probability)
+
+    async def fetch_category_identifiers(self, category_id: int) -> list:
+        return await database.fetch_category_identifiers(category_id)
+
+    async def store_call(self, data: dict):
+        await database.store_call(data)
+
+    async def store_calls(self, records: List[dict]) -> int:
+        return await database.store_calls(records)
+
+    async def store_categories(self, names: List[str]) -> dict:
+        return await database.store_categories(names)
+
+    async def fetch_category_ids(self) -> dict:
+        return await database.fetch_category_ids()
+
+    async def fetch_category_next_deadlines(self, statuses: List[str]) -> dict:
+        return await database.fetch_category_next_deadlines(statuses)
+
+    async def refresh_call_aggregates(self):
+        await database.refresh_call_aggregates()
+
+    async def fetch_call_aggregates(self, cluster: str = None, status: List[str] = None) -> list:
+        return await database.fetch_call_aggregates(cluster, status)
+
+    async def compare_calls(self, as_of_a: datetime, as_of_b: datetime, cluster: str = None,
+                            category_id: int = None) -> list:
+        return await database.compare_calls(as_of_a, as_of_b, cluster, category_id)
+
+    async def fetch_category_cache(self, status_key: str):
+        return await database.fetch_category_cache(status_key)
+
+    async def store_category_cache(self, status_key: str, categories: List[str], fetched_at: datetime):
+        await database.store_category_cache(status_key, categories, fetched_at)
+
+    async def fetch_call_fingerprints(self, identifiers: List[str]) -> dict:
+        return await database.fetch_call_fingerprints(identifiers)
+
+    async def store_call_fingerprints(self, fingerprints: List[tuple]):
+        await database.store_call_fingerprints(fingerprints)
+
+    async def touch_call_fingerprints(self, identifiers: List[str]):
+        await database.touch_call_fingerprints(identifiers)
+
+    async def create_scrape_run(self, params_key: str, params: dict, categories: List[str]) -> int:
+        return await database.create_scrape_run(params_key, params, categories)
+
+    async def find_resumable_scrape_run(self, params_key: str):
+        return await database.find_resumable_scrape_run(params_key)
+
+    async def fetch_scrape_run(self, run_id: int):
+        return await database.fetch_scrape_run(run_id)
+
+    async def fetch_scrape_runs(self, limit: int = 20) -> list:
+        return await database.fetch_scrape_runs(limit)
+
+    async def update_scrape_run(self, run_id: int, status: str, error: str = None):
+        await database.update_scrape_run(run_id, status, error)
+
+    async def update_scrape_run_category(self, run_id: int, category: str, status: str, last_page: int = None,
+                                         error: str = None):
+        await database.update_scrape_run_category(run_id, category, status, last_page, error)
+
+    async def interrupt_running_scrape_runs(self):
+        await database.interrupt_running_scrape_runs()
+
+    async def fetch_category_last_scraped(self) -> dict:
+        return await database.fetch_category_last_scraped()
+
+
+# Largest bigint; missing amounts sort last like in call_sort_keys
+missing_amount = 9223372036854775807
+
+# Sort key -> value of a call, matching the SQL expressions of call_sort_keys
+memory_sort_values = {
+    "deadline": lambda call: call["deadline_primary"] or date.max,
+    "budget": lambda call: missing_amount if call["budget_amount"] is None else call["budget_amount"],
+    "funding": lambda call: missing_amount if call["funding_max"] is None else call["funding_max"],
+    "opening_date": lambda call: call["opening_date"] or date.max,
+    "identifier": lambda call: call["identifier"],
+}
+
+# Call columns of the results table and of the export, besides the category name
+list_columns = (
+    "identifier", "title", "action_type", "budget", "funding_per_project", "deadline_primary",
+    "deadline_secondary", "accepted_projects", "probability_rate", "link", "opening_date", "status",
+    "funding_rate", "budget_amount", "funding_min", "funding_max", "grant_count"
+)
+export_columns = tuple(column for column in list_columns if column != "funding_rate")
+
+# ts_rank's default weights of the A (identifier, title) and B (description) labels
+term_weights = {"A": 1.0, "B": 0.4}
+
+
+def call_cluster(identifier: str) -> str:
+    """
+    Same as the call_cluster() SQL function: HORIZON-CL5-... -> CL5, other programmes by their prefix.
+    """
+    parts = identifier.split("-")
+    if parts[0].upper() == "HORIZON" and len(parts) > 1 and parts[1]:
+        return parts[1].upper()
+    return parts[0].upper()
+
+
+def terms(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def parse_search_query(keyword: str):
+    """
+    Splits a websearch_to_tsquery style keyword into required and excluded terms.
+
+    Returns:
+        A list of clauses, each a list of alternative terms ("a or b"), and the excluded terms ("-word").
+        Quoted phrases require each of their words; there is no stemming.
+    """
+    clauses, excluded = [], []
+    join_next = False
+    for token in re.findall(r'-?"[^"]*"|\S+', keyword):
+        if token.lower() == "or":
+            join_next = bool(clauses)
+            continue
+        negated = token.startswith("-")
+        words = terms(token)
+        if not words:
+            continue
+        if negated:
+            excluded.extend(words)
+        elif join_next:
+            clauses[-1].extend(words)
+        else:
+            clauses.extend([word] for word in words)
+        join_next = False
+    return clauses, excluded
+
+
+class MemoryStorage(Storage):
+    """
+    Everything held in process, for profiling the API without a database.
+
+    Besides the calls by identifier it keeps the ids of the calls per status, probability
+    rate, category and search term, and one sorted (sort value, identifier) list per sort
+    key, so filters intersect index sets and pages are found by bisecting instead of
+    scanning. Keyword substrings are matched against the calls left by the other filters.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.category_ids = {}
+        self.category_names = {}
+        self.by_status = {}
+        self.by_probability = {}
+        self.by_category = {}
+        self.by_term = {}
+        # identifier -> {term: weight} for ranking full-text matches
+        self.call_terms = {}
+        # identifier -> lowercased identifier, title and category name for substring matches
+        self.search_text = {}
+        # sort key -> sorted [(sort value, identifier)], rebuilt on the next read after a write
+        self.sorted_keys = {}
+        # Like call_history: (identifier, change, changed fields, changed_at) in order
+        self.history = []
+        self.category_cache = {}
+        self.fingerprints = {}
+        # run id -> run row, and run id -> {category: category row}
+        self.runs = {}
+        self.run_categories = {}
+
+    def index(self, call: dict, add: bool):
+        identifier = call["identifier"]
+        entries = [
+            (self.by_status, (call["status"] or "").lower()),
+            (self.by_probability, (call["probability_rate"] or "").lower()),
+            (self.by_category, call["category_id"]),
+        ]
+        if add:
+            weights = {}
+            for label, text in [("B", call["description"]), ("A", call["identifier"]), ("A", call["title"])]:
+                weights.update({term: term_weights[label] for term in terms(text)})
+            self.call_terms[identifier] = weights
+            self.search_text[identifier] = (
+                call["identifier"].lower(), (call["title"] or "").lower(),
+                self.category_names.get(call["category_id"], "").lower()
+            )
+        else:
+            weights = self.call_terms.pop(identifier)
+            self.search_text.pop(identifier)
+        entries += [(self.by_term, term) for term in weights]
+
+        for index, key in entries:
+            if add:
+                index.setdefault(key, set()).add(identifier)
+            else:
+                index[key].discard(identifier)
+        self.sorted_keys.clear()
+
+    def put(self, data: dict) -> bool:
+        """
+        Inserts or replaces a call; returns False if it is stored unchanged.
+        """
+        call = {column: data.get(column) for column in call_columns}
+        current = self.calls.get(call["identifier"])
+        if current == call:
+            return False
+        if current is not None:
+            self.index(current, add=False)
+            changes = {column: value for column, value in call.items() if current[column] != value}
+            self.history.append((call["identifier"], "update", changes, datetime.now(timezone.utc)))
+        else:
+            self.history.append((call["identifier"], "insert", dict(call), datetime.now(timezone.utc)))
+        self.calls[call["identifier"]] = call
+        self.index(call, add=True)
+        return True
+
+    async def store_call(self, data: dict):
+        self.put(data)
+
+    async def store_calls(self, records: List[dict]) -> int:
+        # The last record of an identifier wins
+        unique = {record.get("identifier"): record for record in records}
+        return sum(self.put(record) for record in unique.values())
+
+    async def store_categories(self, names: List[str]) -> dict:
+        for name in names:
+            if name not in self.category_ids:
+                category_id = len(self.category_ids) + 1
+                self.category_ids[name] = category_id
+                self.category_names[category_id] = name
+        return {name: self.category_ids[name] for name in names}
+
+    async def fetch_category_ids(self) -> dict:
+        return dict(self.category_ids)
+
+    async def fetch_category_identifiers(self, category_id: int) -> list:
+        return list(self.by_category.get(category_id, ()))
+
+    def search_scores(self, keyword: str) -> dict:
+        """
+        Returns {identifier: rank} of the calls matching a full-text keyword.
+        """
+        clauses, excluded = parse_search_query(keyword)
+        if not clauses:
+            return {}
+        matches = None
+        for clause in clauses:
+            found = set().union(*(self.by_term.get(term, set()) for term in clause))
+            matches = found if matches is None else matches & found
+        matches -= set().union(*(self.by_term.get(term, set()) for term in excluded))
+        query_terms = [term for clause in clauses for term in clause]
+        return {
+            identifier: sum(self.call_terms[identifier].get(term, 0) for term in query_terms)
+            for identifier in matches
+        }
+
+    def filter_identifiers(self, keyword: str, status: List[str], probability: str, scores: dict = None,
+                           min_funding: int = None, max_funding: int = None, match_category: bool = True):
+        """
+        Returns the identifiers matching the filters like build_call_filters, or None for all calls.
+        """
+        sets = []
+        if scores is not None:
+            sets.append(set(scores))
+        statuses = [s.lower() for s in status or [] if s.lower() != "all"]
+        if statuses:
+            sets.append(set().union(*(self.by_status.get(s, set()) for s in statuses)))
+        if probability.lower() != "all":
+            sets.append(self.by_probability.get(probability.lower(), set()))
+
+        # Intersect starting from the most selective index
+        sets.sort(key=len)
+        identifiers = set(sets[0]).intersection(*sets[1:]) if sets else None
+
+        needle = keyword.strip().lower() if scores is None else ""
+        if needle or min_funding is not None or max_funding is not None:
+            # The export only matches the identifier and title, not the category name
+            fields = 3 if match_category else 2
+            candidates = identifiers if identifiers is not None else self.calls.keys()
+            identifiers = set()
+            for identifier in candidates:
+                call = self.calls[identifier]
+                if needle and not any(needle in text for text in self.search_text[identifier][:fields]):
+                    continue
+                if min_funding is not None and (call["funding_max"] is None or call["funding_max"] < min_funding):
+                    continue
+                if max_funding is not None and (call["funding_min"] is None or call["funding_min"] > max_funding):
+                    continue
+                identifiers.add(identifier)
+        return identifiers
+
+    def list_row(self, identifier: str, columns: tuple) -> dict:
+        call = self.calls[identifier]
+        row = {column: call[column] for column in columns}
+        row["category_name"] = self.category_names.get(call["category_id"])
+        return row
+
+    def sorted_index(self, sort: str) -> list:
+        if sort not in self.sorted_keys:
+            value = memory_sort_values[sort]
+            self.sorted_keys[sort] = sorted((value(call), identifier) for identifier, call in self.calls.items())
+        return self.sorted_keys[sort]
+
+    async def fetch_calls_page(self, keyword: str = "", status: List[str] = None, probability: str = "all",
+                               search_mode: str = "substring", sort: str = "deadline", order: str = "asc",
+                               after: str = None, before: str = None, page_size: int = 10,
+                               min_funding: int = None, max_funding: int = None) -> dict:
+        fulltext = search_mode == "fulltext" and bool(keyword.strip())
+        if sort not in call_sort_keys or (sort == "relevance" and not fulltext):
+            sort = "relevance" if fulltext else "deadline"
+        descending = order == "desc"
+        scores = self.search_scores(keyword) if fulltext else None
+        identifiers = self.filter_identifiers(keyword, status, probability, scores, min_funding, max_funding)
+        total = len(self.calls) if identifiers is None else len(identifiers)
+
+        if sort == "relevance":
+            keys = sorted((scores[identifier], identifier) for identifier in identifiers)
+        elif identifiers is not None and len(identifiers) * 8 < len(self.calls):
+            # Sorting a few matches is cheaper than skipping past the others in the full index
+            value = memory_sort_values[sort]
+            keys = sorted((value(self.calls[identifier]), identifier) for identifier in identifiers)
+            identifiers = None
+        else:
+            keys = self.sorted_index(sort)
+
+        # Same cursor semantics as the keyset query of database.fetch_calls_page
+        backwards = before is not None
+        cursor = decode_cursor(after if not backwards else before) if (after or before) else None
+        reverse = descending != backwards
+        if cursor is not None:
+            position = (cursor_param(cursor[0], call_sort_keys[sort][1]), cursor[1])
+            start = bisect_left(keys, position) - 1 if reverse else bisect_right(keys, position)
+        else:
+            start = len(keys) - 1 if reverse else 0
+
+        page = []
+        step = -1 if reverse else 1
+        index = start
+        while 0 <= index < len(keys) and len(page) <= page_size:
+            sort_value, identifier = keys[index]
+            if identifiers is None or identifier in identifiers:
+                page.append((sort_value, identifier))
+            index += step
+
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if backwards:
+            page.reverse()
+
+        first_cursor = encode_cursor(*page[0]) if page else None
+        last_cursor = encode_cursor(*page[-1]) if page else None
+        if backwards:
+            has_next, has_prev = cursor is not None, has_more
+        else:
+            has_next, has_prev = has_more, cursor is not None
+
+        return {
+            "rows": [self.list_row(identifier, list_columns) for _, identifier in page],
+            "total": total,
+            "sort": sort,
+            "order": "desc" if descending else "asc",
+            "next_cursor": last_cursor if has_next else None,
+            "prev_cursor": first_cursor if has_prev else None
+        }
+
+    async def fetch_export_rows(self, keyword: str, status_list: List[str], probability: str) -> list:
+        identifiers = self.filter_identifiers(keyword, status_list, probability, match_category=False)
+        identifiers = self.calls if identifiers is None else identifiers
+        return [self.list_row(identifier, export_columns) for identifier in identifiers]
+
+    async def fetch_category_next_deadlines(self, statuses: List[str]) -> dict:
+        today = date.today()
+        deadlines = {}
+        for status in {s.lower() for s in statuses}:
+            for identifier in self.by_status.get(status, ()):
+                call = self.calls[identifier]
+                deadline = call["deadline_primary"]
+                name = self.category_names.get(call["category_id"])
+                if name is not None and deadline is not None and deadline >= today:
+                    deadlines[name] = min(deadlines.get(name, deadline), deadline)
+        return deadlines
+
+    async def refresh_call_aggregates(self):
+        # Aggregates are computed when they are read
+        pass
+
+    async def fetch_call_aggregates(self, cluster: str = None, status: List[str] = None) -> list:
+        statuses = {s.lower() for s in status or []}
+        groups = {}
+        for call in self.calls.values():
+            key = (call_cluster(call["identifier"]), self.category_names.get(call["category_id"]),
+                   (call["status"] or "unknown").lower())
+            if key[1] is None or (cluster and key[0] != cluster.upper()) or (statuses and key[2] not in statuses):
+                continue
+            groups.setdefault(key, []).append(call)
+
+        today = date.today()
+        rows = []
+        for (call_group, category, call_status), calls in sorted(groups.items()):
+            budgets = [call["budget_amount"] for call in calls if call["budget_amount"] is not None]
+            deadlines = [call["deadline_primary"] for call in calls
+                         if call["deadline_primary"] is not None and call["deadline_primary"] >= today]
+            probabilities = [(call["probability_rate"] or "").lower() for call in calls]
+            rows.append({
+                "cluster": call_group, "category": category, "status": call_status,
+                "call_count": len(calls),
+                "total_budget": sum(budgets) if budgets else None,
+                "median_budget": statistics.median(budgets) if budgets else None,
+                "next_deadline": min(deadlines) if deadlines else None,
+                "low_probability": probabilities.count("low"),
+                "medium_probability": probabilities.count("medium"),
+                "high_probability": probabilities.count("high"),
+                "unknown_probability": sum(1 for p in probabilities if p not in ("low", "medium", "high"))
+            })
+        return rows
+
+    def snapshot(self, as_of: datetime, identifiers: set) -> dict:
+        calls = {}
+        for identifier, change, changes, changed_at in self.history:
+            if changed_at >= as_of:
+                break
+            if identifier not in identifiers:
+                continue
+            if change == "delete":
+                calls.pop(identifier, None)
+            else:
+                calls.setdefault(identifier, {}).update(changes)
+        return calls
+
+    async def compare_calls(self, as_of_a: datetime, as_of_b: datetime, cluster: str = None,
+                            category_id: int = None) -> list:
+        identifiers = {identifier for identifier, _, changes, _ in self.history
+                       if (not cluster or call_cluster(identifier) == cluster.upper())
+                       and (category_id is None or changes.get("category_id") == category_id)}
+        snapshot_a, snapshot_b = self.snapshot(as_of_a, identifiers), self.snapshot(as_of_b, identifiers)
+
+        rows = []
+        for identifier in snapshot_a.keys() | snapshot_b.keys():
+            fields_a, fields_b = snapshot_a.get(identifier), snapshot_b.get(identifier)
+            if fields_a is None:
+                change = "added"
+            elif fields_b is None:
+                change = "removed"
+            else:
+                change = "unchanged" if fields_a == fields_b else "changed"
+            fields_a, fields_b = fields_a or {}, fields_b or {}
+            rows.append({
+                "identifier": identifier,
+                "change": change,
+                "differences": {key: {"from": fields_a.get(key), "to": fields_b.get(key)}
+                                for key in fields_a.keys() | fields_b.keys()
+                                if fields_a.get(key) != fields_b.get(key)},
+                "status_a": fields_a.get("status"),
+                "status_b": fields_b.get("status"),
+                "budget_a": fields_a.get("budget_amount"),
+                "budget_b": fields_b.get("budget_amount")
+            })
+        rows.sort(key=lambda row: (row["change"], row["identifier"]))
+        return rows
+
+    async def fetch_category_cache(self, status_key: str):
+        entry = self.category_cache.get(status_key)
+        return dict(entry) if entry else None
+
+    async def store_category_cache(self, status_key: str, categories: List[str], fetched_at: datetime):
+        self.category_cache[status_key] = {"categories": list(categories), "fetched_at": fetched_at}
+
+    async def fetch_call_fingerprints(self, identifiers: List[str]) -> dict:
+        return {identifier: dict(self.fingerprints[identifier])
+                for identifier in identifiers if identifier in self.fingerprints}
+
+    async def store_call_fingerprints(self, fingerprints: List[tuple]):
+        now = datetime.now(timezone.utc)
+        for identifier, card_hash, content_hash in fingerprints:
+            self.fingerprints[identifier] = {"identifier": identifier, "card_hash": card_hash,
+                                             "content_hash": content_hash, "verified_at": now}
+
+    async def touch_call_fingerprints(self, identifiers: List[str]):
+        now = datetime.now(timezone.utc)
+        for identifier in identifiers:
+            if identifier in self.fingerprints:
+                self.fingerprints[identifier]["verified_at"] = now
+
+    async def create_scrape_run(self, params_key: str, params: dict, categories: List[str]) -> int:
+        run_id = len(self.runs) + 1
+        now = datetime.now(timezone.utc)
+        self.runs[run_id] = {"id": run_id, "params_key": params_key, "params": params, "status": "running",
+                             "error": None, "started_at": now, "updated_at": now, "finished_at": None}
+        self.run_categories[run_id] = {
+            category: {"category": category, "status": "pending", "last_page": 0, "error": None, "updated_at": now}
+            for category in categories
+        }
+        return run_id
+
+    async def find_resumable_scrape_run(self, params_key: str):
+        runs = [run for run in self.runs.values() if run["params_key"] == params_key and run["status"] != "finished"]
+        return max(runs, key=lambda run: run["started_at"])["id"] if runs else None
+
+    async def fetch_scrape_run(self, run_id: int):
+        if run_id not in self.runs:
+            return None
+        return {**self.runs[run_id], "categories": [dict(row) for row in self.run_categories[run_id].values()]}
+
+    async def fetch_scrape_runs(self, limit: int = 20) -> list:
+        runs = sorted(self.runs.values(), key=lambda run: run["started_at"], reverse=True)[:limit]
+        return [{
+            **{key: run[key] for key in ("id", "status", "error", "started_at", "updated_at", "finished_at")},
+            "categories": len(self.run_categories[run["id"]]),
+            "categories_done": sum(1 for row in self.run_categories[run["id"]].values() if row["status"] == "done")
+        } for run in runs]
+
+    async def update_scrape_run(self, run_id: int, status: str, error: str = None):
+        run = self.runs.get(run_id)
+        if run is not None:
+            run.update(status=status, error=error, updated_at=datetime.now(timezone.utc))
+            if status == "finished":
+                run["finished_at"] = run["updated_at"]
+
+    async def update_scrape_run_category(self, run_id: int, category: str, status: str, last_page: int = None,
+                                         error: str = None):
+        row = self.run_categories.get(run_id, {}).get(category)
+        if row is not None:
+            row.update(status=status, error=error, updated_at=datetime.now(timezone.utc))
+            if last_page is not None:
+                row["last_page"] = last_page
+
+    async def interrupt_running_scrape_runs(self):
+        for run in self.runs.values():
+            if run["status"] == "running":
+                run.update(status="interrupted", updated_at=datetime.now(timezone.utc))
+
+    async def fetch_category_last_scraped(self) -> dict:
+        scraped = {}
+        for categories in self.run_categories.values():
+            for row in categories.values():
+                if row["status"] == "done":
+                    scraped[row["category"]] = max(scraped.get(row["category"], row["updated_at"]), row["updated_at"])
+        return scraped
+
+
+synthetic_clusters = ["CL1", "CL2", "CL3", "CL4", "CL5", "CL6"]
+synthetic_statuses = ["Open For Submission", "Forthcoming", "Closed"]
+synthetic_probabilities = ["Low", "Medium", "High", None]
+synthetic_words = [
+    "energy", "climate", "health", "digital", "quantum", "battery", "hydrogen", "mobility", "ocean",
+    "security", "culture", "food", "soil", "materials", "robotics", "data", "cancer", "space"
+]
+
+
+def synthetic_dataset(calls: int, seed: int = 0):
+    """
+    Generates calls shaped like scraped Horizon Europe calls.
+
+    Returns:
+        The category names and the call records; the records' category_id is the index of
+        their category name, to be mapped to a stored id.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    categories = [f"HORIZON-{cluster}-{year}-D{destination}-{topic:02d}"
+                  for cluster in synthetic_clusters for year in (2023, 2024, 2025)
+                  for destination in range(1, 5) for topic in range(1, 5)]
+    records = []
+    for i in range(calls):
+        category = rng.randrange(len(categories))
+        words = rng.sample(synthetic_words, 3)
+        funding_min = rng.randrange(1, 50) * 100000
+        funding_max = funding_min + rng.randrange(0, 30) * 100000
+        grants = rng.randrange(1, 10)
+        budget_amount = funding_max * grants if rng.random() > 0.05 else None
+        records.append({
+            "identifier": f"{categories[category]}-{i:06d}",
+            "title": f"{words[0].capitalize()} and {words[1]} solutions",
+            "action_type": rng.choice(["HORIZON-RIA", "HORIZON-IA", "HORIZON-CSA"]),
+            "budget": f"{budget_amount:,}".replace(",", " ") if budget_amount else None,
+            "funding_per_project": f"{funding_min:,} - {funding_max:,}".replace(",", " "),
+            "deadline_primary": today + timedelta(days=rng.randrange(-365, 365)) if rng.random() > 0.02 else None,
+            "deadline_secondary": None,
+            "opening_date": today - timedelta(days=rng.randrange(0, 365)),
+            "accepted_projects": f"{grants}",
+            "probability_rate": rng.choice(synthetic_probabilities),
+            "link": f"https://example.org/calls/{i}",
+            "category_id": category,
+            "status": rng.choice(synthetic_statuses),
+            "funding_rate": rng.choice([60, 70, 100]),
+            "description": f"Research on {' '.join(words)} for a {rng.choice(synthetic_words)} transition.",
+            "budget_amount": budget_amount,
+            "funding_min": funding_min,
+            "funding_max": funding_max,
+            "grant_count": grants
+        })
+    return categories, records
+
+
+async def load_synthetic(target: Storage, calls: int, seed: int = 0) -> int:
+    """
+    Stores `calls` synthetic calls and their categories; returns the number stored.
+    """
+    categories, records = synthetic_dataset(calls, seed)
+    ids = await target.store_categories(categories)
+    for record in records:
+        record["category_id"] = ids[categories[record["category_id"]]]
+    return await target.store_calls(records)
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "postgres":
+        return PostgresStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}', expected 'postgres' or 'memory'")
+
+
+storage = create_storage()
@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+
+# The app modules import each other as top-level modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# Tests run without a database
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+
+@pytest.fixture
+def memory_storage(monkeypatch):
+    """
+    A fresh MemoryStorage in place of the shared `storage` of every app module, so tests
+    do not see each other's calls, runs or categories.
+    """
+    import storage
+    import category_registry
+    fresh = storage.MemoryStorage()
+    shared = storage.storage
+    for module in list(sys.modules.values()):
+        if getattr(module, "storage", None) is shared:
+            monkeypatch.setattr(module, "storage", fresh)
+    category_registry.invalidate()
+    yield fresh
+    category_registry.invalidate()
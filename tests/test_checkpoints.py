@@ -0,0 +1,107 @@
+"""
+Tests of how RunCheckpoint records a scrape run and resumes it, with the memory storage backend.
+"""
+import asyncio
+from checkpoints import RunCheckpoint, run_params
+
+categories = ["HORIZON-CL5-2024-D3-01", "HORIZON-CL5-2024-D3-02", "HORIZON-CL6-2024-ZEROPOLLUTION-01"]
+params = run_params(False, True, True, categories)
+
+
+async def interrupted_run(memory_storage):
+    """
+    A run that finished its first category and stored two pages of its second before the app stopped.
+    """
+    checkpoint = await RunCheckpoint.start(params)
+    await checkpoint.category_started(categories[0])
+    await checkpoint.category_done(categories[0])
+    await checkpoint.category_started(categories[1])
+    for page_number in (1, 2):
+        await checkpoint.page_done(categories[1], page_number)
+    await memory_storage.interrupt_running_scrape_runs()
+    return checkpoint
+
+
+def test_resumed_run_skips_done_categories_and_stored_pages(memory_storage):
+    async def interrupt_and_resume():
+        interrupted = await interrupted_run(memory_storage)
+        return interrupted, await RunCheckpoint.start(params)
+
+    interrupted, resumed = asyncio.run(interrupt_and_resume())
+    assert resumed.run_id == interrupted.run_id
+    assert memory_storage.runs[resumed.run_id]["status"] == "running"
+    assert resumed.pending_categories(categories) == categories[1:]
+    assert resumed.last_page(categories[1]) == 2
+    assert resumed.last_page(categories[2]) == 0
+
+
+def test_run_resumes_whatever_the_order_of_its_categories(memory_storage):
+    async def interrupt_and_resume():
+        interrupted = await interrupted_run(memory_storage)
+        return interrupted, await RunCheckpoint.start(run_params(0, 1, 1, list(reversed(categories))))
+
+    interrupted, resumed = asyncio.run(interrupt_and_resume())
+    assert resumed.run_id == interrupted.run_id
+
+
+def test_other_parameters_or_no_resume_start_a_new_run(memory_storage):
+    async def interrupt_and_start():
+        interrupted = await interrupted_run(memory_storage)
+        other_statuses = await RunCheckpoint.start(run_params(True, True, True, categories))
+        fewer_categories = await RunCheckpoint.start(run_params(False, True, True, categories[:2]))
+        not_resumed = await RunCheckpoint.start(params, resume=False)
+        return interrupted, [other_statuses, fewer_categories, not_resumed]
+
+    interrupted, started = asyncio.run(interrupt_and_start())
+    assert interrupted.run_id not in [checkpoint.run_id for checkpoint in started]
+    assert len({checkpoint.run_id for checkpoint in started}) == 3
+    assert all(checkpoint.pending_categories(categories[:2]) == categories[:2] for checkpoint in started)
+
+
+def test_finished_run_is_not_resumed(memory_storage):
+    async def finish_and_start():
+        checkpoint = await RunCheckpoint.start(params)
+        for category in categories:
+            await checkpoint.category_started(category)
+            await checkpoint.category_done(category)
+        await checkpoint.finish()
+        return checkpoint, await RunCheckpoint.start(params)
+
+    finished, started = asyncio.run(finish_and_start())
+    assert memory_storage.runs[finished.run_id]["status"] == "finished"
+    assert started.run_id != finished.run_id
+    assert started.pending_categories(categories) == categories
+
+
+def test_checkpoint_only_advances_over_consecutive_pages(memory_storage):
+    async def store_pages_out_of_order():
+        checkpoint = await RunCheckpoint.start(params)
+        await checkpoint.category_started(categories[0])
+        last_pages = []
+        for page_number in (2, 4, 1, 3):
+            await checkpoint.page_done(categories[0], page_number)
+            last_pages.append(checkpoint.last_page(categories[0]))
+        return checkpoint, last_pages
+
+    checkpoint, last_pages = asyncio.run(store_pages_out_of_order())
+    assert last_pages == [0, 0, 2, 4]
+    assert memory_storage.run_categories[checkpoint.run_id][categories[0]]["last_page"] == 4
+
+
+def test_run_with_a_failed_category_can_be_resumed(memory_storage):
+    async def fail_and_resume():
+        checkpoint = await RunCheckpoint.start(params)
+        for category in categories:
+            await checkpoint.category_started(category)
+            if category == categories[1]:
+                await checkpoint.category_failed(category, RuntimeError("Results page did not load"))
+            else:
+                await checkpoint.category_done(category)
+        await checkpoint.finish()
+        status = memory_storage.runs[checkpoint.run_id]["status"]
+        return checkpoint, status, await RunCheckpoint.start(params)
+
+    failed, status, resumed = asyncio.run(fail_and_resume())
+    assert status == "failed"
+    assert resumed.run_id == failed.run_id
+    assert resumed.pending_categories(categories) == [categories[1]]
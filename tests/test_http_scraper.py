@@ -0,0 +1,95 @@
+"""
+Runs the HTTP scraper engine against recorded portal responses served by fixture_server.py,
+with the memory storage backend, so no network or database is needed.
+"""
+import asyncio
+import os
+from datetime import date
+from aiohttp import web
+import http_scraper
+from checkpoints import RunCheckpoint, run_params
+from fixture_server import create_fixture_app
+
+fixture_dir = os.path.join(os.path.dirname(__file__), "fixtures", "http")
+category = "HORIZON-CL5-2024-D3-01"
+
+
+async def scrape_from_fixtures(monkeypatch, on_progress=None, resume=False):
+    runner = web.AppRunner(create_fixture_app(fixture_dir))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    monkeypatch.setattr(http_scraper, "SEARCH_API_URL", f"http://127.0.0.1:{port}/search-api")
+    monkeypatch.setattr(http_scraper, "TOPIC_DETAILS_URL", f"http://127.0.0.1:{port}/topicDetails")
+    try:
+        await http_scraper.scrape_eu_portal_http(
+            closed_option=False, forthcoming_option=True, open_option=True,
+            desired_category=[category], incremental=False, resume=resume, on_progress=on_progress
+        )
+    finally:
+        await runner.cleanup()
+
+
+def test_scrapes_category_from_fixtures(tmp_path, monkeypatch, memory_storage):
+    monkeypatch.chdir(tmp_path)
+    events = []
+    asyncio.run(scrape_from_fixtures(monkeypatch, events.append))
+
+    hydrogen = memory_storage.calls["HORIZON-CL5-2024-D3-01-01"]
+    assert hydrogen["title"] == "Clean hydrogen production at scale"
+    assert hydrogen["status"] == "Open For Submission"
+    assert hydrogen["action_type"] == "RIA"
+    assert hydrogen["deadline_primary"] == date(2024, 2, 20)
+    assert hydrogen["opening_date"] == date(2023, 9, 12)
+    assert hydrogen["budget_amount"] == 12000000
+    assert (hydrogen["funding_min"], hydrogen["funding_max"]) == (3000000, 4000000)
+    assert hydrogen["grant_count"] == 3
+    assert hydrogen["funding_rate"] == 70
+    assert hydrogen["description"] == "Projects scale up electrolyser manufacturing."
+
+    battery = memory_storage.calls["HORIZON-CL5-2024-D3-01-02"]
+    assert battery["status"] == "Forthcoming"
+    assert (battery["deadline_primary"], battery["deadline_secondary"]) == (date(2024, 4, 18), date(2024, 9, 5))
+    assert (battery["funding_min"], battery["funding_max"]) == (4000000, 4000000)
+
+    names = [event["event"] for event in events]
+    assert names[0] == "run_started" and names[-1] == "run_finished"
+    stored = [event for event in events if event["event"] == "calls_stored"]
+    assert [(event["category"], event["count"]) for event in stored] == [(category, 2)]
+    assert events[-1]["failed_categories"] == []
+    assert not os.path.exists("scraping_in_progress.json")
+
+
+def test_run_finishes_when_flag_was_already_removed(tmp_path, monkeypatch, memory_storage):
+    monkeypatch.chdir(tmp_path)
+
+    def remove_flag(event):
+        # Another job ending first removes the shared flag
+        if event["event"] == "calls_stored" and os.path.exists("scraping_in_progress.json"):
+            os.remove("scraping_in_progress.json")
+
+    asyncio.run(scrape_from_fixtures(monkeypatch, remove_flag))
+
+    runs = asyncio.run(memory_storage.fetch_scrape_runs(10))
+    assert [run["status"] for run in runs] == ["finished"]
+
+
+def test_resumed_run_skips_categories_done_before_it_stopped(tmp_path, monkeypatch, memory_storage):
+    monkeypatch.chdir(tmp_path)
+
+    async def stop_after_category_then_resume():
+        checkpoint = await RunCheckpoint.start(run_params(False, True, True, [category]))
+        await checkpoint.category_started(category)
+        await checkpoint.category_done(category)
+        await memory_storage.interrupt_running_scrape_runs()
+        events = []
+        await scrape_from_fixtures(monkeypatch, events.append, resume=True)
+        return checkpoint.run_id, events
+
+    run_id, events = asyncio.run(stop_after_category_then_resume())
+    assert memory_storage.calls == {}
+    assert [event["run_id"] for event in events if event["event"] in ("run_started", "run_finished")] == [
+        run_id, run_id
+    ]
+    assert [run["status"] for run in asyncio.run(memory_storage.fetch_scrape_runs(10))] == ["finished"]
@@ -0,0 +1,95 @@
+"""
+Tests of how JobManager joins and merges scrape requests, with a runner that scrapes nothing
+and finishes when the test releases it.
+"""
+import asyncio
+from jobs import JobManager
+
+
+class FakeRunner:
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, closed_option, forthcoming_option, open_option, desired_category, on_progress):
+        self.calls.append(list(desired_category))
+        await self.release.wait()
+
+
+async def started(manager: JobManager):
+    # Lets the queued jobs take their semaphore slots
+    for _ in range(3):
+        await asyncio.sleep(0)
+    return {job.id: job.state for job in manager.jobs.values()}
+
+
+def run_jobs(test, max_concurrent: int = 1):
+    async def run():
+        runner = FakeRunner()
+        manager = JobManager(runner, max_concurrent=max_concurrent)
+        await test(manager, runner)
+        runner.release.set()
+        await asyncio.gather(*(job.task for job in manager.jobs.values()))
+        return manager, runner
+
+    return asyncio.run(run())
+
+
+def test_request_joins_running_job_that_covers_it():
+    async def test(manager, runner):
+        first = manager.submit(False, True, True, ["A", "B"])
+        await started(manager)
+        assert manager.submit(False, True, True, ["B"]) is first
+
+    manager, runner = run_jobs(test)
+    assert len(manager.jobs) == 1
+    assert runner.calls == [["A", "B"]]
+
+
+def test_request_covered_by_several_running_jobs_starts_no_job():
+    async def test(manager, runner):
+        first = manager.submit(False, True, True, ["A"])
+        await started(manager)
+        second = manager.submit(False, True, True, ["B"])
+        assert await started(manager) == {first.id: "running", second.id: "running"}
+        assert manager.submit(False, True, True, ["A", "B"]) is first
+
+    manager, runner = run_jobs(test, max_concurrent=2)
+    assert len(manager.jobs) == 2
+    assert [] not in runner.calls
+
+
+def test_uncovered_categories_merge_into_one_queued_job():
+    async def test(manager, runner):
+        running = manager.submit(False, True, True, ["A"])
+        await started(manager)
+        queued = manager.submit(False, True, True, ["A", "B"])
+        assert queued is not running and queued.state == "queued"
+        assert manager.submit(False, True, True, ["C"]) is queued
+        assert manager.queue_position(queued) == 1
+
+    manager, runner = run_jobs(test)
+    assert runner.calls == [["A"], ["B", "C"]]
+
+
+def test_requests_with_other_statuses_get_their_own_job():
+    async def test(manager, runner):
+        open_calls = manager.submit(False, False, True, ["A"])
+        await started(manager)
+        assert manager.submit(True, False, False, ["A"]) is not open_calls
+
+    manager, runner = run_jobs(test)
+    assert runner.calls == [["A"], ["A"]]
+    assert [job.state for job in manager.jobs.values()] == ["finished", "finished"]
+
+
+def test_all_categories_request_absorbs_queued_categories():
+    async def test(manager, runner):
+        manager.submit(False, True, True, ["A"])
+        await started(manager)
+        queued = manager.submit(False, True, True, ["B"])
+        assert manager.submit(False, True, True, ["0"]) is queued
+        assert queued.categories == ["0"]
+
+    manager, runner = run_jobs(test)
+    assert runner.calls == [["A"], ["0"]]
@@ -0,0 +1,93 @@
+"""
+Tests of the keyset cursors of fetch_calls_page, walking synthetic calls page by page
+with the memory storage backend.
+"""
+import asyncio
+import pytest
+from storage import load_synthetic
+
+stored_calls = 47
+page_size = 10
+
+
+def identifiers(page):
+    return [row["identifier"] for row in page["rows"]]
+
+
+async def walk(storage, forward=True, first=None, **filters):
+    """
+    Follows the next (or previous) cursors from `first` and returns the pages in walking order.
+    """
+    page = first or await storage.fetch_calls_page(page_size=page_size, **filters)
+    pages = [page]
+    while page["next_cursor" if forward else "prev_cursor"]:
+        cursor = {"after": page["next_cursor"]} if forward else {"before": page["prev_cursor"]}
+        page = await storage.fetch_calls_page(page_size=page_size, **cursor, **filters)
+        pages.append(page)
+    return pages
+
+
+def all_in_order(storage, sort, order):
+    calls = asyncio.run(storage.fetch_calls_page(sort=sort, order=order, page_size=stored_calls))
+    return identifiers(calls)
+
+
+@pytest.mark.parametrize("sort, order", [("deadline", "asc"), ("budget", "desc"), ("identifier", "asc")])
+def test_next_cursors_walk_every_call_once(memory_storage, sort, order):
+    asyncio.run(load_synthetic(memory_storage, stored_calls))
+    pages = asyncio.run(walk(memory_storage, sort=sort, order=order))
+
+    assert [len(page["rows"]) for page in pages] == [10, 10, 10, 10, 7]
+    assert [identifier for page in pages for identifier in identifiers(page)] == all_in_order(
+        memory_storage, sort, order)
+    assert pages[0]["prev_cursor"] is None and pages[-1]["next_cursor"] is None
+    assert {page["total"] for page in pages} == {stored_calls}
+
+
+def test_previous_cursors_return_the_same_pages(memory_storage):
+    asyncio.run(load_synthetic(memory_storage, stored_calls))
+    forward = asyncio.run(walk(memory_storage))
+    backward = asyncio.run(walk(memory_storage, forward=False, first=forward[-1]))
+    assert [identifiers(page) for page in reversed(backward)] == [identifiers(page) for page in forward]
+
+
+def test_last_page_holds_the_remainder_and_lines_up_going_back(memory_storage):
+    # Like the "Last" button of render_results: an empty before cursor with the remainder as page size
+    asyncio.run(load_synthetic(memory_storage, stored_calls))
+    forward = asyncio.run(walk(memory_storage))
+    last = asyncio.run(memory_storage.fetch_calls_page(before="", page_size=stored_calls % page_size))
+    assert last["next_cursor"] is None
+
+    backward = asyncio.run(walk(memory_storage, forward=False, first=last))
+    assert [identifiers(page) for page in reversed(backward)] == [identifiers(page) for page in forward]
+
+
+def test_cursors_keep_the_filters(memory_storage):
+    asyncio.run(load_synthetic(memory_storage, stored_calls))
+    pages = asyncio.run(walk(memory_storage, status=["Open For Submission"], sort="funding", order="desc"))
+    rows = [row for page in pages for row in page["rows"]]
+
+    assert len(rows) == pages[0]["total"] < stored_calls
+    assert {row["status"] for row in rows} == {"Open For Submission"}
+    assert len({row["identifier"] for row in rows}) == len(rows)
+
+
+def test_page_after_a_cursor_does_not_shift_when_earlier_calls_are_added(memory_storage):
+    asyncio.run(load_synthetic(memory_storage, stored_calls))
+    first = asyncio.run(memory_storage.fetch_calls_page(sort="identifier", page_size=page_size))
+    second = asyncio.run(memory_storage.fetch_calls_page(sort="identifier", after=first["next_cursor"],
+                                                         page_size=page_size))
+
+    # Calls sorting before the cursor, e.g. stored by a scrape between two clicks
+    earlier = [dict(call, identifier=f"A-{call['identifier']}") for call in list(memory_storage.calls.values())[:5]]
+    assert asyncio.run(memory_storage.store_calls(earlier)) == 5
+    again = asyncio.run(memory_storage.fetch_calls_page(sort="identifier", after=first["next_cursor"],
+                                                        page_size=page_size))
+    assert identifiers(again) == identifiers(second)
+
+
+def test_invalid_cursor_starts_from_the_first_page(memory_storage):
+    asyncio.run(load_synthetic(memory_storage, stored_calls))
+    first = asyncio.run(memory_storage.fetch_calls_page(page_size=page_size))
+    invalid = asyncio.run(memory_storage.fetch_calls_page(after="not a cursor", page_size=page_size))
+    assert identifiers(invalid) == identifiers(first)
@@ -0,0 +1,108 @@
+"""
+Tests of the result cache: hits, invalidation by the data generation and the LRU memory cap.
+"""
+import asyncio
+import result_cache
+from result_cache import ResultCache, bump_generation, estimate_size, filter_key
+
+
+class Loader:
+    """
+    Loads `value` and counts the loads; `during_load` runs while a load is in progress.
+    """
+
+    def __init__(self, value, during_load=None):
+        self.value = value
+        self.during_load = during_load
+        self.loads = 0
+
+    async def __call__(self):
+        self.loads += 1
+        if self.during_load:
+            self.during_load()
+        return self.value
+
+
+def test_second_lookup_is_a_hit():
+    cache = ResultCache()
+    load = Loader({"rows": [1, 2, 3]})
+
+    async def lookups():
+        return [await cache.get_or_load(("page", 1), load) for _ in range(2)]
+
+    assert asyncio.run(lookups()) == [load.value, load.value]
+    assert load.loads == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_bumped_generation_reloads():
+    cache = ResultCache()
+    load = Loader(["row"])
+
+    async def lookups():
+        await cache.get_or_load(("page", 1), load)
+        bump_generation()
+        await cache.get_or_load(("page", 1), load)
+
+    asyncio.run(lookups())
+    assert load.loads == 2
+    assert cache.hits == 0
+
+
+def test_result_loaded_across_a_bump_is_not_cached():
+    cache = ResultCache()
+    # An ingest stores calls while the query runs
+    stale = Loader(["stale row"], during_load=bump_generation)
+    fresh = Loader(["fresh row"])
+
+    async def lookups():
+        return await cache.get_or_load(("page", 1), stale), await cache.get_or_load(("page", 1), fresh)
+
+    assert asyncio.run(lookups()) == (["stale row"], ["fresh row"])
+    assert cache.entries and fresh.loads == 1
+
+
+def test_least_recently_used_results_are_evicted_over_the_cap():
+    value = ["x" * 100]
+    cache = ResultCache(max_bytes=estimate_size(value) * 2)
+    loads = {key: Loader(value) for key in "abc"}
+
+    async def lookups():
+        await cache.get_or_load(("a",), loads["a"])
+        await cache.get_or_load(("b",), loads["b"])
+        # "a" is used again, so "b" is the least recently used when "c" comes in
+        await cache.get_or_load(("a",), loads["a"])
+        await cache.get_or_load(("c",), loads["c"])
+        await cache.get_or_load(("b",), loads["b"])
+
+    asyncio.run(lookups())
+    assert {key: load.loads for key, load in loads.items()} == {"a": 1, "b": 2, "c": 1}
+    # Reloading "b" evicted "a", used less recently than "c"
+    assert [key[1:] for key in cache.entries] == [("c",), ("b",)]
+    assert cache.evictions == 2
+    assert cache.size <= cache.max_bytes
+
+
+def test_result_larger_than_the_cap_is_not_cached():
+    cache = ResultCache(max_bytes=10)
+    cache.put(("page", 1), ["x" * 100])
+    assert cache.entries == {} and cache.size == 0
+
+
+def test_equivalent_filters_share_a_key():
+    assert filter_key(" Hydrogen ", ["Open For Submission", "forthcoming", " "], "ALL") == filter_key(
+        "hydrogen", ["Forthcoming", "open for submission"], "")
+
+
+def test_stats_report_the_hit_rate():
+    cache = ResultCache()
+    load = Loader([])
+
+    async def lookups():
+        for _ in range(4):
+            await cache.get_or_load(("page",), load)
+
+    asyncio.run(lookups())
+    stats = cache.stats()
+    assert stats["generation"] == result_cache.data_generation
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 3, 1, 0.75)
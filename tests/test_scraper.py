@@ -0,0 +1,129 @@
+"""
+Tests of how the browser engine turns result cards and details rows into stored calls,
+with the memory storage backend.
+"""
+import asyncio
+import pytest
+import category_registry
+from incremental import ChangeTracker
+from result_cache import ResultCache
+from scraper import (
+    parse_detail_table, store_category_results, parse_amount, parse_funding_range, parse_grant_count
+)
+
+category = "HORIZON-CL5-2024-D3-01"
+headers = ["Topic", "Budget (EUR) - Year : 2024", "Stages", "Opening date", "Deadline",
+           "Contributions", "Indicative number of grants"]
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("5 000 000", 5000000),
+    ("5000000.", 5000000),
+    ("€ 2,500,000", 2500000),
+    ("2.500.000", 2500000),
+    ("2.500", 2500),
+    ("12500000.00", 12500000),
+    ("1.234.567,50", 1234568),
+    ("1,234,567.49", 1234567),
+    ("2,5", 3),
+    (12000000, 12000000),
+    ("1.5.3", None),
+    ("No funding info", None),
+    (None, None),
+    (float("nan"), None),
+])
+def test_parse_amount(text, amount):
+    assert parse_amount(text) == amount
+
+
+@pytest.mark.parametrize("text, funding_range", [
+    ("Min: 3000000 Max: 4000000", (3000000, 4000000)),
+    ("Min: 1.234.567,50 Max: 2,000,000", (1234568, 2000000)),
+    ("~ 2.500.000", (2500000, 2500000)),
+    ("4 000 000", (4000000, 4000000)),
+    ("No funding info", (None, None)),
+    (None, (None, None)),
+])
+def test_parse_funding_range(text, funding_range):
+    assert parse_funding_range(text) == funding_range
+
+
+@pytest.mark.parametrize("text, count", [("3", 3), ("2 to 4", 2), ("Not specified", None), (None, None)])
+def test_parse_grant_count(text, count):
+    assert parse_grant_count(text) == count
+
+
+def card(identifier):
+    return {"Identifier": identifier, "Title": f"Title of {identifier}", "Status": "Open For Submission",
+            "Link": f"https://ec.europa.eu/topic-details/{identifier.lower()}"}
+
+
+def details_rows(identifier, funding_rate, deadline="20 February 2024"):
+    cells = [f"{identifier} - HORIZON-RIA", "12 000 000", "Single-stage", "2023-09-12", deadline,
+             "around 4 000 000", "3"]
+    rows, _ = parse_detail_table(headers, [cells], funding_rate)
+    return rows
+
+
+async def store_page(identifiers_and_rates, change_tracker=None, **row_options):
+    await category_registry.register_categories([category])
+    titles = [card(identifier) for identifier, _ in identifiers_and_rates]
+    table = [row for identifier, rate in identifiers_and_rates
+             for row in details_rows(identifier, rate, **row_options)]
+    return await store_category_results(titles, table, category, change_tracker)
+
+
+def test_calls_of_one_page_keep_their_own_funding_rate(memory_storage):
+    page = [("HORIZON-CL5-2024-D3-01-01", 70), ("HORIZON-CL5-2024-D3-01-02", None)]
+    assert asyncio.run(store_page(page)) == 2
+
+    with_rate = memory_storage.calls["HORIZON-CL5-2024-D3-01-01"]["funding_rate"]
+    assert with_rate == 70 and type(with_rate) is int
+    assert memory_storage.calls["HORIZON-CL5-2024-D3-01-02"]["funding_rate"] is None
+
+
+def test_calls_without_funding_rate_are_unchanged_on_the_next_run(memory_storage):
+    page = [("HORIZON-CL5-2024-D3-01-01", 70), ("HORIZON-CL5-2024-D3-01-02", None)]
+
+    async def run_twice():
+        await store_page(page)
+        await store_page(page)
+
+    asyncio.run(run_twice())
+    assert [(identifier, change) for identifier, change, _, _ in memory_storage.history] == [
+        ("HORIZON-CL5-2024-D3-01-01", "insert"), ("HORIZON-CL5-2024-D3-01-02", "insert")
+    ]
+
+
+def test_call_without_deadline_is_unchanged_on_the_next_run(memory_storage):
+    page = [("HORIZON-CL5-2024-D3-01-01", 70)]
+
+    async def run_twice():
+        summaries = []
+        for _ in range(2):
+            tracker = ChangeTracker()
+            await tracker.load([identifier for identifier, _ in page])
+            await store_page(page, tracker, deadline="To be confirmed")
+            summaries.append(tracker.summary())
+        return summaries
+
+    first, second = asyncio.run(run_twice())
+    assert memory_storage.calls["HORIZON-CL5-2024-D3-01-01"]["deadline_primary"] is None
+    assert first == {"new": 1, "changed": 0, "unchanged": 0}
+    assert second == {"new": 0, "changed": 0, "unchanged": 1}
+
+
+def test_stored_calls_invalidate_cached_results(memory_storage):
+    cache = ResultCache()
+
+    async def search_store_and_search():
+        results = []
+        for page in ([("HORIZON-CL5-2024-D3-01-01", 70)], [("HORIZON-CL5-2024-D3-01-02", 70)]):
+            await store_page(page)
+            result = await cache.get_or_load(("page",), memory_storage.fetch_calls_page)
+            results.append([row["identifier"] for row in result["rows"]])
+        return results
+
+    assert asyncio.run(search_store_and_search()) == [
+        ["HORIZON-CL5-2024-D3-01-01"], ["HORIZON-CL5-2024-D3-01-01", "HORIZON-CL5-2024-D3-01-02"]
+    ]